@@ -0,0 +1,79 @@
+import logging
+import sys
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app import models
+from app.database import dispose_engine, get_engine
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_schema(engine: Engine):
+    """Brings tables created by earlier versions of the application up to date, since
+    create_all only creates the tables that do not exist yet
+
+    Each step checks the schema first, so running it again changes nothing.
+
+    :param engine: The engine of the database to upgrade
+    :type engine: Engine
+    """
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("gamestate")}
+    indexes = {index["name"] for index in inspector.get_indexes("gamestate")}
+    with engine.begin() as connection:
+        if "version" not in columns:
+            logger.info("Adding gamestate.version")
+            connection.execute(
+                text(
+                    "ALTER TABLE gamestate "
+                    "ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+                )
+            )
+        if "ix_gamestate_user_id" not in indexes:
+            # Games could be created twice before the index existed, and only each
+            # user's most recently created game is kept
+            logger.info("Adding a unique index on gamestate.user_id")
+            connection.execute(
+                text(
+                    "DELETE FROM gamestate WHERE user_id IS NOT NULL AND id NOT IN "
+                    "(SELECT MAX(id) FROM gamestate GROUP BY user_id)"
+                )
+            )
+            connection.execute(
+                text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS ix_gamestate_user_id "
+                    "ON gamestate (user_id)"
+                )
+            )
+
+
+def create_schema():
+    """Creates the tables of the application's models that do not exist yet, and
+    upgrades the tables that do"""
+
+    engine = get_engine()
+    models.Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+
+
+def main() -> int:
+    """Prepares the database for the application, before its servers are started
+
+    :returns: The exit code
+    :rtype: int
+    """
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        create_schema()
+    finally:
+        dispose_engine()
+    logger.info("Created the database schema")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import pickle
+import struct
+from typing import Optional, Union
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+from app.errors import UnsupportedGameStateVersionError
+from app.metrics import timed
+from hilo.models.card import CARDS, DECK_SIZE
+from hilo.models.deck import CardCounts, Deck
+from hilo.models.gamestate import GameState
+
+GAMESTATE_CODEC_VERSION = 2
+# Records of version 1 do not hold the deck's card counts
+GAMESTATE_CODEC_VERSION_WITHOUT_COUNTS = 1
+PICKLE_PROTOCOL_PREFIX = 0x80
+
+IS_ROUND_STARTED = 1 << 0
+IS_ROUND_ENDED = 1 << 1
+HAS_WIN = 1 << 2
+WIN = 1 << 3
+HAS_BASE_CARD = 1 << 4
+HAS_NEXT_CARD = 1 << 5
+HAS_SEED = 1 << 6
+HAS_SEEDED_DECK = 1 << 7
+
+# version, flags, base_card, next_card, money, round, seed, reshuffle_count,
+# deck seed, deck reshuffle_count, deck cursor, card_ids length, player_name length
+HEADER = struct.Struct("<BBBBqIQIQIBBH")
+CARD_COUNTS_SIZE = DECK_SIZE + 1
+
+
+def encode_gamestate(gamestate: GameState) -> bytes:
+    """Encodes a GameState into a fixed-layout binary record
+
+    The record is a HEADER followed by the deck's CardCounts tree, the remaining card
+    ids of unseeded decks, and the UTF-8 encoded player_name. The tree is stored so
+    that a decoded deck is neither recounted nor, for seeded decks, shuffled again
+    to compute odds.
+
+    :param gamestate: The gamestate to encode
+    :type gamestate: GameState
+    :returns: The encoded gamestate
+    :rtype: bytes
+    """
+
+    deck = gamestate.deck
+    flags = 0
+    if gamestate.is_round_started:
+        flags |= IS_ROUND_STARTED
+    if gamestate.is_round_ended:
+        flags |= IS_ROUND_ENDED
+    if gamestate.win is not None:
+        flags |= HAS_WIN | (WIN if gamestate.win else 0)
+    if gamestate.base_card is not None:
+        flags |= HAS_BASE_CARD
+    if gamestate.next_card is not None:
+        flags |= HAS_NEXT_CARD
+    if gamestate.seed is not None:
+        flags |= HAS_SEED
+
+    if deck.seed is not None:
+        flags |= HAS_SEEDED_DECK
+        card_ids = b""
+    else:
+        card_ids = bytes(deck.card_ids[deck.cursor :])
+
+    player_name = gamestate.player_name.encode()
+
+    return (
+        HEADER.pack(
+            GAMESTATE_CODEC_VERSION,
+            flags,
+            gamestate.base_card.card_id if gamestate.base_card is not None else 0,
+            gamestate.next_card.card_id if gamestate.next_card is not None else 0,
+            gamestate.money,
+            gamestate.round,
+            gamestate.seed or 0,
+            gamestate.reshuffle_count,
+            deck.seed or 0,
+            deck.reshuffle_count,
+            deck.cursor if deck.seed is not None else 0,
+            len(card_ids),
+            len(player_name),
+        )
+        + bytes(deck.counts.tree)
+        + card_ids
+        + player_name
+    )
+
+
+def decode_gamestate(record: bytes) -> GameState:
+    """Decodes a binary record, or a legacy pickled gamestate, into a GameState
+
+    :param record: A record created by encode_gamestate, or a pickled GameState
+    :type record: bytes
+    :returns: The decoded gamestate
+    :rtype: GameState
+    :raises UnsupportedGameStateVersionError: If the record has an unknown version
+    """
+
+    if record[0] == PICKLE_PROTOCOL_PREFIX:
+        return pickle.loads(record)
+    if record[0] not in (
+        GAMESTATE_CODEC_VERSION,
+        GAMESTATE_CODEC_VERSION_WITHOUT_COUNTS,
+    ):
+        raise UnsupportedGameStateVersionError(
+            f"Gamestate codec version {record[0]} is not supported"
+        )
+
+    (
+        version,
+        flags,
+        base_card_id,
+        next_card_id,
+        money,
+        round,
+        seed,
+        reshuffle_count,
+        deck_seed,
+        deck_reshuffle_count,
+        deck_cursor,
+        card_ids_length,
+        player_name_length,
+    ) = HEADER.unpack_from(record)
+    counts: Optional[CardCounts] = None
+    card_ids_start = HEADER.size
+    if version != GAMESTATE_CODEC_VERSION_WITHOUT_COUNTS:
+        card_ids_start += CARD_COUNTS_SIZE
+        counts = CardCounts.from_tree(record[HEADER.size : card_ids_start])
+    card_ids_end = card_ids_start + card_ids_length
+
+    if flags & HAS_SEEDED_DECK:
+        deck = Deck.from_seed(deck_seed, deck_reshuffle_count, deck_cursor, counts)
+    else:
+        deck = Deck.from_card_ids(record[card_ids_start:card_ids_end], counts)
+
+    return GameState.construct(
+        record[card_ids_end : card_ids_end + player_name_length].decode(),
+        money=money,
+        round=round,
+        is_round_started=bool(flags & IS_ROUND_STARTED),
+        is_round_ended=bool(flags & IS_ROUND_ENDED),
+        seed=seed if flags & HAS_SEED else None,
+        deck=deck,
+        base_card=CARDS[base_card_id] if flags & HAS_BASE_CARD else None,
+        next_card=CARDS[next_card_id] if flags & HAS_NEXT_CARD else None,
+        win=bool(flags & WIN) if flags & HAS_WIN else None,
+        reshuffle_count=reshuffle_count,
+    )
+
+
+class GameStateType(TypeDecorator):
+    """Stores a GameState as a versioned binary record created by encode_gamestate
+
+    Records that have already been encoded are stored as they are.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    # sqlalchemy-stubs types every bound value as text, but LargeBinary binds bytes
+    def process_bind_param(  # type: ignore[override]
+        self, value: Union[GameState, bytes, None], dialect
+    ) -> Optional[bytes]:
+        if value is None or isinstance(value, bytes):
+            return value
+        with timed("gamestate_encode"):
+            return encode_gamestate(value)
+
+    def process_result_value(self, value, dialect) -> Optional[GameState]:
+        if value is None:
+            return None
+        with timed("gamestate_decode"):
+            return decode_gamestate(bytes(value))
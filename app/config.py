@@ -1,12 +1,14 @@
+import os
 import secrets
 from typing import Optional
 
 from dotenv import dotenv_values
 
-config = dotenv_values(".env")
+config = {**dotenv_values(".env"), **os.environ}
 
 DEFAULT_ALGORITHM = "HS256"
 DEFAULT_ACCESS_TOKEN_EXPIRE_MINUTES = "2880"
+DEFAULT_TOKEN_CLAIMS_CACHE_SIZE = "10000"
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
@@ -37,9 +39,251 @@ def __get_token_variable(env_value: Optional[str], default_value: str) -> str:
     return env_value if env_value else default_value
 
 
+def __get_positive_rate(name: str, default_value: str) -> float:
+    """Gets a rate that is divided by, such as a number of tokens per second
+
+    :param name: The name of the variable
+    :type name: str
+    :param default_value: The default value should the variable not be set
+    :type default_value: str
+    :raises ValueError: If the rate is not positive
+    :returns: The rate
+    :rtype: float
+    """
+
+    rate = float(__get_token_variable(config.get(name), default_value))
+    if not rate > 0:
+        raise ValueError(f"{name} must be positive, got {rate}")
+    return rate
+
+
 SECRET_KEY = __get_token_variable(config.get("SECRET_KEY"), __create_secret_key())
 ALGORITHM = __get_token_variable(config.get("ALGORITHM"), DEFAULT_ALGORITHM)
 ACCESS_TOKEN_EXPIRE_MINUTES = __get_token_variable(
     config.get("ACCESS_TOKEN_EXPIRE_MINUTES"),
     DEFAULT_ACCESS_TOKEN_EXPIRE_MINUTES,
 )
+TOKEN_CLAIMS_CACHE_SIZE = __get_token_variable(
+    config.get("TOKEN_CLAIMS_CACHE_SIZE"), DEFAULT_TOKEN_CLAIMS_CACHE_SIZE
+)
+
+DEFAULT_GAMESTATE_CACHE_MAX_SIZE = "0"
+DEFAULT_GAMESTATE_CACHE_TTL_SECONDS = "300"
+DEFAULT_GAMESTATE_CACHE_FLUSH_INTERVAL_SECONDS = "1"
+
+# A max size of 0 disables the write-behind gamestate cache. The cache is local to
+# one process, so it should only be enabled when a single worker serves the game.
+GAMESTATE_CACHE_MAX_SIZE = int(
+    __get_token_variable(
+        config.get("GAMESTATE_CACHE_MAX_SIZE"), DEFAULT_GAMESTATE_CACHE_MAX_SIZE
+    )
+)
+GAMESTATE_CACHE_TTL_SECONDS = float(
+    __get_token_variable(
+        config.get("GAMESTATE_CACHE_TTL_SECONDS"), DEFAULT_GAMESTATE_CACHE_TTL_SECONDS
+    )
+)
+GAMESTATE_CACHE_FLUSH_INTERVAL_SECONDS = float(
+    __get_token_variable(
+        config.get("GAMESTATE_CACHE_FLUSH_INTERVAL_SECONDS"),
+        DEFAULT_GAMESTATE_CACHE_FLUSH_INTERVAL_SECONDS,
+    )
+)
+
+DEFAULT_DATABASE_URL = "postgresql://royce:password@db/card_game"
+DEFAULT_ASYNC_DATABASE_URL = "postgresql+asyncpg://royce:password@db/card_game"
+DEFAULT_DATABASE_POOL_SIZE = "5"
+DEFAULT_DATABASE_MAX_OVERFLOW = "10"
+DEFAULT_DATABASE_POOL_TIMEOUT_SECONDS = "30"
+DEFAULT_DATABASE_POOL_PRE_PING = "false"
+DEFAULT_DATABASE_POOL_RECYCLE_SECONDS = "-1"
+DEFAULT_DATABASE_EXECUTEMANY_MODE = "values_only"
+
+DATABASE_URL = __get_token_variable(config.get("DATABASE_URL"), DEFAULT_DATABASE_URL)
+ASYNC_DATABASE_URL = __get_token_variable(
+    config.get("ASYNC_DATABASE_URL"), DEFAULT_ASYNC_DATABASE_URL
+)
+DATABASE_POOL_SIZE = int(
+    __get_token_variable(config.get("DATABASE_POOL_SIZE"), DEFAULT_DATABASE_POOL_SIZE)
+)
+DATABASE_MAX_OVERFLOW = int(
+    __get_token_variable(
+        config.get("DATABASE_MAX_OVERFLOW"), DEFAULT_DATABASE_MAX_OVERFLOW
+    )
+)
+DATABASE_POOL_TIMEOUT_SECONDS = float(
+    __get_token_variable(
+        config.get("DATABASE_POOL_TIMEOUT_SECONDS"),
+        DEFAULT_DATABASE_POOL_TIMEOUT_SECONDS,
+    )
+)
+DATABASE_POOL_PRE_PING = __get_token_variable(
+    config.get("DATABASE_POOL_PRE_PING"), DEFAULT_DATABASE_POOL_PRE_PING
+).lower() in ("1", "true", "yes")
+DATABASE_POOL_RECYCLE_SECONDS = int(
+    __get_token_variable(
+        config.get("DATABASE_POOL_RECYCLE_SECONDS"),
+        DEFAULT_DATABASE_POOL_RECYCLE_SECONDS,
+    )
+)
+# One of "values_only", "values_plus_batch" or "batch", used by the psycopg2 engine
+DATABASE_EXECUTEMANY_MODE = __get_token_variable(
+    config.get("DATABASE_EXECUTEMANY_MODE"), DEFAULT_DATABASE_EXECUTEMANY_MODE
+)
+
+DEFAULT_SERVER_HOST = "0.0.0.0"
+DEFAULT_SERVER_PORT = "80"
+DEFAULT_SERVER_WORKERS = str(os.cpu_count() or 1)
+DEFAULT_SERVER_LOOP = "auto"
+DEFAULT_SERVER_HTTP = "auto"
+DEFAULT_SERVER_PRELOAD = "false"
+DEFAULT_SERVER_GRACEFUL_TIMEOUT_SECONDS = "30"
+DEFAULT_SERVER_LIMIT_CONCURRENCY = "0"
+DEFAULT_SERVER_LIMIT_MAX_REQUESTS = "0"
+DEFAULT_SERVER_BACKLOG = "2048"
+DEFAULT_SERVER_KEEP_ALIVE_SECONDS = "5"
+DEFAULT_DATABASE_POOL_WARMUP_CONNECTIONS = "0"
+
+# Settings of app.serve, which serves the application with gunicorn
+SERVER_HOST = __get_token_variable(config.get("SERVER_HOST"), DEFAULT_SERVER_HOST)
+SERVER_PORT = int(__get_token_variable(config.get("SERVER_PORT"), DEFAULT_SERVER_PORT))
+SERVER_WORKERS = int(
+    __get_token_variable(config.get("SERVER_WORKERS"), DEFAULT_SERVER_WORKERS)
+)
+# One of "auto", "asyncio" or "uvloop"
+SERVER_LOOP = __get_token_variable(config.get("SERVER_LOOP"), DEFAULT_SERVER_LOOP)
+# One of "auto", "h11" or "httptools"
+SERVER_HTTP = __get_token_variable(config.get("SERVER_HTTP"), DEFAULT_SERVER_HTTP)
+# Whether the application is imported once before the workers are forked
+SERVER_PRELOAD = __get_token_variable(
+    config.get("SERVER_PRELOAD"), DEFAULT_SERVER_PRELOAD
+).lower() in ("1", "true", "yes")
+# How long a stopping worker waits for open connections before it shuts down anyway
+SERVER_GRACEFUL_TIMEOUT_SECONDS = int(
+    __get_token_variable(
+        config.get("SERVER_GRACEFUL_TIMEOUT_SECONDS"),
+        DEFAULT_SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+)
+# Connections and tasks per worker beyond which requests get 503, where 0 is unlimited
+SERVER_LIMIT_CONCURRENCY = int(
+    __get_token_variable(
+        config.get("SERVER_LIMIT_CONCURRENCY"), DEFAULT_SERVER_LIMIT_CONCURRENCY
+    )
+)
+# Requests after which a worker is replaced, where 0 is unlimited
+SERVER_LIMIT_MAX_REQUESTS = int(
+    __get_token_variable(
+        config.get("SERVER_LIMIT_MAX_REQUESTS"), DEFAULT_SERVER_LIMIT_MAX_REQUESTS
+    )
+)
+SERVER_BACKLOG = int(
+    __get_token_variable(config.get("SERVER_BACKLOG"), DEFAULT_SERVER_BACKLOG)
+)
+SERVER_KEEP_ALIVE_SECONDS = int(
+    __get_token_variable(
+        config.get("SERVER_KEEP_ALIVE_SECONDS"), DEFAULT_SERVER_KEEP_ALIVE_SECONDS
+    )
+)
+# Connections each worker opens to the database before it accepts requests
+DATABASE_POOL_WARMUP_CONNECTIONS = int(
+    __get_token_variable(
+        config.get("DATABASE_POOL_WARMUP_CONNECTIONS"),
+        DEFAULT_DATABASE_POOL_WARMUP_CONNECTIONS,
+    )
+)
+
+DEFAULT_BCRYPT_ROUNDS = "12"
+# The cores are shared by the password pools of every server worker
+DEFAULT_PASSWORD_POOL_WORKERS = str(
+    max((os.cpu_count() or 1) // max(SERVER_WORKERS, 1), 1)
+)
+DEFAULT_PASSWORD_POOL_MAX_PENDING = "64"
+
+BCRYPT_ROUNDS = int(
+    __get_token_variable(config.get("BCRYPT_ROUNDS"), DEFAULT_BCRYPT_ROUNDS)
+)
+PASSWORD_POOL_WORKERS = int(
+    __get_token_variable(
+        config.get("PASSWORD_POOL_WORKERS"), DEFAULT_PASSWORD_POOL_WORKERS
+    )
+)
+# Password operations beyond this many queued and running ones are rejected with 503
+PASSWORD_POOL_MAX_PENDING = int(
+    __get_token_variable(
+        config.get("PASSWORD_POOL_MAX_PENDING"), DEFAULT_PASSWORD_POOL_MAX_PENDING
+    )
+)
+
+DEFAULT_RATE_LIMIT_IP_CAPACITY = "20"
+DEFAULT_RATE_LIMIT_IP_REFILL_PER_SECOND = "0.5"
+DEFAULT_RATE_LIMIT_USERNAME_CAPACITY = "5"
+DEFAULT_RATE_LIMIT_USERNAME_REFILL_PER_SECOND = "0.1"
+DEFAULT_RATE_LIMIT_MAX_KEYS = "100000"
+
+# Token buckets limiting /login and /user/new, where a capacity of 0 disables a limit.
+# The refill rates must be positive, since a client waits 1 / rate seconds per token.
+RATE_LIMIT_IP_CAPACITY = float(
+    __get_token_variable(
+        config.get("RATE_LIMIT_IP_CAPACITY"), DEFAULT_RATE_LIMIT_IP_CAPACITY
+    )
+)
+RATE_LIMIT_IP_REFILL_PER_SECOND = __get_positive_rate(
+    "RATE_LIMIT_IP_REFILL_PER_SECOND", DEFAULT_RATE_LIMIT_IP_REFILL_PER_SECOND
+)
+RATE_LIMIT_USERNAME_CAPACITY = float(
+    __get_token_variable(
+        config.get("RATE_LIMIT_USERNAME_CAPACITY"),
+        DEFAULT_RATE_LIMIT_USERNAME_CAPACITY,
+    )
+)
+RATE_LIMIT_USERNAME_REFILL_PER_SECOND = __get_positive_rate(
+    "RATE_LIMIT_USERNAME_REFILL_PER_SECOND",
+    DEFAULT_RATE_LIMIT_USERNAME_REFILL_PER_SECOND,
+)
+RATE_LIMIT_MAX_KEYS = int(
+    __get_token_variable(config.get("RATE_LIMIT_MAX_KEYS"), DEFAULT_RATE_LIMIT_MAX_KEYS)
+)
+
+DEFAULT_SLOW_REQUEST_QUERY_COUNT = "20"
+DEFAULT_SLOW_REQUEST_SECONDS = "0.5"
+
+# Requests that run more queries, or take longer, are logged with their queries,
+# where 0 disables a threshold
+SLOW_REQUEST_QUERY_COUNT = int(
+    __get_token_variable(
+        config.get("SLOW_REQUEST_QUERY_COUNT"), DEFAULT_SLOW_REQUEST_QUERY_COUNT
+    )
+)
+SLOW_REQUEST_SECONDS = float(
+    __get_token_variable(
+        config.get("SLOW_REQUEST_SECONDS"), DEFAULT_SLOW_REQUEST_SECONDS
+    )
+)
+
+DEFAULT_METRICS_ENDPOINTS_ENABLED = "false"
+
+# Whether /metrics and /database/pool are served. They expose the application's
+# internals, so they should only be enabled where the port is not public.
+METRICS_ENDPOINTS_ENABLED = __get_token_variable(
+    config.get("METRICS_ENDPOINTS_ENABLED"), DEFAULT_METRICS_ENDPOINTS_ENABLED
+).lower() in ("1", "true", "yes")
+# The environment variable of the directory where each server worker records its
+# metrics. prometheus_client reads it once, when it is first imported.
+METRICS_MULTIPROCESS_DIR_VARIABLE = "PROMETHEUS_MULTIPROC_DIR"
+
+DEFAULT_IDEMPOTENCY_KEY_TTL_SECONDS = "86400"
+DEFAULT_IDEMPOTENCY_CACHE_MAX_SIZE = "10000"
+
+# How long the result of a POST /game/play with an Idempotency-Key is replayed
+IDEMPOTENCY_KEY_TTL_SECONDS = float(
+    __get_token_variable(
+        config.get("IDEMPOTENCY_KEY_TTL_SECONDS"), DEFAULT_IDEMPOTENCY_KEY_TTL_SECONDS
+    )
+)
+# The number of results kept in memory, in front of the idempotency_key table
+IDEMPOTENCY_CACHE_MAX_SIZE = int(
+    __get_token_variable(
+        config.get("IDEMPOTENCY_CACHE_MAX_SIZE"), DEFAULT_IDEMPOTENCY_CACHE_MAX_SIZE
+    )
+)
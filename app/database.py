@@ -1,17 +1,132 @@
-from typing import Generator
+import asyncio
+import threading
+from typing import Any, AsyncGenerator, Dict, Generator, Optional
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "postgresql://royce:password@db/card_game"
+# sqlalchemy-stubs predates the pools of SQLAlchemy's asyncio extension
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool  # type: ignore[attr-defined]
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
+from app.config import (
+    ASYNC_DATABASE_URL,
+    DATABASE_EXECUTEMANY_MODE,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_PRE_PING,
+    DATABASE_POOL_RECYCLE_SECONDS,
+    DATABASE_POOL_SIZE,
+    DATABASE_POOL_TIMEOUT_SECONDS,
+    DATABASE_URL,
 )
+from app.pool import PoolStats, instrument_engine, instrumented_pool_class
+from app.querylog import instrument_queries
+
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+SQLALCHEMY_ASYNC_DATABASE_URL = ASYNC_DATABASE_URL
+
+POOL_OPTIONS = {
+    "pool_size": DATABASE_POOL_SIZE,
+    "max_overflow": DATABASE_MAX_OVERFLOW,
+    "pool_timeout": DATABASE_POOL_TIMEOUT_SECONDS,
+    "pool_pre_ping": DATABASE_POOL_PRE_PING,
+    "pool_recycle": DATABASE_POOL_RECYCLE_SECONDS,
+}
+
+pool_stats = PoolStats("sync")
+async_pool_stats = PoolStats("async")
+
+# The engines are created on first use, so that importing the application neither
+# imports the database drivers nor needs a database
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_engines_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """Gets the synchronous engine, creating it on first use"""
+
+    global _engine
+    if _engine is None:
+        with _engines_lock:
+            if _engine is None:
+                options: Dict[str, Any] = dict(POOL_OPTIONS)
+                # Only the psycopg2 dialect accepts executemany_mode
+                if make_url(SQLALCHEMY_DATABASE_URL).get_driver_name() == "psycopg2":
+                    options["executemany_mode"] = DATABASE_EXECUTEMANY_MODE
+                engine = create_engine(
+                    SQLALCHEMY_DATABASE_URL,
+                    poolclass=instrumented_pool_class(QueuePool, pool_stats),
+                    **options,
+                )
+                instrument_engine(engine, pool_stats)
+                instrument_queries(engine)
+                _engine = engine
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Gets the asynchronous engine, creating it on first use"""
+
+    global _async_engine
+    if _async_engine is None:
+        with _engines_lock:
+            if _async_engine is None:
+                async_engine = create_async_engine(
+                    SQLALCHEMY_ASYNC_DATABASE_URL,
+                    poolclass=instrumented_pool_class(
+                        AsyncAdaptedQueuePool, async_pool_stats
+                    ),
+                    **POOL_OPTIONS,
+                )
+                instrument_engine(async_engine.sync_engine, async_pool_stats)
+                instrument_queries(async_engine.sync_engine)
+                _async_engine = async_engine
+    return _async_engine
+
+
+def dispose_engine():
+    """Closes the connections of the synchronous engine, if it has been created"""
+
+    if _engine is not None:
+        _engine.dispose()
+
+
+async def dispose_async_engine():
+    """Closes the connections of the asynchronous engine, if it has been created"""
+
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+class LazySession(Session):
+    """A session bound to the synchronous engine, which is created when the session
+    first needs a connection"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return bind if bind is not None else get_engine()
+
+
+class LazyAsyncSession(Session):
+    """The synchronous session of an AsyncSession, bound to the asynchronous engine,
+    which is created when the session first needs a connection"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return bind if bind is not None else get_async_engine().sync_engine
+
 
 SessionLocal = sessionmaker(
-    autoflush=False, bind=engine, expire_on_commit=False, autocommit=True
+    autoflush=False, class_=LazySession, expire_on_commit=False, autocommit=True
+)
+
+AsyncSessionLocal = sessionmaker(
+    autoflush=False,
+    class_=AsyncSession,
+    sync_session_class=LazyAsyncSession,
+    expire_on_commit=False,
 )
 
 Base = declarative_base()
@@ -26,3 +141,29 @@ def get_session() -> Generator:
         yield session
     finally:
         session.close()
+
+
+async def get_async_session() -> AsyncGenerator:
+    """Creates an asynchronous database session"""
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def warm_up_async_pool(connections: int):
+    """Opens connections of the async pool before requests need them
+
+    :param connections: The number of connections to open, at most the pool's size
+    :type connections: int
+    """
+
+    results = await asyncio.gather(
+        *(get_async_engine().connect() for _ in range(connections)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if not isinstance(result, BaseException):
+            await result.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
@@ -0,0 +1,90 @@
+import math
+
+from fastapi import Header, HTTPException, Request, status
+from jose.exceptions import JWTError
+
+from app.errors import (
+    MISSING_AUTHENTICATION_TOKEN,
+    RATE_LIMIT_EXCEEDED,
+    TOKEN_AUTHENTICATION_FAILED,
+    InvalidAuthenticationTokenError,
+    MissingAuthenticationTokenError,
+    RateLimitExceededError,
+)
+from app.metrics import timed
+from app.ratelimit import RateLimiter, ip_rate_limiter, username_rate_limiter
+from app.token import Principal, get_principal
+
+
+async def get_current_principal(token: str = Header(None)) -> Principal:
+    """Authenticates a request by its JWT access token
+
+    :param token: The JWT access token containing the user's user_id and username
+    :type token: str
+    :returns: The authenticated user
+    :rtype: Principal
+    :raises HTTPException: if token validation fails
+    """
+
+    try:
+        with timed("token_decode"):
+            return get_principal(token)
+    except MissingAuthenticationTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": MISSING_AUTHENTICATION_TOKEN},
+        )
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": TOKEN_AUTHENTICATION_FAILED},
+        )
+    except InvalidAuthenticationTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": TOKEN_AUTHENTICATION_FAILED},
+        )
+
+
+def __check_rate_limit(rate_limiter: RateLimiter, key: str) -> None:
+    """Counts a request against rate_limiter
+
+    :raises HTTPException: if the request is over the limit
+    """
+
+    try:
+        rate_limiter.check(key)
+    except RateLimitExceededError as error:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"error": RATE_LIMIT_EXCEEDED},
+            headers={"Retry-After": str(math.ceil(error.retry_after))},
+        )
+
+
+async def limit_requests_by_client_ip(request: Request) -> None:
+    """Limits the requests each client IP makes to a route
+
+    This runs before the request body is read, so flooding clients are turned away
+    before any database lookup or password hashing.
+
+    :param request: The incoming request
+    :type request: Request
+    :raises HTTPException: if the client has made too many requests
+    """
+
+    client_ip = request.client.host if request.client else "unknown"
+    __check_rate_limit(ip_rate_limiter, f"{request.url.path}:{client_ip}")
+
+
+def limit_requests_by_username(path: str, username: str) -> None:
+    """Limits the requests made to a route for each username
+
+    :param path: The path of the route
+    :type path: str
+    :param username: The username given in the request body
+    :type username: str
+    :raises HTTPException: if too many requests have been made for the username
+    """
+
+    __check_rate_limit(username_rate_limiter, f"{path}:{username}")
@@ -13,6 +13,9 @@ TYPE_VALIDATION_ERROR = "TYPE_VALIDATION_ERROR"
 MISSING_AUTHENTICATION_TOKEN = "MISSING_AUTHENTICATION_TOKEN"
 MISSING_FIELD_VALUES = "MISSING_FIELD_VALUES"
 MALFORMED_REQUEST_ERROR = "MALFORMED_REQUEST_ERROR"
+SERVICE_BUSY = "SERVICE_BUSY"
+RATE_LIMIT_EXCEEDED = "RATE_LIMIT_EXCEEDED"
+IDEMPOTENCY_KEY_REUSED = "IDEMPOTENCY_KEY_REUSED"
 
 
 class UserNotFoundError(Exception):
@@ -39,6 +42,18 @@ class GameStateStoreNotFoundError(Exception):
     pass
 
 
+class GameStateVersionConflictError(Exception):
+    """Exception raised when a gamestate was changed after it was loaded for an update"""
+
+    pass
+
+
+class UnsupportedGameStateVersionError(Exception):
+    """Exception raised when a stored gamestate was encoded with an unknown codec version"""
+
+    pass
+
+
 class RoundNotEndedError(Exception):
     """Exception raised when users attempt to start a round without ending the current round"""
 
@@ -75,6 +90,30 @@ class InvalidBetError(Exception):
     pass
 
 
+class PasswordHasherBusyError(Exception):
+    """Exception raised when too many password operations are already pending"""
+
+    pass
+
+
+class RateLimitExceededError(Exception):
+    """Exception raised when a client has made too many requests
+
+    :param retry_after: The number of seconds until the client can make a request
+    :type retry_after: float
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f} seconds")
+        self.retry_after = retry_after
+
+
+class IdempotencyKeyReusedError(Exception):
+    """Exception raised when an Idempotency-Key is reused for a request with a different body"""
+
+    pass
+
+
 class InvalidUserQueryError(Exception):
     """Exception raised for invalid query to the user database table"""
 
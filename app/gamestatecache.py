@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.codec import decode_gamestate, encode_gamestate
+from app.config import (
+    GAMESTATE_CACHE_FLUSH_INTERVAL_SECONDS,
+    GAMESTATE_CACHE_MAX_SIZE,
+    GAMESTATE_CACHE_TTL_SECONDS,
+)
+from app.database import SessionLocal
+from app.metrics import timed
+from app.repository.gamestatestore import update_gamestates
+from hilo.models.gamestate import GameState
+
+logger = logging.getLogger(__name__)
+
+# An encoded gamestate and its version
+PendingRecord = Tuple[bytes, int]
+GameStateWriter = Callable[[Dict[int, PendingRecord]], None]
+
+
+@dataclass
+class CacheEntry:
+    __slots__ = ("record", "version", "expires_at", "dirty")
+
+    record: bytes
+    version: int
+    expires_at: float
+    dirty: bool
+
+
+class GameStateCache:
+    """An in-process LRU of hot gamestates with TTL eviction and write-behind flushing
+
+    Gamestates are cached as encoded records, so every get returns a new copy that
+    the caller may change without changing the cache. Updated records are written in
+    one batch by flush, which runs every flush_interval seconds, as soon as a dirty
+    gamestate is evicted, and on stop. At most flush_interval seconds of play can be
+    lost if the process dies.
+
+    Since cached updates do not reach the database, the database cannot serialise
+    them, and the requests of a user are serialised by locked instead.
+
+    :param max_size: The maximum number of cached gamestates, where 0 disables the cache
+    :type max_size: int
+    :param ttl: The number of seconds a gamestate stays cached since its last use
+    :type ttl: float
+    :param flush_interval: The number of seconds between background flushes
+    :type flush_interval: float
+    :param writer: Writes a batch of encoded gamestates and their versions keyed by user_id
+    :type writer: GameStateWriter
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        flush_interval: float,
+        writer: GameStateWriter,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self.clock = clock
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        # Records of evicted gamestates that have not been written yet
+        self._evicted: Dict[int, PendingRecord] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._flusher: Optional[threading.Thread] = None
+        # The lock of each user whose gamestate is being updated, and the number of
+        # requests holding or waiting for it
+        self._user_locks: Dict[int, List] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id: int) -> Optional[GameState]:
+        """Gets a copy of a cached gamestate and marks it as recently used
+
+        :returns: The cached gamestate, or None if it is not cached or has expired
+        :rtype: Optional[GameState]
+        """
+
+        cached = self.get_with_version(user_id)
+        return cached[0] if cached is not None else None
+
+    def get_with_version(self, user_id: int) -> Optional[Tuple[GameState, int]]:
+        """Gets a copy of a cached gamestate and its version, and marks it as recently
+        used
+
+        :returns: The cached gamestate and its version, or None if it is not cached or
+        has expired
+        :rtype: Optional[Tuple[GameState, int]]
+        """
+
+        if (cached := self._get_record(user_id)) is None:
+            return None
+        record, version = cached
+        with timed("gamestate_decode"):
+            return decode_gamestate(record), version
+
+    def get_version(self, user_id: int) -> Optional[int]:
+        """Gets the version of a cached gamestate without decoding an evicted gamestate
+
+        :returns: The version, or None if the gamestate is not cached or has expired
+        :rtype: Optional[int]
+        """
+
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and (entry.expires_at > self.clock() or entry.dirty):
+                return entry.version
+            if (evicted := self._evicted.get(user_id)) is not None:
+                return evicted[1]
+            return None
+
+    @asynccontextmanager
+    async def locked(self, user_id: int) -> AsyncIterator[None]:
+        """Holds a lock of the user in this process, so that a request of the user
+        reads their gamestate only once the previous one has updated it
+
+        Does nothing when the cache is disabled, in which case the gamestate's row is
+        locked in the database instead.
+
+        :param user_id: The user_id of the gamestate
+        :type user_id: int
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        if (user_lock := self._user_locks.get(user_id)) is None:
+            user_lock = self._user_locks[user_id] = [asyncio.Lock(), 0]
+        user_lock[1] += 1
+        try:
+            async with user_lock[0]:
+                yield
+        finally:
+            user_lock[1] -= 1
+            if user_lock[1] == 0:
+                del self._user_locks[user_id]
+
+    def _get_record(self, user_id: int) -> Optional[PendingRecord]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.get(user_id)
+            if entry is None:
+                # An evicted gamestate that is waiting to be written is newer than
+                # the one in the database
+                if (evicted := self._evicted.get(user_id)) is None:
+                    return None
+                record, version = evicted
+                entry = CacheEntry(record, version, now, False)
+                self._entries[user_id] = entry
+            elif entry.expires_at <= now and not entry.dirty:
+                del self._entries[user_id]
+                return None
+
+            entry.expires_at = now + self.ttl
+            self._entries.move_to_end(user_id)
+            return entry.record, entry.version
+
+    def put(
+        self, user_id: int, gamestate: GameState, version: int, dirty: bool = False
+    ):
+        """Caches a gamestate, evicting the least recently used gamestates when full
+
+        :param version: The version of the gamestate
+        :type version: int
+        :param dirty: Whether the gamestate must be written to the database
+        :type dirty: bool
+        """
+
+        if not self.enabled:
+            return
+
+        with timed("gamestate_encode"):
+            record = encode_gamestate(gamestate)
+        has_evicted_dirty_gamestate = False
+        with self._lock:
+            if (entry := self._entries.get(user_id)) is not None and entry.dirty:
+                dirty = True
+            self._entries[user_id] = CacheEntry(
+                record, version, self.clock() + self.ttl, dirty
+            )
+            self._entries.move_to_end(user_id)
+
+            while len(self._entries) > self.max_size:
+                evicted_user_id, evicted_entry = self._entries.popitem(last=False)
+                if evicted_entry.dirty:
+                    self._evicted[evicted_user_id] = (
+                        evicted_entry.record,
+                        evicted_entry.version,
+                    )
+                    has_evicted_dirty_gamestate = True
+
+        if has_evicted_dirty_gamestate:
+            if self._flusher is not None:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def flush(self) -> int:
+        """Writes every dirty gamestate in one batch, and drops expired gamestates
+
+        A batch that fails to be written is kept, to be retried by the next flush.
+
+        :returns: The number of written gamestates
+        :rtype: int
+        """
+
+        with self._flush_lock:
+            with self._lock:
+                now = self.clock()
+                records, self._evicted = self._evicted, {}
+                for user_id, entry in list(self._entries.items()):
+                    if entry.dirty:
+                        records[user_id] = (entry.record, entry.version)
+                        entry.dirty = False
+                    if entry.expires_at <= now:
+                        del self._entries[user_id]
+
+            if not records:
+                return 0
+
+            try:
+                self.writer(records)
+            except Exception:
+                logger.exception("Failed to write %d cached gamestates", len(records))
+                with self._lock:
+                    for user_id, (record, version) in records.items():
+                        if (cached := self._entries.get(user_id)) is None:
+                            self._evicted.setdefault(user_id, (record, version))
+                        else:
+                            # The cached record is at least as new as the failed one
+                            cached.dirty = True
+                return 0
+
+            return len(records)
+
+    def start(self):
+        """Starts the background flusher thread"""
+
+        if not self.enabled or self._flusher is not None:
+            return
+        self._stopped = False
+        self._flusher = threading.Thread(
+            target=self._run, name="gamestate-cache-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self):
+        """Stops the background flusher thread and synchronously flushes dirty gamestates"""
+
+        self._stopped = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        if self.enabled:
+            self.flush()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def write_gamestates(records: Dict[int, PendingRecord]):
+    """Writes a batch of encoded gamestates in its own database session"""
+
+    session = SessionLocal()
+    try:
+        session.begin()
+        update_gamestates(session, records)
+    finally:
+        session.close()
+
+
+gamestate_cache = GameStateCache(
+    GAMESTATE_CACHE_MAX_SIZE,
+    GAMESTATE_CACHE_TTL_SECONDS,
+    GAMESTATE_CACHE_FLUSH_INTERVAL_SECONDS,
+    write_gamestates,
+)
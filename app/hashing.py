@@ -1,6 +1,35 @@
-from passlib.context import CryptContext
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import BCRYPT_ROUNDS, PASSWORD_POOL_MAX_PENDING, PASSWORD_POOL_WORKERS
+from app.errors import PasswordHasherBusyError
+from app.metrics import timed
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+@lru_cache(maxsize=None)
+def get_password_context() -> "CryptContext":
+    """Gets the password context, importing passlib on first use rather than when
+    the application starts
+
+    Hashes with a cost other than BCRYPT_ROUNDS need an update, so they are rehashed
+    the next time their users log in.
+    """
+
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS,
+    )
 
 
 def hash_password(password: str) -> str:
@@ -12,7 +41,7 @@ def hash_password(password: str) -> str:
     :rtype: str
     """
 
-    hashed_password = password_context.hash(password)
+    hashed_password = get_password_context().hash(password)
     return hashed_password
 
 
@@ -27,4 +56,88 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     :rtype: bool
     """
 
-    return password_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verifies a given password, and rehashes it if its hash needs an update
+
+    :param plain_password: A password in plaintext
+    :type plain_password: str
+    :param hashed_password: A hashed password
+    :type hashed_password: str
+    :returns: Whether the password is verified, and its new hash if the cost of
+    hashed_password differs from BCRYPT_ROUNDS
+    :rtype: Tuple[bool, Optional[str]]
+    """
+
+    return get_password_context().verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs password operations in a dedicated process pool with a bounded queue
+
+    bcrypt holds the GIL while it hashes, so running it in threads stalls the event
+    loop. Operations that arrive while max_pending operations are already queued or
+    running are rejected instead of waiting.
+
+    :param workers: The number of worker processes
+    :type workers: int
+    :param max_pending: The maximum number of queued and running operations
+    :type max_pending: int
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            return self._executor
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Runs function with args in a worker process
+
+        :raises PasswordHasherBusyError: If max_pending operations are pending
+        """
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise PasswordHasherBusyError("Password hasher is busy")
+            self.pending += 1
+
+        try:
+            with timed("password_hashing"):
+                future = self._get_executor().submit(function, *args)
+                return await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await self.run(
+            verify_and_update_password, plain_password, hashed_password
+        )
+
+    def shutdown(self):
+        """Stops the worker processes, which are started again when needed"""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+password_hasher = PasswordHasher(PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_PENDING)
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+
+from app.config import IDEMPOTENCY_CACHE_MAX_SIZE, IDEMPOTENCY_KEY_TTL_SECONDS
+from app.errors import IdempotencyKeyReusedError
+from hilo.models.prediction import Prediction
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# The user_id of the user who made the request, and its Idempotency-Key
+IdempotencyCacheKey = Tuple[int, str]
+# Produces a request's response body, and whether it was replayed from the database
+ResponseProducer = Callable[[], Awaitable[Tuple[bytes, bool]]]
+
+
+def fingerprint_request(prediction: Prediction, bet: int) -> str:
+    """Fingerprints the body of a request to end a round, so that an Idempotency-Key
+    is only replayed for the request it was first used for
+
+    :param prediction: The user's prediction
+    :type prediction: Prediction
+    :param bet: The user's bet
+    :type bet: int
+    :returns: The hex SHA-256 digest of the request's choices
+    :rtype: str
+    """
+
+    return hashlib.sha256(orjson.dumps([prediction.value, bet])).hexdigest()
+
+
+@dataclass
+class IdempotencyEntry:
+    __slots__ = ("fingerprint", "body", "expires_at")
+
+    fingerprint: str
+    body: bytes
+    expires_at: float
+
+
+class IdempotencyCache:
+    """An in-process LRU of the response bodies of requests made with an
+    Idempotency-Key, which also makes concurrent requests with the same key wait for
+    the first one instead of being played again
+
+    The cache is in front of the idempotency_key table, which keeps results across
+    restarts and worker processes. Each body is kept with the fingerprint of the
+    request that produced it, and is only replayed for requests with that fingerprint.
+
+    :param max_size: The maximum number of cached bodies, where 0 disables the cache
+    :type max_size: int
+    :param ttl: The number of seconds a body stays cached
+    :type ttl: float
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[IdempotencyCacheKey, IdempotencyEntry]" = (
+            OrderedDict()
+        )
+        # Requests that are being played, with their fingerprint and a future resolved
+        # with their body, or with None if they failed
+        self._in_flight: Dict[IdempotencyCacheKey, Tuple[str, asyncio.Future]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: IdempotencyCacheKey) -> Optional[IdempotencyEntry]:
+        """Gets a cached response body with the fingerprint of its request
+
+        :returns: The cached entry, or None if it is not cached or has expired
+        :rtype: Optional[IdempotencyEntry]
+        """
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        return entry
+
+    def put(self, key: IdempotencyCacheKey, fingerprint: str, body: bytes):
+        """Caches a response body, evicting the least recently cached bodies when full"""
+
+        if self.max_size <= 0:
+            return
+        self._entries[key] = IdempotencyEntry(
+            fingerprint, body, self.clock() + self.ttl
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def run(
+        self, key: IdempotencyCacheKey, fingerprint: str, produce: ResponseProducer
+    ) -> Tuple[bytes, bool]:
+        """Gets the response body of a request with key, producing it only if it is
+        neither cached nor being produced by another request
+
+        A request that waits for another one with the same key produces the body
+        itself if the other request fails.
+
+        :param key: The user_id and Idempotency-Key of the request
+        :type key: IdempotencyCacheKey
+        :param fingerprint: The fingerprint of the request's body
+        :type fingerprint: str
+        :param produce: Plays the request, or replays it from the database
+        :type produce: ResponseProducer
+        :returns: The body, and whether it is the result of an earlier request
+        :rtype: Tuple[bytes, bool]
+        :raises IdempotencyKeyReusedError: if key was used for a request with another
+        fingerprint
+        """
+
+        while True:
+            if (entry := self.get(key)) is not None:
+                if entry.fingerprint != fingerprint:
+                    raise IdempotencyKeyReusedError
+                return entry.body, True
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            in_flight_fingerprint, future = in_flight
+            if in_flight_fingerprint != fingerprint:
+                raise IdempotencyKeyReusedError
+            # A cancelled waiter must not cancel the request it waits for
+            if (body := await asyncio.shield(future)) is not None:
+                return body, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        body = None
+        try:
+            body, replayed = await produce()
+            self.put(key, fingerprint, body)
+            return body, replayed
+        finally:
+            del self._in_flight[key]
+            future.set_result(body)
+
+    def clear(self):
+        """Removes every cached response body"""
+
+        self._entries.clear()
+
+
+idempotency_cache = IdempotencyCache(
+    IDEMPOTENCY_CACHE_MAX_SIZE, IDEMPOTENCY_KEY_TTL_SECONDS
+)
@@ -1,3 +1,4 @@
+import logging
 import os
 
 from dotenv import load_dotenv
@@ -5,16 +6,25 @@ from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
-from app import models
-from app.config import CORS_ALLOWED_ORIGINS
-from app.database import engine
+from app.config import (
+    CORS_ALLOWED_ORIGINS,
+    DATABASE_POOL_WARMUP_CONNECTIONS,
+    METRICS_ENDPOINTS_ENABLED,
+)
+from app.database import dispose_async_engine, dispose_engine, warm_up_async_pool
 from app.exceptions import validation_exception_handler
-from app.routers import authentication, gamestate, user
+from app.gamestatecache import gamestate_cache
+from app.hashing import password_hasher
+from app.metrics import MetricsMiddleware
+from app.querylog import QueryLogMiddleware
+from app.routers import authentication, database, gamestate, metrics, user
 
 load_dotenv()
 
 OPENAPI_URL_CONFIG = os.getenv("OPENAPI_URL_CONFIG")
 
+logger = logging.getLogger(__name__)
+
 
 app = FastAPI(docs_url="/docs" if OPENAPI_URL_CONFIG is not None else None)
 
@@ -25,11 +35,47 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+app.add_middleware(QueryLogMiddleware, routes=app.routes)
 
 
-models.Base.metadata.create_all(engine)
-
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.include_router(user.router)
 app.include_router(gamestate.router)
+app.include_router(gamestate.websocket_router)
 app.include_router(authentication.router)
+if METRICS_ENDPOINTS_ENABLED:
+    app.include_router(database.router)
+    app.include_router(metrics.router)
+
+
+@app.on_event("startup")
+def start_gamestate_cache():
+    gamestate_cache.start()
+
+
+@app.on_event("startup")
+async def warm_up_database_pool():
+    # Each server worker opens its connections before it accepts requests
+    if not DATABASE_POOL_WARMUP_CONNECTIONS:
+        return
+    try:
+        await warm_up_async_pool(DATABASE_POOL_WARMUP_CONNECTIONS)
+    except Exception:
+        logger.warning("Failed to warm up the database pool", exc_info=True)
+
+
+@app.on_event("shutdown")
+def flush_gamestate_cache():
+    gamestate_cache.stop()
+
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    await dispose_async_engine()
+    dispose_engine()
+
+
+@app.on_event("shutdown")
+def shutdown_password_hasher():
+    password_hasher.shutdown()
@@ -0,0 +1,186 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import METRICS_MULTIPROCESS_DIR_VARIABLE
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+registry = CollectorRegistry()
+requests_total = Counter(
+    "hilo_http_requests",
+    "HTTP requests by method, route and status code.",
+    ("method", "route", "status"),
+    registry=registry,
+)
+request_duration = Histogram(
+    "hilo_http_request_duration_seconds",
+    "HTTP request latency by method and route.",
+    ("method", "route"),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+stage_duration = Histogram(
+    "hilo_request_stage_duration_seconds",
+    "Latency of each stage of a request by route and stage.",
+    ("route", "stage"),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+
+
+def render_metrics() -> bytes:
+    """Renders the metrics in the Prometheus text format, summed over every server
+    worker when the workers record them in PROMETHEUS_MULTIPROC_DIR
+
+    :returns: The metrics
+    :rtype: bytes
+    """
+
+    if METRICS_MULTIPROCESS_DIR_VARIABLE not in os.environ:
+        return generate_latest(registry)
+    workers_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(workers_registry)
+    return generate_latest(workers_registry)
+
+
+# The stages timed during the current request, recorded with the request's route
+# once the request has been routed
+_request_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_stages", default=None
+)
+NO_ROUTE = "none"
+UNMATCHED_ROUTE = "unmatched"
+
+
+def record_stage(stage: str, seconds: float):
+    """Records the latency of a stage of the current request
+
+    :param stage: The name of the stage
+    :type stage: str
+    :param seconds: The stage's latency
+    :type seconds: float
+    """
+
+    stages = _request_stages.get()
+    if stages is None:
+        stage_duration.labels(NO_ROUTE, stage).observe(seconds)
+    else:
+        stages.append((stage, seconds))
+
+
+class timed:
+    """A context manager that records the latency of its block as a request stage
+
+    :param stage: The name of the stage
+    :type stage: str
+    """
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_stage(self.stage, time.perf_counter() - self.started)
+
+
+class RoutePaths:
+    """Finds the path template of the route that handled a request, for use as a
+    label with a bounded number of values
+
+    :param routes: The application's routes
+    :type routes: Sequence
+    """
+
+    def __init__(self, routes: Sequence):
+        self.routes = routes
+        self._paths: Dict[Callable, str] = {}
+
+    def __call__(self, scope: Scope) -> str:
+        # The router puts the endpoint of the matched route in the scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if (path := self._paths.get(endpoint)) is None:
+            path = next(
+                (route.path for route in self.routes if route.endpoint is endpoint),
+                UNMATCHED_ROUTE,
+            )
+            self._paths[endpoint] = path
+        return path
+
+
+class MetricsMiddleware:
+    """Records the count and latency of HTTP requests, and the stages timed while
+    they were handled, labelled by the path of the route that handled them
+
+    :param app: The ASGI application to wrap
+    :type app: ASGIApp
+    :param routes: The application's routes, used to find the route of a request
+    :type routes: Sequence
+    """
+
+    def __init__(self, app: ASGIApp, routes: Sequence):
+        self.app = app
+        self.route_path = RoutePaths(routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: List[Tuple[str, float]] = []
+        token = _request_stages.set(stages)
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            _request_stages.reset(token)
+
+            route = self.route_path(scope)
+            method = scope["method"]
+            requests_total.labels(method, route, str(status_code)).inc()
+            request_duration.labels(method, route).observe(duration)
+            for stage, seconds in stages:
+                stage_duration.labels(route, stage).observe(seconds)
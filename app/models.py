@@ -1,9 +1,11 @@
 from sqlalchemy import Column, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.relationships import RelationshipProperty
-from sqlalchemy.sql.sqltypes import Float, PickleType
+from sqlalchemy.sql.sqltypes import Float
 
+from app.codec import GameStateType
 from app.database import Base
+from app.idempotency import IDEMPOTENCY_KEY_MAX_LENGTH
 
 
 class User(Base):
@@ -43,18 +45,53 @@ class GameStateStore(Base):
     :type __tablename__: str
     :param id: Creates a column named "id" to store the id of each gamestate
     :type id: Integer
-    :param user_id: Creates a column named "user_id" to store user_ids associated
-    with each "id"
+    :param user_id: Creates a column named "user_id" with a unique index to store
+    the user_id associated with each "id", so that each user has at most one gamestate
     :type username: Integer
     :param gamestate: Creates a column named "gamestate" to store all
     gamestate information associated with each "id"
-    :type gamestate: PickleType
+    :type gamestate: GameStateType
+    :param version: Creates a column named "version" that counts the updates of
+    each gamestate, used to tell whether a gamestate has changed without reading it
+    :type version: Integer
     """
 
     __tablename__ = "gamestate"
 
     id = Column(Integer, index=True, primary_key=True)
-    user_id = Column(Integer, ForeignKey("user.id"))
-    gamestate = Column(PickleType)
+    user_id = Column(Integer, ForeignKey("user.id"), index=True, unique=True)
+    gamestate = Column(GameStateType)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     user: RelationshipProperty = relationship("User", back_populates="gamestate")
+
+
+class IdempotencyKey(Base):
+    """Creates a table with an SQLAlchemy model to store the results of requests made
+    with an Idempotency-Key header, so that retried requests are not played again
+
+    :attr __tablename__: The name of the table, "idempotency_key"
+    :type __tablename__: str
+    :param user_id: Creates a column named "user_id" to store the user who made the
+    request, since each user has their own keys
+    :type user_id: Integer
+    :param key: Creates a column named "key" to store the Idempotency-Key of the request
+    :type key: String
+    :param fingerprint: Creates a column named "fingerprint" to store the fingerprint of
+    the request's body, since a key is only replayed for the same body
+    :type fingerprint: String
+    :param gamestate: Creates a column named "gamestate" to store the gamestate that
+    resulted from the request
+    :type gamestate: GameStateType
+    :param created_at: Creates a column named "created_at" to store the time the
+    request was made, after which the key expires
+    :type created_at: Float
+    """
+
+    __tablename__ = "idempotency_key"
+
+    user_id = Column(Integer, ForeignKey("user.id"), primary_key=True)
+    key = Column(String(IDEMPOTENCY_KEY_MAX_LENGTH), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    gamestate = Column(GameStateType, nullable=False)
+    created_at = Column(Float, nullable=False)
@@ -0,0 +1,195 @@
+import threading
+import time
+from typing import Dict, Type
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.metrics import record_stage, registry
+
+# The pool gauges of live workers are summed, and those of exited workers dropped
+db_pool_size = Gauge(
+    "hilo_db_pool_size",
+    "Connections the pool keeps open.",
+    ("pool",),
+    multiprocess_mode="livesum",
+    registry=registry,
+)
+db_pool_checked_out = Gauge(
+    "hilo_db_pool_checked_out",
+    "Connections checked out of the pool.",
+    ("pool",),
+    multiprocess_mode="livesum",
+    registry=registry,
+)
+db_pool_overflow = Gauge(
+    "hilo_db_pool_overflow",
+    "Connections open beyond the pool's size.",
+    ("pool",),
+    multiprocess_mode="livesum",
+    registry=registry,
+)
+db_pool_checkouts = Counter(
+    "hilo_db_pool_checkouts",
+    "Connections checked out of the pool.",
+    ("pool",),
+    registry=registry,
+)
+db_pool_timeouts = Counter(
+    "hilo_db_pool_timeouts",
+    "Checkouts that timed out waiting for a connection.",
+    ("pool",),
+    registry=registry,
+)
+db_pool_connects = Counter(
+    "hilo_db_pool_connects",
+    "Connections opened by the pool.",
+    ("pool",),
+    registry=registry,
+)
+db_pool_wait_seconds = Counter(
+    "hilo_db_pool_wait_seconds",
+    "Time spent waiting for connections from the pool.",
+    ("pool",),
+    registry=registry,
+)
+
+
+class PoolStats:
+    """Counters describing how a connection pool is used, for sizing the pool
+
+    :param name: The name of the pool's engine
+    :type name: str
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_checked_out = 0
+        self.max_overflow = 0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        db_pool_checkouts.labels(self.name).inc()
+        db_pool_wait_seconds.labels(self.name).inc(wait)
+
+    def record_timeout(self, wait: float):
+        with self._lock:
+            self.timeouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        db_pool_timeouts.labels(self.name).inc()
+        db_pool_wait_seconds.labels(self.name).inc(wait)
+
+    def record_usage(self, size: int, checked_out: int, overflow: int):
+        # QueuePool.overflow() counts up from -pool_size until the pool is full
+        overflow = max(overflow, 0)
+        with self._lock:
+            self.max_checked_out = max(self.max_checked_out, checked_out)
+            self.max_overflow = max(self.max_overflow, overflow)
+        db_pool_size.labels(self.name).set(size)
+        db_pool_checked_out.labels(self.name).set(checked_out)
+        db_pool_overflow.labels(self.name).set(overflow)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+        db_pool_connects.labels(self.name).inc()
+
+    def snapshot(self) -> Dict[str, float]:
+        """Returns the counters along with the pool's current usage"""
+
+        pool = self.pool
+        with self._lock:
+            return {
+                "size": pool.size() if pool is not None else 0,
+                "checked_out": pool.checkedout() if pool is not None else 0,
+                "overflow": max(pool.overflow(), 0) if pool is not None else 0,
+                "max_checked_out": self.max_checked_out,
+                "max_overflow": self.max_overflow,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "total_wait_seconds": self.total_wait,
+                "max_wait_seconds": self.max_wait,
+                "mean_wait_seconds": (
+                    self.total_wait / self.checkouts if self.checkouts else 0.0
+                ),
+            }
+
+
+def instrumented_pool_class(
+    pool_class: Type[QueuePool], stats: PoolStats
+) -> Type[QueuePool]:
+    """Creates a subclass of pool_class that records its usage in stats
+
+    The time each checkout waits for a connection, including any pre-ping, is
+    measured around Pool.connect. The pool's usage is recorded once a connection is
+    returned to the pool, and on checkout by the event that instrument_engine
+    listens for.
+
+    :param pool_class: QueuePool, or a subclass such as AsyncAdaptedQueuePool
+    :type pool_class: Type[QueuePool]
+    :param stats: The counters to update
+    :type stats: PoolStats
+    :returns: The instrumented pool class, to be given to create_engine as poolclass
+    :rtype: Type[QueuePool]
+    """
+
+    # mypy cannot check a base class chosen at runtime; pool_class is a QueuePool
+    class InstrumentedPool(pool_class):  # type: ignore[valid-type,misc]
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            stats.pool = self
+
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                stats.record_timeout(time.perf_counter() - started)
+                raise
+            wait = time.perf_counter() - started
+            stats.record_checkout(wait)
+            record_stage("pool_checkout", wait)
+            return connection
+
+        def _do_return_conn(self, record):
+            # The checkin event is dispatched while the connection is still counted
+            # as checked out, so the usage is recorded after it has been returned
+            super()._do_return_conn(record)
+            stats.record_usage(self.size(), self.checkedout(), self.overflow())
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def instrument_engine(engine: Engine, stats: PoolStats):
+    """Records the size, checked out connections and overflow of engine's pool in
+    stats
+
+    :param engine: A synchronous engine, or the sync_engine of an AsyncEngine
+    :type engine: Engine
+    :param stats: The counters to update
+    :type stats: PoolStats
+    """
+
+    @event.listens_for(engine, "checkout")
+    def record_usage(dbapi_connection, connection_record, connection_proxy):
+        pool = stats.pool
+        stats.record_usage(pool.size(), pool.checkedout(), pool.overflow())
+
+    @event.listens_for(engine, "connect")
+    def record_connect(dbapi_connection, connection_record):
+        stats.record_connect()
@@ -0,0 +1,195 @@
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+
+from prometheus_client import Counter
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import SLOW_REQUEST_QUERY_COUNT, SLOW_REQUEST_SECONDS
+from app.metrics import RoutePaths, record_stage, registry
+
+logger = logging.getLogger(__name__)
+
+queries_total = Counter(
+    "hilo_db_queries",
+    "Database queries by the route of the request that ran them.",
+    ("route",),
+    registry=registry,
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """Normalizes a statement so that statements differing only in their literals,
+    parameters, the length of IN lists or whitespace have the same fingerprint
+
+    :param statement: A SQL statement
+    :type statement: str
+    :returns: The statement's fingerprint
+    :rtype: str
+    """
+
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _PARAMETER.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PARAMETER_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """The queries run while handling a request"""
+
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # The number of executions and total seconds of each statement fingerprint
+        self.statements: Dict[str, list] = {}
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        key = fingerprint(statement)
+        if (executions := self.statements.get(key)) is None:
+            self.statements[key] = [1, seconds]
+        else:
+            executions[0] += 1
+            executions[1] += seconds
+
+
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def instrument_queries(engine: Engine):
+    """Records the queries engine runs in the stats of the current request, and their
+    latency as the db_query stage
+
+    :param engine: A synchronous engine, or the sync_engine of an AsyncEngine
+    :type engine: Engine
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        record_stage("db_query", seconds)
+        if (stats := _request_queries.get()) is not None:
+            stats.record(statement, seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def drop_failed_query(exception_context):
+        # after_cursor_execute is not called for a statement that fails
+        if (connection := exception_context.connection) is not None:
+            started = connection.info.get("query_started")
+            if started:
+                started.pop()
+
+
+class QueryLogMiddleware:
+    """Counts the database queries of each HTTP request, and logs the requests that
+    run more than max_queries queries or take longer than max_seconds
+
+    Each log line is a JSON object with the request's route, status, latency, query
+    count and database time, and the executions of each statement fingerprint.
+
+    :param app: The ASGI application to wrap
+    :type app: ASGIApp
+    :param routes: The application's routes, used to find the route of a request
+    :type routes: Sequence
+    :param max_queries: The query count above which a request is logged, or 0
+    :type max_queries: int
+    :param max_seconds: The latency above which a request is logged, or 0
+    :type max_seconds: float
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Sequence,
+        max_queries: int = SLOW_REQUEST_QUERY_COUNT,
+        max_seconds: float = SLOW_REQUEST_SECONDS,
+    ):
+        self.app = app
+        self.route_path = RoutePaths(routes)
+        self.max_queries = max_queries
+        self.max_seconds = max_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            _request_queries.reset(token)
+
+            route = self.route_path(scope)
+            if stats.count:
+                queries_total.labels(route).inc(stats.count)
+            if (self.max_queries and stats.count > self.max_queries) or (
+                self.max_seconds and duration > self.max_seconds
+            ):
+                self.log(scope, route, status_code, duration, stats)
+
+    def log(
+        self,
+        scope: Scope,
+        route: str,
+        status_code: int,
+        duration: float,
+        stats: QueryStats,
+    ):
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "slow_request",
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status_code,
+                    "duration_seconds": round(duration, 6),
+                    "query_count": stats.count,
+                    "db_seconds": round(stats.seconds, 6),
+                    "statements": [
+                        {
+                            "fingerprint": key,
+                            "count": count,
+                            "seconds": round(seconds, 6),
+                        }
+                        for key, (count, seconds) in sorted(
+                            stats.statements.items(), key=lambda item: -item[1][1]
+                        )
+                    ],
+                }
+            )
+        )
@@ -0,0 +1,141 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable
+
+from app.config import (
+    RATE_LIMIT_IP_CAPACITY,
+    RATE_LIMIT_IP_REFILL_PER_SECOND,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_USERNAME_CAPACITY,
+    RATE_LIMIT_USERNAME_REFILL_PER_SECOND,
+)
+from app.errors import RateLimitExceededError
+
+
+class RateLimitBackend(ABC):
+    """Stores token buckets by key
+
+    Subclasses can keep the buckets in a store shared by every worker process, so
+    that a client's requests are limited across the whole deployment.
+    """
+
+    @abstractmethod
+    def consume(self, key: str, capacity: float, refill_rate: float) -> float:
+        """Takes a token from the bucket of key, which starts full
+
+        :param key: The key of the bucket
+        :type key: str
+        :param capacity: The maximum number of tokens in the bucket
+        :type capacity: float
+        :param refill_rate: The number of tokens added to the bucket every second,
+        which is positive
+        :type refill_rate: float
+        :returns: 0 if a token was taken, otherwise the number of seconds until the
+        bucket has a token
+        :rtype: float
+        """
+
+    @abstractmethod
+    def clear(self):
+        """Removes every bucket"""
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Keeps token buckets in this process, evicting the least recently used buckets
+
+    An evicted bucket starts full when its key is seen again, so max_keys should be
+    large enough to hold every client that is being limited.
+
+    :param max_keys: The maximum number of buckets
+    :type max_keys: int
+    """
+
+    def __init__(self, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def consume(self, key: str, capacity: float, refill_rate: float) -> float:
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(capacity, now)
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket.tokens = min(
+                    capacity, bucket.tokens + (now - bucket.updated_at) * refill_rate
+                )
+                bucket.updated_at = now
+                self._buckets.move_to_end(key)
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / refill_rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RateLimiter:
+    """Limits requests by key with token buckets kept in backend
+
+    :param capacity: The number of requests allowed in a burst, where 0 disables
+    the limiter
+    :type capacity: float
+    :param refill_rate: The number of requests allowed every second after a burst
+    :type refill_rate: float
+    :param backend: The store of the token buckets
+    :type backend: RateLimitBackend
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, backend: RateLimitBackend):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.backend = backend
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def check(self, key: str):
+        """Counts a request for key
+
+        :raises RateLimitExceededError: If key has no requests left
+        """
+
+        if not self.enabled:
+            return
+
+        retry_after = self.backend.consume(key, self.capacity, self.refill_rate)
+        if retry_after > 0:
+            raise RateLimitExceededError(retry_after)
+
+
+rate_limit_backend: RateLimitBackend = InMemoryRateLimitBackend(RATE_LIMIT_MAX_KEYS)
+ip_rate_limiter = RateLimiter(
+    RATE_LIMIT_IP_CAPACITY, RATE_LIMIT_IP_REFILL_PER_SECOND, rate_limit_backend
+)
+username_rate_limiter = RateLimiter(
+    RATE_LIMIT_USERNAME_CAPACITY,
+    RATE_LIMIT_USERNAME_REFILL_PER_SECOND,
+    rate_limit_backend,
+)
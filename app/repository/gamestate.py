@@ -1,9 +1,15 @@
-from typing import Optional
+from typing import AsyncContextManager, Optional, Tuple
 
-from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
-from app.errors import GameStateNotFoundError
+from app.errors import (
+    GameStateNotFoundError,
+    GameStateStoreNotFoundError,
+    GameStateVersionConflictError,
+)
+from app.gamestatecache import gamestate_cache
+from app.metrics import timed
 from app.repository.gamestatestore import GameStateStoreRepository
 from hilo.models.gamestate import GameState
 
@@ -12,44 +18,161 @@ class GameStateRepository:
     """Holds CRUD methods for attribute gamestate within the gaestate database table
 
     :param session: The database session
-    :type session: Session
+    :type session: AsyncSession
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def get(self, user_id: str) -> GameState:
-        """Gets a user's GameState from the gamestate database table
+    def locked(self, user_id: int) -> AsyncContextManager[None]:
+        """Serialises the requests of a user that read and then update their GameState,
+        when the gamestate cache is enabled
+
+        :param user_id: The user_id of the GameState
+        :type user_id: int
+        :return: A context manager that holds the user's lock in this process
+        :rtype: AsyncContextManager[None]
+        """
+
+        return gamestate_cache.locked(user_id)
+
+    async def get(self, user_id: int, for_update: bool = False) -> GameState:
+        """Gets a copy of a user's GameState from the gamestate cache, or else the
+        gamestate database table
 
         :param user_id: The GameState that should be returned from the gamestate database
         with the associated user_id
-        :type user_id: str
+        :type user_id: int
+        :param for_update: Whether to lock the gamestate's row until the session's
+        transaction ends, so that concurrent requests of the user are serialised. When
+        the gamestate cache is enabled, the row is not locked, and the caller must hold
+        locked(user_id) instead.
+        :type for_update: bool
         :return: The requested GameState
         :rtype: GameState
         :raises GameStateNotFoundError: If no GameState can be found with the given user_id
         """
 
+        if (gamestate := gamestate_cache.get(user_id)) is not None:
+            return gamestate
+
         try:
-            return GameStateStoreRepository(self.session).get(user_id).gamestate
+            with timed("gamestate_load"):
+                gamestatestore = await GameStateStoreRepository(self.session).get(
+                    user_id, for_update=for_update and not gamestate_cache.enabled
+                )
+            gamestate = gamestatestore.gamestate
         except AttributeError:
             raise GameStateNotFoundError("Gamestate not found")
 
-    def update(self, updated_gamestate: GameState, user_id: str) -> GameState:
-        """Updates a user's GameState from the gamestate database table
+        gamestate_cache.put(user_id, gamestate, gamestatestore.version)
+        return gamestate
+
+    async def get_with_version(self, user_id: int) -> Tuple[GameState, int]:
+        """Gets a copy of a user's GameState and its version from the gamestate cache,
+        or else the gamestate database table
+
+        :param user_id: The user_id of the GameState
+        :type user_id: int
+        :return: The requested GameState and its version
+        :rtype: Tuple[GameState, int]
+        :raises GameStateNotFoundError: If no GameState can be found with the given user_id
+        """
+
+        if (cached := gamestate_cache.get_with_version(user_id)) is not None:
+            return cached
+
+        try:
+            with timed("gamestate_load"):
+                gamestatestore = await GameStateStoreRepository(self.session).get(
+                    user_id
+                )
+        except GameStateStoreNotFoundError:
+            raise GameStateNotFoundError("Gamestate not found")
+
+        gamestate_cache.put(user_id, gamestatestore.gamestate, gamestatestore.version)
+        return gamestatestore.gamestate, gamestatestore.version
+
+    async def get_version(self, user_id: int) -> int:
+        """Gets the version of a user's GameState, which is incremented by every update,
+        without reading or decoding the GameState
+
+        :param user_id: The user_id of the GameState
+        :type user_id: int
+        :return: The version of the GameState
+        :rtype: int
+        :raises GameStateNotFoundError: If no GameState can be found with the given user_id
+        """
+
+        if (version := gamestate_cache.get_version(user_id)) is not None:
+            return version
+
+        try:
+            return await GameStateStoreRepository(self.session).get_version(user_id)
+        except GameStateStoreNotFoundError:
+            raise GameStateNotFoundError("Gamestate not found")
+
+    async def update(self, updated_gamestate: GameState, user_id: int) -> GameState:
+        """Updates a user's GameState from the gamestate database table, and increments
+        its version
+
+        When the gamestate cache is enabled, the update is only written to the cache,
+        which writes it to the database table later
 
         :param user_id: The GameState that should be updated from the gamestate database
         with the associated user_id
-        :type user_id: str
+        :type user_id: int
         :return: The updated GameState
         :rtype: GameState
         :raises GameStateNotFoundError: If no GameState can be found with the given user_id
         """
 
-        gamestatestore = GameStateStoreRepository(self.session).get(user_id)
+        if gamestate_cache.enabled:
+            version = await self.get_version(user_id)
+            gamestate_cache.put(user_id, updated_gamestate, version + 1, dirty=True)
+            return updated_gamestate
+
+        try:
+            with timed("gamestate_save"):
+                return await GameStateStoreRepository(self.session).update_gamestate(
+                    user_id, updated_gamestate
+                )
+        except GameStateStoreNotFoundError:
+            raise GameStateNotFoundError("Gamestate not found")
+
+    async def update_if_version(
+        self, updated_gamestate: GameState, user_id: int, version: int
+    ) -> int:
+        """Updates a user's GameState and increments its version, only if its version
+        is still the one updated_gamestate was computed from
+
+        :param updated_gamestate: The new GameState
+        :type updated_gamestate: GameState
+        :param user_id: The user_id of the GameState
+        :type user_id: int
+        :param version: The version of the GameState that updated_gamestate was
+        computed from
+        :type version: int
+        :return: The new version of the GameState
+        :rtype: int
+        :raises GameStateVersionConflictError: If the GameState has another version
+        """
 
-        if gamestatestore.gamestate:
-            gamestatestore.gamestate = updated_gamestate
-            self.session.commit()
-            return gamestatestore.gamestate
+        if gamestate_cache.enabled:
+            try:
+                current_version = await self.get_version(user_id)
+            except GameStateNotFoundError:
+                raise GameStateVersionConflictError("Gamestate was changed")
+            # The gamestate may have been cached and updated while its version was
+            # read from the database
+            if (cached_version := gamestate_cache.get_version(user_id)) is not None:
+                current_version = cached_version
+            if current_version != version:
+                raise GameStateVersionConflictError("Gamestate was changed")
+            gamestate_cache.put(user_id, updated_gamestate, version + 1, dirty=True)
+            return version + 1
 
-        raise GameStateNotFoundError("Gamestate not found")
+        with timed("gamestate_save"):
+            return await GameStateStoreRepository(
+                self.session
+            ).update_gamestate_if_version(user_id, updated_gamestate, version)
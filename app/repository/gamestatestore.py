@@ -1,20 +1,35 @@
+from typing import Dict, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.session import Session
 
 from app import models
-from app.errors import GameStateStoreNotFoundError
+from app.codec import GameStateType
+from app.errors import (
+    GameStateStoreNotFoundError,
+    GameStateVersionConflictError,
+    UserNotFoundError,
+)
+from app.metrics import timed
+from hilo.models.gamestate import GameState
 
 
 class GameStateStoreRepository:
     """Holds CRUD methods for the gamestate database table
 
     :param session: The database session
-    :type session: Session
+    :type session: AsyncSession
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def save(self, gamestatestore: models.GameStateStore) -> models.GameStateStore:
+    async def save(
+        self, gamestatestore: models.GameStateStore
+    ) -> models.GameStateStore:
         """Adds a gamestatestore model to the gamestate database table
 
         :param user: The gamestatestore model that should be added to the gamestate database
@@ -24,23 +39,184 @@ class GameStateStoreRepository:
         """
 
         self.session.add(gamestatestore)
-        self.session.commit()
+        with timed("commit"):
+            await self.session.commit()
         return gamestatestore
 
-    def get(self, user_id: str) -> models.GameStateStore:
+    async def create_gamestate(self, user_id: int, gamestate: GameState) -> GameState:
+        """Adds a gamestate for a user with INSERT ... ON CONFLICT (user_id) DO NOTHING
+
+        Should another request have created the user's gamestate first, that gamestate
+        is returned instead, so a user never has more than one gamestate.
+
+        :param user_id: The user_id of the user
+        :type user_id: int
+        :param gamestate: The gamestate to add
+        :type gamestate: GameState
+        :return: The user's gamestate
+        :rtype: GameState
+        :raises UserNotFoundError: If no user can be found with the given user_id
+        """
+
+        table = models.GameStateStore.__table__
+        try:
+            inserted_id = (
+                await self.session.execute(
+                    insert(table)
+                    .values(user_id=user_id, gamestate=gamestate)
+                    .on_conflict_do_nothing(index_elements=[table.c.user_id])
+                    .returning(table.c.id)
+                )
+            ).scalar()
+            with timed("commit"):
+                await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise UserNotFoundError("User with user_id not found")
+
+        if inserted_id is None:
+            return (await self.get(user_id)).gamestate
+        return gamestate
+
+    async def get(
+        self, user_id: int, for_update: bool = False
+    ) -> models.GameStateStore:
         """Gets a gamestatestore model from the gamestate database table
 
         :param user_id: The gamestatestore model that should be returned from the gamestate database
         with the associated user_id
-        :type user_id: str
+        :type user_id: int
+        :param for_update: Whether to lock the row with SELECT ... FOR UPDATE until the
+        session's transaction ends
+        :type for_update: bool
         :return: The requested gamestate model
         :rtype: models.GameStateStore
         :raises GameStateStoreNotFoundError: If no GameStateStore can be found with the given user_id
         """
 
-        if gamestatestore := (
-            self.session.query(models.GameStateStore).filter_by(user_id=user_id).first()
-        ):
+        query = select(models.GameStateStore).where(
+            models.GameStateStore.user_id == user_id
+        )
+        if for_update:
+            query = query.with_for_update()
+
+        if gamestatestore := (await self.session.execute(query)).scalars().first():
             return gamestatestore
 
         raise GameStateStoreNotFoundError("Gamestatestore not found")
+
+    async def get_version(self, user_id: int, for_update: bool = False) -> int:
+        """Gets the version of a user's gamestate without reading the gamestate
+
+        :param user_id: The user_id of the gamestatestore model
+        :type user_id: int
+        :param for_update: Whether to lock the row with SELECT ... FOR UPDATE until the
+        session's transaction ends
+        :type for_update: bool
+        :return: The version of the gamestate
+        :rtype: int
+        :raises GameStateStoreNotFoundError: If no GameStateStore can be found with the given user_id
+        """
+
+        table = models.GameStateStore.__table__
+        query = select(table.c.version).where(table.c.user_id == user_id)
+        if for_update:
+            query = query.with_for_update()
+        version = (await self.session.execute(query)).scalar()
+
+        if version is None:
+            raise GameStateStoreNotFoundError("Gamestatestore not found")
+        return version
+
+    async def update_gamestate(self, user_id: int, gamestate: GameState) -> GameState:
+        """Overwrites the gamestate of a gamestatestore model and increments its version
+        with a single UPDATE ... RETURNING
+
+        :param user_id: The user_id of the gamestatestore model that should be updated
+        :type user_id: int
+        :param gamestate: The new gamestate
+        :type gamestate: GameState
+        :return: The updated gamestate
+        :rtype: GameState
+        :raises GameStateStoreNotFoundError: If no GameStateStore can be found with the given user_id
+        """
+
+        table = models.GameStateStore.__table__
+        updated_id = (
+            await self.session.execute(
+                update(table)
+                .where(table.c.user_id == user_id)
+                .values(gamestate=gamestate, version=table.c.version + 1)
+                .returning(table.c.id)
+            )
+        ).scalar()
+        with timed("commit"):
+            await self.session.commit()
+
+        if updated_id is None:
+            raise GameStateStoreNotFoundError("Gamestatestore not found")
+        return gamestate
+
+    async def update_gamestate_if_version(
+        self, user_id: int, gamestate: GameState, version: int
+    ) -> int:
+        """Overwrites the gamestate of a gamestatestore model and increments its version,
+        only if its version is still version, with a single UPDATE ... RETURNING
+
+        :param user_id: The user_id of the gamestatestore model that should be updated
+        :type user_id: int
+        :param gamestate: The new gamestate
+        :type gamestate: GameState
+        :param version: The version of the gamestate that gamestate was computed from
+        :type version: int
+        :return: The new version of the gamestate
+        :rtype: int
+        :raises GameStateVersionConflictError: If the gamestate has another version, or
+        no GameStateStore can be found with the given user_id
+        """
+
+        table = models.GameStateStore.__table__
+        updated_version = (
+            await self.session.execute(
+                update(table)
+                .where(table.c.user_id == user_id)
+                .where(table.c.version == version)
+                .values(gamestate=gamestate, version=table.c.version + 1)
+                .returning(table.c.version)
+            )
+        ).scalar()
+        with timed("commit"):
+            await self.session.commit()
+
+        if updated_version is None:
+            raise GameStateVersionConflictError("Gamestate was changed")
+        return updated_version
+
+
+def update_gamestates(session: Session, records: Dict[int, Tuple[bytes, int]]):
+    """Overwrites the gamestate and version of many gamestatestore models with one
+    executemany
+
+    This runs on a synchronous session, as it is called by the gamestate cache's
+    flusher thread rather than the event loop.
+
+    :param session: The synchronous database session
+    :type session: Session
+    :param records: Encoded gamestates and their versions keyed by user_id
+    :type records: Dict[int, Tuple[bytes, int]]
+    """
+
+    table = models.GameStateStore.__table__
+    session.execute(
+        update(table)
+        .where(table.c.user_id == bindparam("b_user_id"))
+        .values(
+            gamestate=bindparam("b_gamestate", type_=GameStateType()),
+            version=bindparam("b_version"),
+        ),
+        [
+            {"b_user_id": user_id, "b_gamestate": record, "b_version": version}
+            for user_id, (record, version) in records.items()
+        ],
+    )
+    session.commit()
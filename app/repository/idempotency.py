@@ -0,0 +1,87 @@
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import IDEMPOTENCY_KEY_TTL_SECONDS
+from hilo.models.gamestate import GameState
+
+
+class IdempotencyKeyRepository:
+    """Holds CRUD methods for the idempotency_key database table
+
+    :param session: The database session
+    :type session: AsyncSession
+    :param ttl: The number of seconds a key is kept
+    :type ttl: float
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        ttl: float = IDEMPOTENCY_KEY_TTL_SECONDS,
+    ):
+        self.session = session
+        self.ttl = ttl
+
+    async def get(self, user_id: int, key: str) -> Optional[Tuple[str, GameState]]:
+        """Gets the fingerprint of a user's request with key, and the gamestate that
+        resulted from it
+
+        :param user_id: The user_id of the user who made the request
+        :type user_id: int
+        :param key: The request's Idempotency-Key
+        :type key: str
+        :return: The fingerprint and gamestate, or None if the key is unknown or has
+        expired
+        :rtype: Optional[Tuple[str, GameState]]
+        """
+
+        table = models.IdempotencyKey.__table__
+        row = (
+            await self.session.execute(
+                select(table.c.fingerprint, table.c.gamestate)
+                .where(table.c.user_id == user_id)
+                .where(table.c.key == key)
+                .where(table.c.created_at > time.time() - self.ttl)
+            )
+        ).first()
+        if row is None:
+            return None
+        return row.fingerprint, row.gamestate
+
+    async def add(self, user_id: int, key: str, fingerprint: str, gamestate: GameState):
+        """Adds the gamestate that resulted from a user's request with key, and deletes
+        the user's expired keys, without committing
+
+        The record is committed by the session's next commit, so that it is written
+        in the same transaction as the gamestate it holds.
+
+        :param user_id: The user_id of the user who made the request
+        :type user_id: int
+        :param key: The request's Idempotency-Key
+        :type key: str
+        :param fingerprint: The fingerprint of the request's body
+        :type fingerprint: str
+        :param gamestate: The gamestate that resulted from the request
+        :type gamestate: GameState
+        """
+
+        table = models.IdempotencyKey.__table__
+        now = time.time()
+        await self.session.execute(
+            delete(table)
+            .where(table.c.user_id == user_id)
+            .where(table.c.created_at <= now - self.ttl)
+        )
+        await self.session.execute(
+            insert(table).values(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                gamestate=gamestate,
+                created_at=now,
+            )
+        )
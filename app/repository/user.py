@@ -1,23 +1,25 @@
 from typing import Union
 
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError, InvalidRequestError
-from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
 from app.errors import InvalidUserQueryError, UsernameNotUniqueError, UserNotFoundError
+from app.metrics import timed
 
 
 class UserRepository:
     """Holds CRUD methods for the user database table
 
     :param session: The database session
-    :type session: Session
+    :type session: AsyncSession
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def save(self, user: models.User) -> models.User:
+    async def save(self, user: models.User) -> models.User:
         """Adds a new user to the user database table
 
         :param user: The user model that should be added to the database
@@ -27,13 +29,31 @@ class UserRepository:
         """
         try:
             self.session.add(user)
-            self.session.commit()
+            with timed("commit"):
+                await self.session.commit()
             return user
 
         except IntegrityError:
+            await self.session.rollback()
             raise UsernameNotUniqueError
 
-    def get(self, **filters: Union[str, int]) -> models.User:
+    async def update_password(self, user: models.User, password: str) -> models.User:
+        """Replaces the hashed password of a user
+
+        :param user: The user model whose password should be replaced
+        :type user: models.User
+        :param password: The new hashed password
+        :type password: str
+        :return: The updated user model
+        :rtype: models.User
+        """
+
+        user.password = password
+        with timed("commit"):
+            await self.session.commit()
+        return user
+
+    async def get(self, **filters: Union[str, int]) -> models.User:
         """Gets a user from the user database table
 
         :param filters: kwargs for the user_id or username, used as a filter to get
@@ -47,9 +67,12 @@ class UserRepository:
         """
 
         try:
-            if user := self.session.query(models.User).filter_by(**filters).first():
-                return user
+            # sqlalchemy-stubs predates the filter_by of 1.4's select()
+            query = select(models.User).filter_by(**filters)  # type: ignore[attr-defined]
         except InvalidRequestError:
             raise InvalidUserQueryError("Invalid kwarg for **filters")
 
+        if user := (await self.session.execute(query)).scalars().first():
+            return user
+
         raise UserNotFoundError
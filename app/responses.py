@@ -0,0 +1,152 @@
+from typing import Any, Iterable, Optional, Tuple
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from starlette import status
+
+from hilo.models.card import CARDS, Card
+from hilo.models.gamestate import GameState
+from hilo.models.roundresult import RoundResult
+
+# Clients may store gamestates, but must revalidate them with If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+# The CardOut of each card, encoded once and indexed by card_id
+CARD_JSON: Tuple[bytes, ...] = tuple(
+    orjson.dumps({"rank": card.rank, "suit": card.suit, "name": card.name})
+    for card in CARDS
+)
+
+
+def card_json(card: Optional[Card]) -> bytes:
+    return b"null" if card is None else CARD_JSON[card.card_id]
+
+
+def bool_json(value: Optional[bool]) -> bytes:
+    if value is None:
+        return b"null"
+    return b"true" if value else b"false"
+
+
+def gamestate_start_json(gamestate: GameState) -> bytes:
+    """Encodes a gamestate as a schemas.GameStateStartOut
+
+    :param gamestate: The gamestate to encode
+    :type gamestate: GameState
+    :returns: The JSON encoded response body
+    :rtype: bytes
+    """
+
+    return b'{"player_name":%b,"money":%d,"round":%d,"base_card":%b}' % (
+        orjson.dumps(gamestate.player_name),
+        gamestate.money,
+        gamestate.round,
+        card_json(gamestate.base_card),
+    )
+
+
+def gamestate_end_json(gamestate: GameState) -> bytes:
+    """Encodes a gamestate as a schemas.GameStateEndOut
+
+    :param gamestate: The gamestate to encode
+    :type gamestate: GameState
+    :returns: The JSON encoded response body
+    :rtype: bytes
+    """
+
+    return (
+        b'{"player_name":%b,"money":%d,"round":%d,"base_card":%b,'
+        b'"next_card":%b,"win":%b}'
+        % (
+            orjson.dumps(gamestate.player_name),
+            gamestate.money,
+            gamestate.round,
+            card_json(gamestate.base_card),
+            card_json(gamestate.next_card),
+            bool_json(gamestate.win),
+        )
+    )
+
+
+def round_result_json(round_result: RoundResult) -> bytes:
+    return (
+        b'{"round":%d,"base_card":%b,"next_card":%b,"prediction":"%b",'
+        b'"bet":%d,"win":%b,"money":%d}'
+        % (
+            round_result.round,
+            CARD_JSON[round_result.base_card.card_id],
+            CARD_JSON[round_result.next_card.card_id],
+            round_result.prediction.value.encode(),
+            round_result.bet,
+            bool_json(round_result.win),
+            round_result.money,
+        )
+    )
+
+
+def gamestate_batch_json(
+    gamestate: GameState, round_results: Iterable[RoundResult], error: Optional[str]
+) -> bytes:
+    """Encodes the result of a batch of rounds as a schemas.GameStateBatchOut
+
+    :param gamestate: The gamestate after the batch
+    :type gamestate: GameState
+    :param round_results: The result of each round that was played
+    :type round_results: Iterable[RoundResult]
+    :param error: The error code that stopped the batch early, if any
+    :type error: Optional[str]
+    :returns: The JSON encoded response body
+    :rtype: bytes
+    """
+
+    return b'%b,"rounds":[%b],"error":%b}' % (
+        gamestate_end_json(gamestate)[:-1],
+        b",".join(round_result_json(round_result) for round_result in round_results),
+        orjson.dumps(error),
+    )
+
+
+def gamestate_etag(user_id: int, version: int) -> str:
+    """Creates a strong ETag for the given version of a user's gamestate"""
+
+    return f'"{user_id}.{version}"'
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Checks whether an If-None-Match header lists etag
+
+    :param etag: The current ETag of the resource
+    :type etag: str
+    :param if_none_match: The value of the If-None-Match header, if any
+    :type if_none_match: Optional[str]
+    :rtype: bool
+    """
+
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+class JSONBytesResponse(ORJSONResponse):
+    """Encodes response bodies with orjson, and sends bytes as already encoded JSON
+
+    Routes that return a JSONBytesResponse of bytes skip response_model validation
+    and jsonable_encoder entirely, so those bytes must match the response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return super().render(content)
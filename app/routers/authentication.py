@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
-from app.database import get_session
+from app.database import get_async_session
+from app.dependencies import limit_requests_by_client_ip, limit_requests_by_username
 from app.errors import (
     INVALID_CREDENTIALS,
+    SERVICE_BUSY,
     InvalidCredentialsError,
     InvalidUserQueryError,
+    PasswordHasherBusyError,
     UserNotFoundError,
 )
 from app.services.authentication import get_access_token
@@ -18,24 +21,28 @@ router = APIRouter(tags=["Authentication"])
     "/login",
     status_code=status.HTTP_200_OK,
     response_model=schemas.TokenOut,
+    dependencies=[Depends(limit_requests_by_client_ip)],
 )
-def login(
+async def login(
     request: schemas.UserIn,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     """Creates a JWT access token for an authenticated user
 
     :param request: The request body for users to key in their authentication credentials
     :type: schemas.UserIn
     :param session: The database that user's credentials are authenticated with
-    :type session: Session
+    :type session: AsyncSession
     :returns: A created JWT access token
     :rtype: schemas.TokenOut
-    :raises HTTPException: if token validation fails
+    :raises HTTPException: if token validation fails, the client is rate limited,
+    or the password hasher is busy
     """
 
+    limit_requests_by_username("/login", request.username)
+
     try:
-        return get_access_token(request, session)
+        return await get_access_token(request, session)
 
     except InvalidCredentialsError:
         raise HTTPException(
@@ -54,3 +61,10 @@ def login(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"error": INVALID_CREDENTIALS},
         )
+
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": SERVICE_BUSY},
+            headers={"Retry-After": "1"},
+        )
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, status
+
+from app.database import async_pool_stats, pool_stats
+
+router = APIRouter(tags=["database"], prefix="/database")
+
+
+@router.get("/pool", status_code=status.HTTP_200_OK)
+async def get_pool_stats():
+    """Gets the usage of the synchronous and asynchronous connection pools
+
+    :returns: The pools' sizes, current and peak usage, checkout counts and wait times
+    :rtype: dict
+    """
+
+    return {
+        "sync": pool_stats.snapshot(),
+        "async": async_pool_stats.snapshot(),
+    }
@@ -1,75 +1,107 @@
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import Any, Optional
+
+import orjson
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 from jose.exceptions import JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
-from app.database import get_session
+from app.database import get_async_session
+from app.dependencies import get_current_principal
 from app.errors import (
     GAME_NOT_CREATED,
+    IDEMPOTENCY_KEY_REUSED,
     INVALID_BET,
     INVALID_CARD_COMPARISON_ERROR,
-    MISSING_AUTHENTICATION_TOKEN,
+    MALFORMED_REQUEST_ERROR,
     ROUND_NOT_ENDED,
     ROUND_NOT_STARTED,
-    TOKEN_AUTHENTICATION_FAILED,
     USER_NOT_FOUND,
     GameStateNotFoundError,
     GameStateStoreNotFoundError,
+    GameStateVersionConflictError,
+    IdempotencyKeyReusedError,
     InvalidAuthenticationTokenError,
     MissingAuthenticationTokenError,
     RoundNotEndedError,
     RoundNotStartedError,
     UserNotFoundError,
 )
+from app.idempotency import (
+    IDEMPOTENCY_KEY_MAX_LENGTH,
+    fingerprint_request,
+    idempotency_cache,
+)
+from app.metrics import timed
 from app.repository.gamestate import GameStateRepository
-from app.schemas import GameStateEndOut, GameStateStartOut
+from app.responses import (
+    CACHE_CONTROL,
+    JSONBytesResponse,
+    etag_matches,
+    gamestate_batch_json,
+    gamestate_end_json,
+    gamestate_etag,
+    gamestate_start_json,
+    not_modified_response,
+)
+from app.schemas import GameStateBatchOut, GameStateEndOut, GameStateStartOut, OddsOut
 from app.services import gamestate
-from app.token import get_user_id
+from app.services.gamechannel import GameChannel
+from app.token import Principal, get_principal
 from hilo.errors import CardComparatorError, InvalidBetError
+from hilo.models.prediction import Prediction
 
 router = APIRouter(
     tags=["game"],
     prefix="/game",
-    dependencies=[Depends(get_session)],
+    dependencies=[Depends(get_async_session)],
+    default_response_class=JSONBytesResponse,
 )
 
+# APIRouter.websocket does not apply the router's prefix, so the WebSocket route
+# is kept on a router without one
+websocket_router = APIRouter(tags=["game"])
+
 
 @router.get("/info", status_code=status.HTTP_200_OK, response_model=GameStateStartOut)
-def get_latest_gamestate(
-    token: str = Header(None),
-    session: Session = Depends(get_session),
+async def get_latest_gamestate(
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """Gets a user's latest gamestate
+    """Gets a user's latest gamestate, or 304 Not Modified if it is unchanged
 
-    :param token: The JWT access token containing the user's user_id
-    :type token: str
+    :param principal: The user authenticated by the request's JWT access token
+    :type principal: Principal
     :param session: The database containing the user's latest gamestate
-    :type session: Session
-    :returns: The user's latest gamestate
+    :type session: AsyncSession
+    :param if_none_match: The ETags of the gamestates the client already has
+    :type if_none_match: Optional[str]
+    :returns: The user's latest gamestate, with an ETag of its version
     :rtype: schemas.GameStateStartOut
     :raises HTTPException: if token or gamestate validation fails
     """
 
+    repository = GameStateRepository(session)
     try:
-        user_id = get_user_id(token)
-    except MissingAuthenticationTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"error": MISSING_AUTHENTICATION_TOKEN},
-        )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"error": TOKEN_AUTHENTICATION_FAILED},
-        )
-    except InvalidAuthenticationTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"error": TOKEN_AUTHENTICATION_FAILED},
+        # The version is read before the gamestate, so the gamestate is never older
+        # than its ETag
+        etag = gamestate_etag(
+            principal.user_id, await repository.get_version(principal.user_id)
         )
+        if etag_matches(etag, if_none_match):
+            return not_modified_response(etag)
 
-    try:
-        return GameStateRepository(session).get(user_id)
+        latest_gamestate = await repository.get(principal.user_id)
 
     except GameStateNotFoundError:
         raise HTTPException(
@@ -82,50 +114,35 @@ def get_latest_gamestate(
             detail={"error": GAME_NOT_CREATED},
         )
 
+    with timed("serialize"):
+        body = gamestate_start_json(latest_gamestate)
+    return JSONBytesResponse(
+        body, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
 
 @router.get(
     "/game",
     status_code=status.HTTP_201_CREATED,
     response_model=GameStateStartOut,
 )
-def start_round(
-    token: str = Header(None),
-    session: Session = Depends(get_session),
+async def start_round(
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session),
 ):
     """Creates a new hilo game for bankrupted users or new users, and creates a new round of hilo
 
-    :param token: The JWT access token containing the user's user_id
-    :type token: str
+    :param principal: The user authenticated by the request's JWT access token
+    :type principal: Principal
     :param session: The database containing the user's latest gamestate
-    :type session: Session
+    :type session: AsyncSession
     :returns: The gamestate information of a new round
     :rtype: schemas.GameStateResponse
     :raises HTTPException: if token or gamestate validation fails
     """
-    try:
-        user_id = get_user_id(token)
-    except MissingAuthenticationTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={
-                "error": MISSING_AUTHENTICATION_TOKEN,
-            },
-        )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={
-                "error": TOKEN_AUTHENTICATION_FAILED,
-            },
-        )
-    except InvalidAuthenticationTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"error": TOKEN_AUTHENTICATION_FAILED},
-        )
 
     try:
-        return gamestate.start_round(user_id, session)
+        new_gamestate = await gamestate.start_round(principal, session)
 
     except UserNotFoundError:
         raise HTTPException(
@@ -140,50 +157,67 @@ def start_round(
             detail={"error": ROUND_NOT_ENDED},
         )
 
+    with timed("serialize"):
+        body = gamestate_start_json(new_gamestate)
+    return JSONBytesResponse(body, status_code=status.HTTP_201_CREATED)
+
 
 @router.post("/play", status_code=status.HTTP_200_OK, response_model=GameStateEndOut)
-def end_round(
+async def end_round(
     request: schemas.HiloChoicesIn,
-    token: str = Header(None),
-    session: Session = Depends(get_session),
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(
+        None, min_length=1, max_length=IDEMPOTENCY_KEY_MAX_LENGTH
+    ),
 ):
     """Concludes a game of hilo based on user's choices
 
+    Requests retried with the same Idempotency-Key and body get the result of the
+    first request, with an Idempotent-Replayed header, instead of being played again.
+    Requests that reuse a key with another body are rejected.
+
     :param request: The user's in-game choices for the current round of hilo
     :type request: schemas.HiloChoicesIn
-    :param token: The JWT access token containing the user's user_id
-    :type token: str
+    :param principal: The user authenticated by the request's JWT access token
+    :type principal: Principal
     :param session: The database containing the user's latest gamestate
-    :type session: Session
+    :type session: AsyncSession
+    :param idempotency_key: A key the client chose for the round it is playing
+    :type idempotency_key: Optional[str]
     :returns: The gamestate information of a new round
     :rtype: schemas.GameStateResponse
     :raises HTTPException: if token, gamestate, or "request" validation fails
     """
 
-    try:
-        user_id = get_user_id(token)
-    except MissingAuthenticationTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={
-                "error": MISSING_AUTHENTICATION_TOKEN,
-            },
-        )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={
-                "error": TOKEN_AUTHENTICATION_FAILED,
-            },
-        )
-    except InvalidAuthenticationTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"error": TOKEN_AUTHENTICATION_FAILED},
+    async def play_idempotently(key: str, fingerprint: str):
+        updated_gamestate, replayed = await gamestate.end_round_idempotently(
+            principal.user_id,
+            session,
+            request.prediction,
+            request.bet,
+            key,
+            fingerprint,
         )
+        with timed("serialize"):
+            return gamestate_end_json(updated_gamestate), replayed
 
+    replayed = False
     try:
-        return gamestate.end_round(user_id, session, request.prediction, request.bet)
+        if idempotency_key is None:
+            updated_gamestate = await gamestate.end_round(
+                principal.user_id, session, request.prediction, request.bet
+            )
+            with timed("serialize"):
+                body = gamestate_end_json(updated_gamestate)
+        else:
+            key = idempotency_key
+            fingerprint = fingerprint_request(request.prediction, request.bet)
+            body, replayed = await idempotency_cache.run(
+                (principal.user_id, key),
+                fingerprint,
+                lambda: play_idempotently(key, fingerprint),
+            )
     except GameStateNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -224,3 +258,213 @@ def end_round(
                 "error": INVALID_CARD_COMPARISON_ERROR,
             },
         )
+    except IdempotencyKeyReusedError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": IDEMPOTENCY_KEY_REUSED},
+        )
+
+    return JSONBytesResponse(
+        body, headers={"Idempotent-Replayed": "true"} if replayed else {}
+    )
+
+
+@router.post(
+    "/play-batch", status_code=status.HTTP_200_OK, response_model=GameStateBatchOut
+)
+async def play_batch(
+    request: schemas.HiloBatchChoicesIn,
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Plays consecutive rounds of hilo based on user's choices, stopping early if
+    the user goes bankrupt or places an invalid bet
+
+    :param request: The user's in-game choices for each round of hilo
+    :type request: schemas.HiloBatchChoicesIn
+    :param principal: The user authenticated by the request's JWT access token
+    :type principal: Principal
+    :param session: The database containing the user's latest gamestate
+    :type session: AsyncSession
+    :returns: The result of each round played and the final gamestate
+    :rtype: schemas.GameStateBatchOut
+    :raises HTTPException: if token, gamestate, or "request" validation fails
+    """
+
+    choices = [(choice.prediction, choice.bet) for choice in request.choices]
+
+    try:
+        round_results, updated_gamestate = await gamestate.play_batch(
+            principal.user_id, session, choices
+        )
+    except GameStateNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": GAME_NOT_CREATED},
+        )
+    except GameStateStoreNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": GAME_NOT_CREATED},
+        )
+    except CardComparatorError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": INVALID_CARD_COMPARISON_ERROR},
+        )
+
+    is_stopped_by_bet = (
+        len(round_results) < len(choices) and not updated_gamestate.is_bankrupt()
+    )
+
+    with timed("serialize"):
+        body = gamestate_batch_json(
+            updated_gamestate,
+            round_results,
+            INVALID_BET if is_stopped_by_bet else None,
+        )
+    return JSONBytesResponse(body)
+
+
+@router.get("/odds", status_code=status.HTTP_200_OK, response_model=OddsOut)
+async def get_odds(
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Gets the odds of the next card being higher or lower than the user's base card
+
+    :param principal: The user authenticated by the request's JWT access token
+    :type principal: Principal
+    :param session: The database containing the user's latest gamestate
+    :type session: AsyncSession
+    :returns: The odds for the user's current round
+    :rtype: schemas.OddsOut
+    :raises HTTPException: if token or gamestate validation fails
+    """
+
+    try:
+        return await gamestate.get_odds(principal.user_id, session)
+    except GameStateNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": GAME_NOT_CREATED},
+        )
+    except GameStateStoreNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": GAME_NOT_CREATED},
+        )
+    except RoundNotStartedError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": ROUND_NOT_STARTED},
+        )
+    except CardComparatorError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": INVALID_CARD_COMPARISON_ERROR},
+        )
+
+
+def __error_json(error: str) -> bytes:
+    return b'{"error":"%b"}' % error.encode()
+
+
+async def __handle_game_message(channel: GameChannel, message: Any) -> bytes:
+    """Plays a message received on /game/ws on the channel's gamestate
+
+    :param channel: The connection's resident game
+    :type channel: GameChannel
+    :param message: {"action": "start"} or
+    {"action": "play", "prediction": "Higher" | "Lower", "bet": int}
+    :type message: Any
+    :returns: The JSON encoded reply, in the shape of the matching HTTP response body
+    :rtype: bytes
+    :raises GameStateVersionConflictError: if the game was changed by another request
+    since the channel last saved it
+    """
+
+    action = message.get("action") if isinstance(message, dict) else None
+
+    if action == "start":
+        try:
+            return gamestate_start_json(await channel.start_round())
+        except UserNotFoundError:
+            return __error_json(USER_NOT_FOUND)
+        except RoundNotEndedError:
+            return __error_json(ROUND_NOT_ENDED)
+
+    if action == "play":
+        if "bet" not in message:
+            return __error_json(MALFORMED_REQUEST_ERROR)
+        bet = message["bet"]
+        if not isinstance(bet, int) or isinstance(bet, bool) or bet < 1:
+            return __error_json(INVALID_BET)
+        try:
+            prediction = Prediction(message.get("prediction"))
+        except ValueError:
+            return __error_json(MALFORMED_REQUEST_ERROR)
+
+        try:
+            return gamestate_end_json(await channel.play(prediction, bet))
+        except GameStateNotFoundError:
+            return __error_json(GAME_NOT_CREATED)
+        except RoundNotStartedError:
+            return __error_json(ROUND_NOT_STARTED)
+        except InvalidBetError:
+            return __error_json(INVALID_BET)
+        except CardComparatorError:
+            return __error_json(INVALID_CARD_COMPARISON_ERROR)
+
+    return __error_json(MALFORMED_REQUEST_ERROR)
+
+
+@websocket_router.websocket("/game/ws")
+async def play_over_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """Plays rounds of hilo over a WebSocket, authenticating once per connection
+
+    Each text message is a JSON object with an "action" of "start" or "play", and
+    is answered with the body that GET /game/game or POST /game/play would return.
+    The gamestate stays loaded for the connection, and each round is saved before
+    it is answered. If another request changed the game since the connection last
+    saved it, the round is neither saved nor answered, and the connection is closed
+    with code 1013.
+
+    :param websocket: The WebSocket connection
+    :type websocket: WebSocket
+    :param token: The JWT access token, which may also be sent as a "token" header
+    :type token: Optional[str]
+    """
+
+    try:
+        principal = get_principal(token or websocket.headers.get("token"))
+    except (MissingAuthenticationTokenError, InvalidAuthenticationTokenError, JWTError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    try:
+        channel = await GameChannel.open(principal)
+    except Exception:
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        raise
+
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = orjson.loads(text)
+            except orjson.JSONDecodeError:
+                reply = __error_json(MALFORMED_REQUEST_ERROR)
+            else:
+                try:
+                    reply = await __handle_game_message(channel, message)
+                except GameStateVersionConflictError:
+                    # The game was changed by another request, so the client has to
+                    # reconnect to continue from the stored gamestate
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                    return
+
+            await websocket.send_text(reply.decode())
+    except WebSocketDisconnect:
+        pass
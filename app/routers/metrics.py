@@ -0,0 +1,19 @@
+from fastapi import APIRouter, status
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK, response_class=Response)
+async def get_metrics():
+    """Gets the request, stage, query and connection pool metrics of every server
+    worker in the Prometheus text format
+
+    :returns: The metrics
+    :rtype: Response
+    """
+
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
@@ -1,9 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
-from app.database import get_session
-from app.errors import USERNAME_TAKEN, UsernameNotUniqueError
+from app.database import get_async_session
+from app.dependencies import limit_requests_by_client_ip, limit_requests_by_username
+from app.errors import (
+    SERVICE_BUSY,
+    USERNAME_TAKEN,
+    PasswordHasherBusyError,
+    UsernameNotUniqueError,
+)
 from app.services import user
 
 router = APIRouter(tags=["user"], prefix="/user")
@@ -13,24 +19,37 @@ router = APIRouter(tags=["user"], prefix="/user")
     "/new",
     status_code=status.HTTP_201_CREATED,
     response_model=schemas.UserOut,
+    dependencies=[Depends(limit_requests_by_client_ip)],
 )
-def create_user(request: schemas.UserIn, session: Session = Depends(get_session)):
+async def create_user(
+    request: schemas.UserIn, session: AsyncSession = Depends(get_async_session)
+):
     """Creates and stores a new user in a database
 
     :param request: The request body for users to input their new account credentials
     :type: schemas.UserIn
     :param session: The database that user's credentials are uploaded to
-    :type session: Session
+    :type session: AsyncSession
     :returns: The user's username
     :rtype: schemas.UserOut
-    :raises HTTPException: If username validation fails
+    :raises HTTPException: If username validation fails, the client is rate limited,
+    or the password hasher is busy
     """
 
+    limit_requests_by_username("/user/new", request.username)
+
     try:
-        return user.create_user(request, session)
+        return await user.create_user(request, session)
 
     except UsernameNotUniqueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"error": USERNAME_TAKEN},
         )
+
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": SERVICE_BUSY},
+            headers={"Retry-After": "1"},
+        )
@@ -1,7 +1,7 @@
-from typing import Optional
+from typing import List, Optional
 
 from fastapi.exceptions import HTTPException
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, conlist
 from pydantic.class_validators import validator
 from pydantic.types import NonNegativeInt, PositiveInt, SecretStr
 from starlette import status
@@ -11,6 +11,8 @@ from hilo.errors import InvalidBetError
 from hilo.models.gamestate import GameState
 from hilo.models.prediction import Prediction
 
+MAXIMUM_BATCH_ROUNDS = 500
+
 
 class UserIn(BaseModel):
     """A request body to create users
@@ -86,6 +88,16 @@ class HiloChoicesIn(BaseModel):
         return bet
 
 
+class HiloBatchChoicesIn(BaseModel):
+    """A request body for users to input their game choices for consecutive rounds of hilo
+
+    :param choices: The user's prediction and bet for each round, in the order they are played
+    :type choices: List[HiloChoicesIn], max_items=MAXIMUM_BATCH_ROUNDS
+    """
+
+    choices: conlist(HiloChoicesIn, min_items=1, max_items=MAXIMUM_BATCH_ROUNDS)  # type: ignore
+
+
 class LoginIn(BaseModel):
     """A request body for users to key in their credentials
 
@@ -160,3 +172,66 @@ class GameStateEndOut(GameStateStartOut):
 
     next_card: Optional[CardOut]
     win: Optional[bool]
+
+
+class RoundOut(BaseModel):
+    """A response body for a single round of hilo played in a batch
+
+    :param round: The round number
+    :type round: int
+    :param base_card: The base card of the round
+    :type base_card: CardOut
+    :param next_card: The card compared with the base card
+    :type next_card: CardOut
+    :param prediction: The user's prediction for the round
+    :type prediction: Prediction
+    :param bet: The user's bet for the round
+    :type bet: PositiveInt
+    :param win: The result of the round
+    :type win: bool
+    :param money: The amount of money the user had after the round
+    :type money: NonNegativeInt
+    """
+
+    round: int
+    base_card: CardOut
+    next_card: CardOut
+    prediction: Prediction
+    bet: PositiveInt
+    win: bool
+    money: NonNegativeInt
+
+
+class GameStateBatchOut(GameStateEndOut):
+    """A response body when users play consecutive rounds of hilo
+
+    :param rounds: The result of each round that was played
+    :type rounds: List[RoundOut]
+    :param error: The error code that stopped the batch early, if any
+    :type error: Optional[str]
+    """
+
+    rounds: List[RoundOut]
+    error: Optional[str]
+
+
+class OddsOut(BaseModel):
+    """A response body with the odds of the next card being higher or lower than the base card
+
+    :param cards_remaining: The number of cards left in the deck
+    :type cards_remaining: NonNegativeInt
+    :param cards_higher: The number of remaining cards higher than the base card
+    :type cards_higher: NonNegativeInt
+    :param cards_lower: The number of remaining cards lower than the base card
+    :type cards_lower: NonNegativeInt
+    :param probability_higher: The probability that the next card is higher
+    :type probability_higher: float
+    :param probability_lower: The probability that the next card is lower
+    :type probability_lower: float
+    """
+
+    cards_remaining: NonNegativeInt
+    cards_higher: NonNegativeInt
+    cards_lower: NonNegativeInt
+    probability_higher: float
+    probability_lower: float
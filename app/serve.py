@@ -0,0 +1,123 @@
+import glob
+import logging
+import os
+import sys
+import tempfile
+from contextlib import ExitStack
+from typing import Any, Dict
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from app.config import (
+    GAMESTATE_CACHE_MAX_SIZE,
+    METRICS_MULTIPROCESS_DIR_VARIABLE,
+    SERVER_BACKLOG,
+    SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    SERVER_HOST,
+    SERVER_HTTP,
+    SERVER_KEEP_ALIVE_SECONDS,
+    SERVER_LIMIT_CONCURRENCY,
+    SERVER_LIMIT_MAX_REQUESTS,
+    SERVER_LOOP,
+    SERVER_PORT,
+    SERVER_PRELOAD,
+    SERVER_WORKERS,
+)
+
+logger = logging.getLogger("gunicorn.error")
+
+
+class Worker(UvicornWorker):
+    """A gunicorn worker that serves the application with uvicorn, using the
+    SERVER_* event loop, HTTP parser and concurrency limit"""
+
+    CONFIG_KWARGS = {
+        "loop": SERVER_LOOP,
+        "http": SERVER_HTTP,
+        "lifespan": "on",
+        "limit_concurrency": SERVER_LIMIT_CONCURRENCY or None,
+    }
+
+
+class Server(BaseApplication):
+    """Serves the application with gunicorn, which forks the workers, replaces the
+    ones that exit, and stops them gracefully
+
+    :param options: The gunicorn settings
+    :type options: Dict[str, Any]
+    """
+
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+
+        return app
+
+
+def discard_worker_metrics(server, worker):
+    """Removes the gauges of a worker that exited from the metrics of the workers, so
+    that its last pool usage is not added to that of the live workers"""
+
+    # prometheus_client must first be imported after main has set the directory
+    # where the workers record their metrics
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def get_server_options() -> Dict[str, Any]:
+    """Gets the gunicorn settings from the SERVER_* settings
+
+    :returns: The gunicorn settings
+    :rtype: Dict[str, Any]
+    """
+
+    return {
+        "bind": f"{SERVER_HOST}:{SERVER_PORT}",
+        "workers": max(SERVER_WORKERS, 1),
+        "worker_class": Worker,
+        # Importing the application once before forking lets workers start faster
+        # and share its memory until it is written to
+        "preload_app": SERVER_PRELOAD,
+        "graceful_timeout": SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        "max_requests": SERVER_LIMIT_MAX_REQUESTS,
+        "backlog": SERVER_BACKLOG,
+        "keepalive": SERVER_KEEP_ALIVE_SECONDS,
+        "child_exit": discard_worker_metrics,
+    }
+
+
+def main() -> int:
+    """Serves the application with the SERVER_* settings
+
+    :returns: The exit code
+    :rtype: int
+    """
+
+    if SERVER_WORKERS > 1 and GAMESTATE_CACHE_MAX_SIZE > 0:
+        # Each worker would cache and write back its own copies of gamestates
+        logger.error("GAMESTATE_CACHE_MAX_SIZE requires SERVER_WORKERS=1")
+        return 1
+
+    with ExitStack() as stack:
+        # The workers record their metrics in files in this directory, so that
+        # whichever worker is scraped reports the sum over all of them
+        if (directory := os.environ.get(METRICS_MULTIPROCESS_DIR_VARIABLE)) is None:
+            directory = stack.enter_context(tempfile.TemporaryDirectory())
+            os.environ[METRICS_MULTIPROCESS_DIR_VARIABLE] = directory
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+        Server(get_server_options()).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
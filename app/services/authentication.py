@@ -1,51 +1,67 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
 from app.errors import InvalidCredentialsError, InvalidUserQueryError, UserNotFoundError
-from app.hashing import verify_password
+from app.hashing import password_hasher
 from app.repository.user import UserRepository
 from app.token import create_access_token
 
 
-def __authenticate_user(user: models.User, password: str) -> None:
+async def __authenticate_user(
+    user: models.User, password: str, session: AsyncSession
+) -> None:
     """Authenticates a user with a username and password combination
 
+    The user's password is rehashed if it was hashed with a different bcrypt cost.
+
     :param user: The user information that will be verified against a given password string
     :type user: models.User
     :param password: The password string that will be verified against a given user information
     :type password: str
+    :param session: The database that a rehashed password is saved to
+    :type session: AsyncSession
     :returns: None if user passes all authentication checks
     :rtype: None
     :raises InvalidCredentialsError: If users key in invalid credentials into "user"
+    :raises PasswordHasherBusyError: If too many password operations are pending
     """
 
-    if not user or not verify_password(password, user.password):
+    if not user:
         raise InvalidCredentialsError("Invalid credentials")
 
+    verified, new_hashed_password = await password_hasher.verify_and_update(
+        password, user.password
+    )
+    if not verified:
+        raise InvalidCredentialsError("Invalid credentials")
+
+    if new_hashed_password is not None:
+        await UserRepository(session).update_password(user, new_hashed_password)
+
 
-def get_access_token(
+async def get_access_token(
     request: schemas.UserIn,
-    session: Session,
+    session: AsyncSession,
 ) -> schemas.TokenOut:
     """Returns a JWT token to an authenticated user
 
     :param request: A request body which takes in a username and password
     :type request: schemas.UserIn
     :param session: The database which contains all authenticated username/password values
-    :type session: Session
+    :type session: AsyncSession
     :returns: A JWT token
     :rtype: schemas.TokenOut
     """
 
     try:
-        user = UserRepository(session).get(username=request.username)
+        user = await UserRepository(session).get(username=request.username)
     except UserNotFoundError:
         raise UserNotFoundError
     except InvalidUserQueryError:
         raise InvalidUserQueryError
 
     try:
-        __authenticate_user(user, request.password)
+        await __authenticate_user(user, request.password, session)
     except InvalidCredentialsError:
         raise InvalidCredentialsError
 
@@ -0,0 +1,130 @@
+from typing import Callable, Optional
+
+from pydantic.types import PositiveInt
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.errors import (
+    GameStateNotFoundError,
+    GameStateVersionConflictError,
+    RoundNotEndedError,
+    RoundNotStartedError,
+)
+from app.repository.gamestate import GameStateRepository
+from app.repository.gamestatestore import GameStateStoreRepository
+from app.token import Principal
+from hilo.game import get_round_result, init_gamestate, init_round
+from hilo.models.gamestate import GameState
+from hilo.models.prediction import Prediction
+
+
+class GameChannel:
+    """Plays hilo on a gamestate that stays resident for a WebSocket connection
+
+    The gamestate is loaded once, and rounds are played on it in memory. Each change
+    is saved, in its own short database session, before it is returned. A save only
+    succeeds while the stored gamestate still has the version the channel loaded or
+    last saved, so a round that was returned can never be overwritten by, or lost to,
+    a request that changed the game over HTTP in the meantime.
+
+    :param principal: The user authenticated when the connection was opened
+    :type principal: Principal
+    :param gamestate: The user's gamestate, or None if the user has no game yet
+    :type gamestate: Optional[GameState]
+    """
+
+    def __init__(
+        self,
+        principal: Principal,
+        gamestate: Optional[GameState],
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.principal = principal
+        self.gamestate = gamestate
+        # The version of the stored gamestate that self.gamestate was saved as
+        self.version: Optional[int] = None
+        self.session_factory = session_factory
+
+    @classmethod
+    async def open(cls, principal: Principal, **kwargs) -> "GameChannel":
+        """Loads the user's gamestate and its version into a new channel"""
+
+        channel = cls(principal, None, **kwargs)
+        async with channel.session_factory() as session:
+            try:
+                (
+                    channel.gamestate,
+                    channel.version,
+                ) = await GameStateRepository(
+                    session
+                ).get_with_version(principal.user_id)
+            except GameStateNotFoundError:
+                pass
+        return channel
+
+    async def start_round(self) -> GameState:
+        """Starts a new round, creating a game for new users and restarting the game
+        of bankrupt users
+
+        :return: The gamestate of the new round
+        :rtype: GameState
+        :raises RoundNotEndedError: if the current round has not ended
+        :raises UserNotFoundError: if the user no longer exists
+        :raises GameStateVersionConflictError: if the game was changed by another
+        request since the channel last saved it
+        """
+
+        if self.gamestate is None:
+            async with self.session_factory() as session:
+                await GameStateStoreRepository(session).create_gamestate(
+                    self.principal.user_id, init_gamestate(self.principal.username)
+                )
+                # Another request may have created the user's game first
+                self.gamestate, self.version = await GameStateRepository(
+                    session
+                ).get_with_version(self.principal.user_id)
+            return self.gamestate
+
+        if self.gamestate.is_bankrupt():
+            await self.__save(init_gamestate(self.principal.username))
+        elif not self.gamestate.is_round_ended:
+            raise RoundNotEndedError("Round has not ended")
+        else:
+            await self.__save(init_round(self.gamestate))
+        return self.gamestate
+
+    async def play(self, prediction: Prediction, bet: PositiveInt) -> GameState:
+        """Ends the current round with the user's prediction and bet
+
+        :return: The gamestate with the result of the round
+        :rtype: GameState
+        :raises GameStateNotFoundError: if the user has no game
+        :raises RoundNotStartedError: if no round has been started
+        :raises InvalidBetError: if bet exceeds the user's money
+        :raises GameStateVersionConflictError: if the game was changed by another
+        request since the channel last saved it
+        """
+
+        if self.gamestate is None:
+            raise GameStateNotFoundError("Gamestate not found")
+        if not self.gamestate.is_round_started:
+            raise RoundNotStartedError("Round not started")
+
+        await self.__save(get_round_result(self.gamestate, prediction, bet))
+        return self.gamestate
+
+    async def __save(self, gamestate: GameState):
+        """Saves gamestate as the channel's gamestate
+
+        :raises GameStateVersionConflictError: if the stored gamestate was changed since
+        the channel loaded or last saved it, in which case the channel must be closed
+        without returning gamestate
+        """
+
+        # Only a channel that loaded a gamestate can change it
+        assert self.version is not None
+        async with self.session_factory() as session:
+            self.version = await GameStateRepository(session).update_if_version(
+                gamestate, self.principal.user_id, self.version
+            )
+        self.gamestate = gamestate
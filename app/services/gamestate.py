@@ -1,132 +1,182 @@
+from typing import Iterable, List, Optional, Tuple
+
 from pydantic.types import PositiveInt
-from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import models
 from app.errors import (
     GameStateNotFoundError,
     GameStateStoreNotFoundError,
+    IdempotencyKeyReusedError,
     InvalidBetError,
     RoundNotEndedError,
     RoundNotStartedError,
     UserNotFoundError,
 )
+from app.metrics import timed
 from app.repository.gamestate import GameStateRepository
 from app.repository.gamestatestore import GameStateStoreRepository
-from app.repository.user import UserRepository
+from app.repository.idempotency import IdempotencyKeyRepository
+from app.token import Principal
 from hilo.errors import CardComparatorError
-from hilo.game import get_round_result, init_gamestate, init_round
+from hilo.game import (
+    get_next_card_odds,
+    get_round_result,
+    init_gamestate,
+    init_round,
+    play_rounds,
+)
 from hilo.models.gamestate import GameState
+from hilo.models.odds import Odds
 from hilo.models.prediction import Prediction
+from hilo.models.roundresult import RoundResult
 
 
-def __compute_new_round(user_id: str, session: Session) -> GameState:
+async def __compute_new_round(
+    gamestate: GameState, user_id: int, session: AsyncSession
+) -> GameState:
     """Computes the new round gamestate from the user's latest gamestate
 
+    :param gamestate: The user's latest gamestate
+    :type gamestate: GameState
     :param user_id: The user_id of the user
-    :type user_id: str
+    :type user_id: int
     :param session: the daabase containing all gamestate and user information
-    :type session: Session
+    :type session: AsyncSession
     :return: The computed gamestate
     :rtype: GameState
-    :raises GameStateNotFoundError: if the user with "user_id" does not have an associated
-    gamestate
     :raises RoundNotEndedError: if the user attempts to start a round without
     ending the current round
     """
 
-    try:
-        gamestate = GameStateRepository(session).get(user_id)
-    except AttributeError:
-        raise GameStateNotFoundError("Gamestate not found")
-
     if not gamestate.is_round_ended:
         raise RoundNotEndedError("Round has not ended")
 
-    updated_gamestate = init_round(gamestate)
-    return GameStateRepository(session).update(updated_gamestate, user_id)
+    with timed("engine"):
+        updated_gamestate = init_round(gamestate)
+    return await GameStateRepository(session).update(updated_gamestate, user_id)
 
 
-def __create_game(user_id: str, session: Session) -> GameState:
+async def __create_game(principal: Principal, session: AsyncSession) -> GameState:
     """Creates a new game of hilo and saves it to the database for the user
 
-    :param user_id: The user_id of the user
-    :type user_id: str
+    :param principal: The user, with the username given by their access token
+    :type principal: Principal
     :param session: the database containing all gamestate and user information
-    :type session: Session
+    :type session: AsyncSession
     :return: The computed gamestate
     :rtype: GameState
     :raises UserNotFoundError: if no users with the associated "user_id" can
     be found in "session"
     """
 
-    try:
-        username = UserRepository(session).get(id=user_id).username
-    except AttributeError:
-        raise UserNotFoundError("User with user_id not found")
+    with timed("engine"):
+        new_gamestate = init_gamestate(principal.username)
 
-    new_gamestatestore = models.GameStateStore(
-        gamestate=init_gamestate(username), user_id=user_id
+    return await GameStateStoreRepository(session).create_gamestate(
+        principal.user_id, new_gamestate
     )
 
-    return GameStateStoreRepository(session).save(new_gamestatestore).gamestate
 
-
-def __restart_gamestate(user_id: str, session: Session) -> GameState:
+async def __restart_gamestate(principal: Principal, session: AsyncSession) -> GameState:
     """Updates the latest user hilo gamestate with a new GameState instance
 
-    :param user_id: The user_id of the user
-    :type user_id: str
+    :param principal: The user, with the username given by their access token
+    :type principal: Principal
     :param session: the database containing all gamestate and user information
-    :type session: Session
+    :type session: AsyncSession
     :return: The computed gamestate
     :rtype: GameState
-    :raises UserNotFoundError: if no users with the associated "user_id" can
-    be found in "session"
     """
-    try:
-        username = UserRepository(session).get(id=user_id).username
-    except AttributeError:
-        raise UserNotFoundError("User with user_id not found")
 
-    restarted_gamestate = init_gamestate(username)
+    with timed("engine"):
+        restarted_gamestate = init_gamestate(principal.username)
 
-    return GameStateRepository(session).update(restarted_gamestate, user_id)
+    return await GameStateRepository(session).update(
+        restarted_gamestate, principal.user_id
+    )
 
 
-def start_round(user_id: str, session: Session) -> GameState:
+async def start_round(principal: Principal, session: AsyncSession) -> GameState:
     """Starts a new round of hilo
 
-    :param user_id: The user_id of the user
-    :type user_id: str
+    :param principal: The user authenticated by their access token
+    :type principal: Principal
     :param session: the database containing all gamestate and user information
-    :type session: Session
+    :type session: AsyncSession
     :return: The computed gamestate
     :rtype: GameState
     """
+    async with GameStateRepository(session).locked(principal.user_id):
+        try:
+            gamestate: GameState = await GameStateRepository(session).get(
+                principal.user_id, for_update=True
+            )
+
+            if not gamestate.is_bankrupt():
+                return await __compute_new_round(gamestate, principal.user_id, session)
+            return await __restart_gamestate(principal, session)
+
+        except GameStateStoreNotFoundError:
+            return await __create_game(principal, session)
+        except UserNotFoundError:
+            raise UserNotFoundError
+        except RoundNotEndedError:
+            raise RoundNotEndedError
+
+
+async def __get_started_round(user_id: int, session: AsyncSession) -> GameState:
+    """Gets a user's gamestate, locking its row, and ensures its round has started
+
+    :param user_id: The user_id of the user
+    :type user_id: int
+    :param session: the database containing all gamestate and user information
+    :type session: AsyncSession
+    :return: The user's gamestate
+    :rtype: GameState
+    :raises GameStateNotFoundError: if the user with "user_id" does not have an associated
+    gamestate
+    :raises RoundNotStartedError: if users attempt to end a round without starting a round
+    """
+
     try:
-        gamestate: GameState = GameStateRepository(session).get(user_id)
+        gamestate: GameState = await GameStateRepository(session).get(
+            user_id, for_update=True
+        )
+    except GameStateNotFoundError:
+        raise GameStateNotFoundError("gamestate not found")
+
+    if not gamestate.is_round_started:
+        raise RoundNotStartedError("Round not started")
+    return gamestate
+
+
+def __play_round(
+    gamestate: GameState, prediction: Prediction, bet: PositiveInt
+) -> GameState:
+    """Gets the result of a round of hilo
 
-        if not gamestate.is_bankrupt():
-            return __compute_new_round(user_id, session)
-        return __restart_gamestate(user_id, session)
+    :raises CardComparatorError: if base_card or next_card is of type None
+    :raises InvalidBetError: if bet exceeds the user's money
+    """
 
-    except GameStateStoreNotFoundError:
-        return __create_game(user_id, session)
-    except UserNotFoundError:
-        raise UserNotFoundError
-    except RoundNotEndedError:
-        raise RoundNotEndedError
+    try:
+        with timed("engine"):
+            return get_round_result(gamestate, prediction, bet)
+    except CardComparatorError:
+        raise CardComparatorError
+    except InvalidBetError:
+        raise InvalidBetError
 
 
-def end_round(
-    user_id: str, session: Session, prediction: Prediction, bet: PositiveInt
+async def end_round(
+    user_id: int, session: AsyncSession, prediction: Prediction, bet: PositiveInt
 ) -> GameState:
     """Ends a round of hilo
 
     :param user_id: The user_id of the user
-    :type user_id: str
+    :type user_id: int
     :param session: the database containing all gamestate and user information
-    :type session: Session
+    :type session: AsyncSession
     :param prediction: The user's prediction if the next_card will be higher
     or lower than the base_card
     :type prediction: Prediction
@@ -139,20 +189,161 @@ def end_round(
     :raises CardComparatorError: if base_card or next_card is of type None
     """
 
+    async with GameStateRepository(session).locked(user_id):
+        gamestate = await __get_started_round(user_id, session)
+        updated_gamestate = __play_round(gamestate, prediction, bet)
+
+        await GameStateRepository(session).update(updated_gamestate, user_id)
+        return updated_gamestate
+
+
+async def __replay(
+    idempotency_keys: IdempotencyKeyRepository,
+    user_id: int,
+    idempotency_key: str,
+    fingerprint: str,
+) -> Optional[GameState]:
+    """Gets the gamestate that resulted from a user's request with an Idempotency-Key
+
+    :return: The gamestate, or None if the key is unknown or has expired
+    :rtype: Optional[GameState]
+    :raises IdempotencyKeyReusedError: if the key was used for a request with another
+    fingerprint
+    """
+
+    record = await idempotency_keys.get(user_id, idempotency_key)
+    if record is None:
+        return None
+    stored_fingerprint, gamestate = record
+    if stored_fingerprint != fingerprint:
+        raise IdempotencyKeyReusedError("Idempotency-Key reused with another body")
+    return gamestate
+
+
+async def end_round_idempotently(
+    user_id: int,
+    session: AsyncSession,
+    prediction: Prediction,
+    bet: PositiveInt,
+    idempotency_key: str,
+    fingerprint: str,
+) -> Tuple[GameState, bool]:
+    """Ends a round of hilo at most once for each of a user's Idempotency-Keys
+
+    The resulting gamestate is saved with the key in the same transaction, and is
+    returned again for later requests with the key, without playing them.
+
+    :param user_id: The user_id of the user
+    :type user_id: int
+    :param session: the database containing all gamestate and user information
+    :type session: AsyncSession
+    :param prediction: The user's prediction if the next_card will be higher
+    or lower than the base_card
+    :type prediction: Prediction
+    :param bet: The user's bet on their prediction
+    :type bet: PositiveInt
+    :param idempotency_key: The Idempotency-Key of the request
+    :type idempotency_key: str
+    :param fingerprint: The fingerprint of the request's prediction and bet
+    :type fingerprint: str
+    :return: The computed gamestate, and whether it is the result of an earlier request
+    :rtype: Tuple[GameState, bool]
+    :raises GameStateNotFoundError: if the user with "user_id" does not have an associated
+    gamestate
+    :raises RoundNotStartedError: if users attempt to end a round without starting a round
+    :raises CardComparatorError: if base_card or next_card is of type None
+    :raises IdempotencyKeyReusedError: if the key was used for a request with another
+    prediction or bet
+    """
+
+    idempotency_keys = IdempotencyKeyRepository(session)
+    replayed = await __replay(idempotency_keys, user_id, idempotency_key, fingerprint)
+    if replayed is not None:
+        return replayed, True
+
+    async with GameStateRepository(session).locked(user_id):
+        gamestate = await __get_started_round(user_id, session)
+        # Another worker may have played a request with the key while this one waited
+        # for the gamestate's lock
+        replayed = await __replay(
+            idempotency_keys, user_id, idempotency_key, fingerprint
+        )
+        if replayed is not None:
+            return replayed, True
+
+        updated_gamestate = __play_round(gamestate, prediction, bet)
+
+        await idempotency_keys.add(
+            user_id, idempotency_key, fingerprint, updated_gamestate
+        )
+        await GameStateRepository(session).update(updated_gamestate, user_id)
+        # The update commits the key, unless the gamestate cache only cached the update
+        with timed("commit"):
+            await session.commit()
+        return updated_gamestate, False
+
+
+async def play_batch(
+    user_id: int,
+    session: AsyncSession,
+    choices: Iterable[Tuple[Prediction, PositiveInt]],
+) -> Tuple[List[RoundResult], GameState]:
+    """Plays consecutive rounds of hilo and saves the final gamestate with a single update
+
+    :param user_id: The user_id of the user
+    :type user_id: int
+    :param session: the database containing all gamestate and user information
+    :type session: AsyncSession
+    :param choices: The user's prediction and bet for each round
+    :type choices: Iterable[Tuple[Prediction, PositiveInt]]
+    :return: The result of each round played and the final gamestate
+    :rtype: Tuple[List[RoundResult], GameState]
+    :raises GameStateNotFoundError: if the user with "user_id" does not have an associated
+    gamestate
+    :raises CardComparatorError: if base_card or next_card is of type None
+    """
+
+    async with GameStateRepository(session).locked(user_id):
+        try:
+            gamestate: GameState = await GameStateRepository(session).get(
+                user_id, for_update=True
+            )
+        except GameStateNotFoundError:
+            raise GameStateNotFoundError("gamestate not found")
+
+        try:
+            with timed("engine"):
+                round_results, updated_gamestate = play_rounds(gamestate, choices)
+        except CardComparatorError:
+            raise CardComparatorError
+
+        if round_results:
+            await GameStateRepository(session).update(updated_gamestate, user_id)
+        return round_results, updated_gamestate
+
+
+async def get_odds(user_id: int, session: AsyncSession) -> Odds:
+    """Gets the odds of the next card being higher or lower than the base card
+
+    :param user_id: The user_id of the user
+    :type user_id: int
+    :param session: the database containing all gamestate and user information
+    :type session: AsyncSession
+    :return: The odds for the current round
+    :rtype: Odds
+    :raises GameStateNotFoundError: if the user with "user_id" does not have an associated
+    gamestate
+    :raises RoundNotStartedError: if the user has not started a round
+    :raises CardComparatorError: if base_card is of type None
+    """
+
     try:
-        gamestate: GameState = GameStateRepository(session).get(user_id)
+        gamestate: GameState = await GameStateRepository(session).get(user_id)
     except GameStateNotFoundError:
         raise GameStateNotFoundError("gamestate not found")
 
     if not gamestate.is_round_started:
         raise RoundNotStartedError("Round not started")
 
-    try:
-        updated_gamestate = get_round_result(gamestate, prediction, bet)
-    except CardComparatorError:
-        raise CardComparatorError
-    except InvalidBetError:
-        raise InvalidBetError
-
-    GameStateRepository(session).update(updated_gamestate, user_id)
-    return updated_gamestate
+    with timed("engine"):
+        return get_next_card_odds(gamestate)
@@ -1,35 +1,35 @@
 from time import time
 
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
 from app.errors import UsernameNotUniqueError
-from app.hashing import hash_password
+from app.hashing import password_hasher
 from app.repository.user import UserRepository
 
 
-def create_user(request: schemas.UserIn, session: Session) -> models.User:
+async def create_user(request: schemas.UserIn, session: AsyncSession) -> models.User:
     """Creates and stores a new user in a database
 
     :param request: The request body for users to input their new account credentials
     :type: schemas.UserIn
     :param session: The database that user's credentials are uploaded to
-    :type session: Session
+    :type session: AsyncSession
     :returns: Full details of the created user
     :rtype: models.User
     raises UsernameNotUniqueError: if username in request.username is already taken
     in the session database
+    raises PasswordHasherBusyError: If too many password operations are pending
     """
 
     new_user = models.User(
         username=request.username,
-        password=hash_password(request.password),
+        password=await password_hasher.hash(request.password),
         created_at=time(),
     )
 
     try:
-        UserRepository(session).save(new_user)
+        await UserRepository(session).save(new_user)
     except UsernameNotUniqueError:
         raise UsernameNotUniqueError
 
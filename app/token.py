@@ -1,11 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
-from jose import JWTError, jwt
+from jose import JWTError
 
-from app.config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
+from app.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ALGORITHM,
+    SECRET_KEY,
+    TOKEN_CLAIMS_CACHE_SIZE,
+)
 from app.errors import InvalidAuthenticationTokenError, MissingAuthenticationTokenError
 
 
+@dataclass(frozen=True)
+class Principal:
+    """The user authenticated by a JWT access token
+
+    :param user_id: The user's id
+    :type user_id: int
+    :param username: The user's username
+    :type username: str
+    """
+
+    __slots__ = ("user_id", "username")
+
+    user_id: int
+    username: str
+
+
+class TokenClaimsCache:
+    """A bounded LRU of verified JWT claims, keyed by a SHA-256 digest of the token
+
+    Each entry is only served until the token's "exp" claim, and every entry is
+    dropped when the signing key or algorithm changes.
+
+    :param max_size: The maximum number of cached tokens
+    :type max_size: int
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._claims: "OrderedDict[bytes, dict]" = OrderedDict()
+        # The secret key and algorithm the cached claims were verified with
+        self._signing_key: Optional[Tuple[str, str]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._claims)
+
+    def decode(self, token: str, secret_key: str, algorithm: str) -> dict:
+        """Gets the claims of a token, verifying its signature only on a cache miss
+
+        :raises JWTError: If token decoding fails
+        :raises AttributeError: If token is None
+        """
+
+        signing_key = (secret_key, algorithm)
+        digest = hashlib.sha256(token.encode()).digest()
+
+        with self._lock:
+            if signing_key != self._signing_key:
+                self._claims.clear()
+                self._signing_key = signing_key
+            elif (claims := self._claims.get(digest)) is not None:
+                if claims.get("exp", float("inf")) > time.time():
+                    self._claims.move_to_end(digest)
+                    return claims
+                del self._claims[digest]
+
+        # jose.jwt imports every key backend, so it is imported on first use rather
+        # than when the application starts
+        from jose import jwt
+
+        claims = jwt.decode(token, secret_key, algorithms=[algorithm])
+
+        with self._lock:
+            if signing_key == self._signing_key:
+                self._claims[digest] = claims
+                while len(self._claims) > self.max_size:
+                    self._claims.popitem(last=False)
+        return claims
+
+
+token_claims_cache = TokenClaimsCache(int(TOKEN_CLAIMS_CACHE_SIZE))
+
+
 def create_access_token(data: dict) -> str:
     """Converts a dictionary to a JWT access token
 
@@ -20,6 +104,8 @@ def create_access_token(data: dict) -> str:
         minutes=int(ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     raw_token_data.update({"exp": token_expiry_time})
+    from jose import jwt
+
     encoded_jwt = jwt.encode(raw_token_data, SECRET_KEY, algorithm=ALGORITHM)
 
     return encoded_jwt
@@ -37,7 +123,7 @@ def authenticate_token(token: str) -> None:
     """
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_claims_cache.decode(token, SECRET_KEY, ALGORITHM)
     except JWTError:
         raise JWTError
 
@@ -59,7 +145,7 @@ def get_username(token: str) -> str:
     :raises InvalidAuthenticationTokenError: If token does not have a "username" key
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_claims_cache.decode(token, SECRET_KEY, ALGORITHM)
     except JWTError:
         raise JWTError
     except AttributeError:
@@ -85,7 +171,7 @@ def get_user_id(token: str) -> str:
     :raises InvalidAuthenticationTokenError: If token does not have a "username" key
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_claims_cache.decode(token, SECRET_KEY, ALGORITHM)
     except JWTError:
         raise JWTError
     except AttributeError:
@@ -97,3 +183,28 @@ def get_user_id(token: str) -> str:
         raise InvalidAuthenticationTokenError
 
     return user_id
+
+
+def get_principal(token: str) -> Principal:
+    """Decodes the user_id and username stored within a JWT token
+
+    :param token: A JWT token
+    :type token: str
+    returns: The user authenticated by the JWT token
+    :rtype: Principal
+    :raises JWTError: If token decoding fails
+    :raises MissingAuthenticationTokenError: If no authentication token is given
+    :raises InvalidAuthenticationTokenError: If token does not have a "user_id" or
+    "username" key
+    """
+    try:
+        payload = token_claims_cache.decode(token, SECRET_KEY, ALGORITHM)
+    except JWTError:
+        raise JWTError
+    except AttributeError:
+        raise MissingAuthenticationTokenError
+
+    try:
+        return Principal(payload["user_id"], payload["username"])
+    except KeyError:
+        raise InvalidAuthenticationTokenError
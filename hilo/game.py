@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
 
 from pydantic import BaseModel
 from pydantic.types import NonNegativeInt, PositiveInt
@@ -6,13 +6,15 @@ from pydantic.types import NonNegativeInt, PositiveInt
 from hilo.errors import CardComparatorError, InvalidBetError
 from hilo.models.card import Card, ShowCard
 from hilo.models.gamestate import GameState
+from hilo.models.odds import Odds
 from hilo.models.prediction import Prediction
+from hilo.models.roundresult import RoundResult
 
 MINIMUM_CARDS_REQUIRED = 2
 
 
 def init_gamestate(player_name: str) -> GameState:
-    gamestate: GameState = GameState(player_name, True)
+    gamestate: GameState = GameState.construct(player_name, True)
     gamestate.draw_base_card()
     gamestate.is_round_started = True
 
@@ -64,7 +66,6 @@ def __validate_bet(bet: PositiveInt, money: NonNegativeInt) -> None:
 
 
 def __update_money(gamestate: GameState, bet: PositiveInt) -> GameState:
-    __validate_bet(bet, gamestate.money)
     gamestate.money += bet if gamestate.win else -bet
     return gamestate
 
@@ -72,6 +73,8 @@ def __update_money(gamestate: GameState, bet: PositiveInt) -> GameState:
 def get_round_result(
     gamestate: GameState, prediction: Prediction, bet: PositiveInt
 ) -> GameState:
+    # A rejected bet must not draw the next card
+    __validate_bet(bet, gamestate.money)
     round_result: GameState = __compute_round_result(gamestate, prediction)
 
     round_result = __update_money(round_result, bet)
@@ -79,3 +82,58 @@ def get_round_result(
     round_result.is_round_started = False
 
     return round_result
+
+
+def play_rounds(
+    gamestate: GameState, choices: Iterable[Tuple[Prediction, PositiveInt]]
+) -> Tuple[List[RoundResult], GameState]:
+    round_results: List[RoundResult] = []
+
+    for prediction, bet in choices:
+        if gamestate.is_bankrupt():
+            break
+        try:
+            __validate_bet(bet, gamestate.money)
+        except InvalidBetError:
+            break
+
+        if gamestate.is_round_ended:
+            gamestate = init_round(gamestate)
+        gamestate = get_round_result(gamestate, prediction, bet)
+        base_card, next_card, win = (
+            gamestate.base_card,
+            gamestate.next_card,
+            gamestate.win,
+        )
+        # A round that get_round_result ended has both cards and its result
+        assert base_card is not None and next_card is not None and win is not None
+        round_results.append(
+            RoundResult(
+                gamestate.round,
+                base_card,
+                next_card,
+                prediction,
+                bet,
+                win,
+                gamestate.money,
+            )
+        )
+
+    return round_results, gamestate
+
+
+def get_next_card_odds(gamestate: GameState) -> Odds:
+    if gamestate.base_card is None:
+        raise CardComparatorError
+
+    cards_remaining = len(gamestate.deck)
+    cards_higher = gamestate.deck.count_higher(gamestate.base_card)
+    cards_lower = gamestate.deck.count_lower(gamestate.base_card)
+
+    return Odds(
+        cards_remaining,
+        cards_higher,
+        cards_lower,
+        cards_higher / cards_remaining if cards_remaining else 0.0,
+        cards_lower / cards_remaining if cards_remaining else 0.0,
+    )
@@ -1,5 +1,5 @@
 from dataclasses import field
-from typing import Optional
+from typing import Optional, Tuple, cast
 
 from frozendict import frozendict
 from pydantic import validator
@@ -28,16 +28,26 @@ RANKS = frozendict(
 )
 SUITS = frozendict({"D": "Diamonds", "C": "Clubs", "H": "Hearts", "S": "Spades"})
 
+RANK_INDEXES = frozendict({rank: index for index, rank in enumerate(RANKS)})
+SUIT_INDEXES = frozendict({suit: index for index, suit in enumerate(SUITS)})
+DECK_SIZE = len(RANKS) * len(SUITS)
+
 
 def rank_index(rank):
-    return list(RANKS).index(rank)
+    try:
+        return RANK_INDEXES[rank]
+    except KeyError:
+        raise ValueError(f"{rank!r} is not in RANKS")
 
 
 def suit_index(suit):
-    return list(SUITS).index(suit)
+    try:
+        return SUIT_INDEXES[suit]
+    except KeyError:
+        raise ValueError(f"{suit!r} is not in SUITS")
 
 
-@dataclass(order=True, frozen=True)
+@dataclass(frozen=True)
 class Card:
     value: Optional[int] = field(init=False, repr=False, default=None)
     name: Optional[str] = field(init=False, repr=False, default=None)
@@ -66,9 +76,69 @@ class Card:
             raise CardSuitError(f"{suit} is not a valid suit!")
         return suit
 
+    @property
+    def card_id(self) -> int:
+        # value is only None until __post_init_post_parse__ sets it
+        return self.value - 1  # type: ignore[operator]
+
+    def __eq__(self, other):
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.value == other.value
+
+    def __hash__(self):
+        return self.value
+
+    def __lt__(self, other):
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.value < other.value
+
+    def __le__(self, other):
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.value <= other.value
+
+    def __gt__(self, other):
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.value > other.value
+
+    def __ge__(self, other):
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.value >= other.value
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (card_from_id, (self.card_id,))
+
 
 @dataclass(order=True, frozen=True, config=ORMConfig)
 class ShowCard:
     rank: str
     suit: str
     name: str
+
+
+CARDS: Tuple[Card, ...] = tuple(Card(rank, suit) for rank in RANKS for suit in SUITS)
+SHOW_CARDS: Tuple[ShowCard, ...] = tuple(
+    ShowCard(card.rank, card.suit, cast(str, card.name)) for card in CARDS
+)
+
+
+def card_from_id(card_id: int) -> Card:
+    return CARDS[card_id]
+
+
+def get_card(rank: str, suit: str) -> Card:
+    return CARDS[4 * RANK_INDEXES[rank] + SUIT_INDEXES[suit]]
+
+
+def show_card(card: Card) -> ShowCard:
+    return SHOW_CARDS[card.card_id]
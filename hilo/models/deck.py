@@ -1,21 +1,218 @@
 import random
-from typing import List
+from typing import Iterable, Optional, Sequence
 
-from pydantic import Field
-from pydantic.dataclasses import dataclass
+from hilo.models.card import CARDS, DECK_SIZE, Card
+from hilo.prng import Pcg32
 
-from hilo.models.card import RANKS, SUITS, Card
-from hilo.models.ORMConfig import ORMConfig
+
+class DeckCards(Sequence):
+    __slots__ = ("_deck",)
+
+    def __init__(self, deck: "Deck"):
+        self._deck = deck
+
+    def __len__(self):
+        return len(self._deck.card_ids) - self._deck.cursor
+
+    def __getitem__(self, index):
+        remaining_card_ids = self._deck.card_ids[self._deck.cursor :]
+        if isinstance(index, slice):
+            return [CARDS[card_id] for card_id in remaining_card_ids[index]]
+        return CARDS[remaining_card_ids[index]]
+
+    def __iter__(self):
+        deck = self._deck
+        return (CARDS[card_id] for card_id in deck.card_ids[deck.cursor :])
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class CardCounts:
+    """A Fenwick tree counting the remaining cards at or below each card id"""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, card_ids: Iterable[int] = ()):
+        self.tree = bytearray(DECK_SIZE + 1)
+        for card_id in card_ids:
+            self.tree[card_id + 1] += 1
+        for index in range(1, DECK_SIZE + 1):
+            parent = index + (index & -index)
+            if parent <= DECK_SIZE:
+                self.tree[parent] += self.tree[index]
+
+    @classmethod
+    def from_tree(cls, tree: bytes) -> "CardCounts":
+        counts = cls.__new__(cls)
+        counts.tree = bytearray(tree)
+        return counts
+
+    def remove(self, card_id: int):
+        index = card_id + 1
+        while index <= DECK_SIZE:
+            self.tree[index] -= 1
+            index += index & -index
+
+    def count_below(self, card_id: int) -> int:
+        count = 0
+        index = card_id
+        while index > 0:
+            count += self.tree[index]
+            index -= index & -index
+        return count
+
+    def total(self) -> int:
+        return self.count_below(DECK_SIZE)
 
 
-@dataclass(config=ORMConfig)
 class Deck:
-    cards: List[Card] = Field(
-        default=[Card(rank, suit) for rank in RANKS for suit in SUITS],
-    )
+    __slots__ = ("_card_ids", "_counts", "cursor", "seed", "reshuffle_count")
+
+    def __init__(self, cards: Optional[Iterable[Card]] = None):
+        # Decks derived from a seed materialize their card ids and counts lazily
+        self._card_ids: Optional[bytearray]
+        self._counts: Optional[CardCounts]
+        self.seed: Optional[int]
+        if cards is None:
+            self._card_ids = bytearray(range(DECK_SIZE))
+        else:
+            self._card_ids = bytearray(card.card_id for card in cards)
+        self._counts = CardCounts(self._card_ids)
+        self.cursor = 0
+        self.seed = None
+        self.reshuffle_count = 0
+
+    @classmethod
+    def from_seed(
+        cls,
+        seed: int,
+        reshuffle_count: int = 0,
+        cursor: int = 0,
+        counts: Optional[CardCounts] = None,
+    ) -> "Deck":
+        deck = cls.__new__(cls)
+        deck._card_ids = None
+        deck._counts = counts
+        deck.cursor = cursor
+        deck.seed = seed
+        deck.reshuffle_count = reshuffle_count
+        return deck
+
+    @classmethod
+    def from_card_ids(
+        cls, card_ids: bytes, counts: Optional[CardCounts] = None
+    ) -> "Deck":
+        deck = cls.__new__(cls)
+        deck._card_ids = bytearray(card_ids)
+        deck._counts = counts
+        deck.cursor = 0
+        deck.seed = None
+        deck.reshuffle_count = 0
+        return deck
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, deck):
+        if not isinstance(deck, cls):
+            raise TypeError(f"{deck!r} is not a Deck")
+        return deck
+
+    @property
+    def card_ids(self) -> bytearray:
+        if self._card_ids is None:
+            # Only decks derived from a seed are created without card ids
+            assert self.seed is not None
+            self._card_ids = bytearray(range(DECK_SIZE))
+            generator = Pcg32(self.seed)
+            generator.advance(self.reshuffle_count * (DECK_SIZE - 1))
+            generator.shuffle(self._card_ids)
+        return self._card_ids
+
+    @property
+    def counts(self) -> CardCounts:
+        if self._counts is None:
+            self._counts = CardCounts(self.card_ids[self.cursor :])
+        return self._counts
+
+    @property
+    def cards(self) -> DeckCards:
+        return DeckCards(self)
+
+    def draw(self, index=0) -> Card:
+        counts = self.counts
+        if index:
+            card_id = self.card_ids.pop(self.cursor + index)
+            self.seed = None
+        elif len(self):
+            card_id = self.card_ids[self.cursor]
+            self.cursor += 1
+        else:
+            raise IndexError("draw from empty deck")
+        counts.remove(card_id)
+        return CARDS[card_id]
+
+    def count_higher(self, card: Card) -> int:
+        return len(self) - self.counts.count_below(card.card_id + 1)
+
+    def count_lower(self, card: Card) -> int:
+        return self.counts.count_below(card.card_id)
 
     def shuffle(self):
-        random.shuffle(self.cards)
+        self.compact()
+        random.shuffle(self.card_ids)
+
+    def compact(self):
+        del self.card_ids[: self.cursor]
+        self.cursor = 0
+        self.seed = None
+
+    def __len__(self):
+        if self._card_ids is None:
+            return DECK_SIZE - self.cursor
+        return len(self._card_ids) - self.cursor
 
     def __eq__(self, other):
-        return self.cards == other.cards
+        if not isinstance(other, Deck):
+            return NotImplemented
+        return self.card_ids[self.cursor :] == other.card_ids[other.cursor :]
+
+    def __repr__(self):
+        if self.seed is not None:
+            return (
+                f"Deck(seed={self.seed}, reshuffle_count={self.reshuffle_count}, "
+                f"cursor={self.cursor})"
+            )
+        return f"Deck(cards={self.cards!r})"
+
+    def __getstate__(self):
+        if self.seed is not None:
+            return self.seed, self.reshuffle_count, self.cursor
+        return bytes(self.card_ids[self.cursor :]), bytes(self.counts.tree)
+
+    def __setstate__(self, state):
+        self.cursor = 0
+        self.seed = None
+        self.reshuffle_count = 0
+        self._counts = None
+
+        if isinstance(state, tuple) and isinstance(state[0], int):
+            self.seed, self.reshuffle_count, self.cursor = state
+            self._card_ids = None
+        elif isinstance(state, tuple) and isinstance(state[0], bytes):
+            self._card_ids = bytearray(state[0])
+            self._counts = CardCounts.from_tree(state[1])
+        elif isinstance(state, bytes):
+            self._card_ids = bytearray(state)
+        else:
+            # Decks pickled before card ids were introduced hold a list of Cards
+            legacy_state = state[0] if isinstance(state, tuple) else state
+            self._card_ids = bytearray(card.card_id for card in legacy_state["cards"])
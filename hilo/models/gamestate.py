@@ -7,6 +7,7 @@ from pydantic.types import NonNegativeInt
 from hilo.models.card import Card
 from hilo.models.deck import Deck
 from hilo.models.ORMConfig import ORMConfig
+from hilo.prng import new_seed
 
 
 @dataclass(config=ORMConfig)
@@ -21,20 +22,61 @@ class GameState:
     win: Optional[bool] = field(init=False, default=None)
     is_round_started: bool = False
     is_round_ended: bool = False
+    seed: Optional[int] = field(default=None, repr=False)
+    reshuffle_count: int = field(init=False, default=0, repr=False)
 
     def __post_init__(self, shuffle_deck):
         self.init_deck(shuffle=shuffle_deck)
 
+    @classmethod
+    def construct(
+        cls,
+        player_name: str,
+        shuffle_deck: bool = True,
+        money: int = 1000,
+        round: int = 1,
+        is_round_started: bool = False,
+        is_round_ended: bool = False,
+        seed: Optional[int] = None,
+        deck: Optional[Deck] = None,
+        base_card: Optional[Card] = None,
+        next_card: Optional[Card] = None,
+        win: Optional[bool] = None,
+        reshuffle_count: int = 0,
+    ) -> "GameState":
+        gamestate = cls.__new__(cls)
+        gamestate.__dict__.update(
+            player_name=player_name,
+            deck=deck,
+            base_card=base_card,
+            next_card=next_card,
+            money=money,
+            round=round,
+            win=win,
+            is_round_started=is_round_started,
+            is_round_ended=is_round_ended,
+            seed=seed,
+            reshuffle_count=reshuffle_count,
+        )
+        if deck is None:
+            gamestate.init_deck(shuffle=shuffle_deck)
+        return gamestate
+
     def init_deck(self, shuffle=False):
-        self.deck = Deck()
-        if shuffle:
-            self.deck.shuffle()
+        if not shuffle:
+            self.deck = Deck()
+            return
+
+        if self.seed is None:
+            self.seed = new_seed()
+        self.deck = Deck.from_seed(self.seed, self.reshuffle_count)
+        self.reshuffle_count += 1
 
     def draw_base_card(self, index=0):
-        self.base_card = self.deck.cards.pop(index)
+        self.base_card = self.deck.draw(index)
 
     def draw_next_card(self, index=0):
-        self.next_card = self.deck.cards.pop(index)
+        self.next_card = self.deck.draw(index)
 
     def is_bankrupt(self):
         return self.money == 0
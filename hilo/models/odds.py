@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Odds:
+    __slots__ = (
+        "cards_remaining",
+        "cards_higher",
+        "cards_lower",
+        "probability_higher",
+        "probability_lower",
+    )
+
+    cards_remaining: int
+    cards_higher: int
+    cards_lower: int
+    probability_higher: float
+    probability_lower: float
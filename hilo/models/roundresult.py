@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+
+from hilo.models.card import Card
+from hilo.models.prediction import Prediction
+
+
+@dataclass
+class RoundResult:
+    __slots__ = ("round", "base_card", "next_card", "prediction", "bet", "win", "money")
+
+    round: int
+    base_card: Card
+    next_card: Card
+    prediction: Prediction
+    bet: int
+    win: bool
+    money: int
@@ -0,0 +1,63 @@
+import secrets
+
+MASK_32 = 0xFFFFFFFF
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+PCG_MULTIPLIER = 6364136223846793005
+PCG_DEFAULT_STREAM = 721347520444481703
+
+
+def new_seed() -> int:
+    return secrets.randbits(64)
+
+
+class Pcg32:
+    """PCG-XSH-RR with 64-bit state and 32-bit output, as described at https://www.pcg-random.org"""
+
+    __slots__ = ("state", "increment")
+
+    def __init__(self, seed: int, stream: int = PCG_DEFAULT_STREAM):
+        self.state = 0
+        self.increment = ((stream << 1) | 1) & MASK_64
+        self.next_u32()
+        self.state = (self.state + seed) & MASK_64
+        self.next_u32()
+
+    def next_u32(self) -> int:
+        previous_state = self.state
+        self.state = (previous_state * PCG_MULTIPLIER + self.increment) & MASK_64
+        xorshifted = (((previous_state >> 18) ^ previous_state) >> 27) & MASK_32
+        rotation = previous_state >> 59
+        return ((xorshifted >> rotation) | (xorshifted << (-rotation & 31))) & MASK_32
+
+    def below(self, bound: int) -> int:
+        return (self.next_u32() * bound) >> 32
+
+    def advance(self, steps: int):
+        accumulated_multiplier, accumulated_increment = 1, 0
+        multiplier, increment = PCG_MULTIPLIER, self.increment
+        while steps > 0:
+            if steps & 1:
+                accumulated_multiplier = (accumulated_multiplier * multiplier) & MASK_64
+                accumulated_increment = (
+                    accumulated_increment * multiplier + increment
+                ) & MASK_64
+            increment = ((multiplier + 1) * increment) & MASK_64
+            multiplier = (multiplier * multiplier) & MASK_64
+            steps >>= 1
+        self.state = (
+            accumulated_multiplier * self.state + accumulated_increment
+        ) & MASK_64
+
+    def shuffle(self, items: bytearray):
+        state, increment = self.state, self.increment
+        for index in range(len(items) - 1, 0, -1):
+            output_state = state
+            state = (state * PCG_MULTIPLIER + increment) & MASK_64
+            xorshifted = (((output_state >> 18) ^ output_state) >> 27) & MASK_32
+            rotation = output_state >> 59
+            output = (
+                (xorshifted >> rotation) | (xorshifted << (-rotation & 31))
+            ) & MASK_32
+            swap_index = (output * (index + 1)) >> 32
+            items[index], items[swap_index] = items[swap_index], items[index]
+        self.state = state
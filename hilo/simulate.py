@@ -0,0 +1,270 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from hilo.models.card import DECK_SIZE
+
+STARTING_MONEY = 1000
+ROUNDS_PER_DECK = DECK_SIZE // 2
+
+PredictionPolicy = Callable[[np.ndarray, np.ndarray, int], np.ndarray]
+BetPolicy = Callable[[np.ndarray, np.ndarray, int], np.ndarray]
+
+
+def predict_higher(base_cards: np.ndarray, money: np.ndarray, round: int) -> np.ndarray:
+    """Always predicts that the next card will be higher
+
+    :returns: An array of predictions, where True is Prediction.HIGHER
+    :rtype: np.ndarray
+    """
+
+    return np.ones(base_cards.shape, dtype=bool)
+
+
+def predict_by_base_card(
+    base_cards: np.ndarray, money: np.ndarray, round: int
+) -> np.ndarray:
+    """Predicts higher when the base card is in the lower half of the deck
+
+    :returns: An array of predictions, where True is Prediction.HIGHER
+    :rtype: np.ndarray
+    """
+
+    return base_cards < DECK_SIZE // 2
+
+
+@dataclass(frozen=True)
+class FlatBet:
+    """Bets the same amount every round
+
+    :param amount: The amount to bet
+    :type amount: int
+    """
+
+    amount: int = 1
+
+    def __call__(
+        self, base_cards: np.ndarray, money: np.ndarray, round: int
+    ) -> np.ndarray:
+        return np.full(base_cards.shape, self.amount, dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class FractionBet:
+    """Bets a fraction of the player's current money every round
+
+    :param fraction: The fraction of money to bet, between 0 and 1
+    :type fraction: float
+    """
+
+    fraction: float = 0.1
+
+    def __call__(
+        self, base_cards: np.ndarray, money: np.ndarray, round: int
+    ) -> np.ndarray:
+        return np.maximum((money * self.fraction).astype(np.int64), 1)
+
+
+@dataclass
+class SimulationResult:
+    """Aggregated outcome of a batch of simulated games
+
+    :param games: The number of simulated games
+    :type games: int
+    :param rounds_played: The total number of rounds resolved across all games
+    :type rounds_played: int
+    :param total_wagered: The sum of all bets
+    :type total_wagered: int
+    :param total_returned: The sum of all payouts, where a win returns twice the bet
+    :type total_returned: int
+    :param bankruptcies: The number of games that ended with no money
+    :type bankruptcies: int
+    :param final_money: Each game's money after its last round
+    :type final_money: np.ndarray
+    """
+
+    games: int
+    rounds_played: int
+    total_wagered: int
+    total_returned: int
+    bankruptcies: int
+    final_money: np.ndarray
+
+    @property
+    def rtp(self) -> float:
+        return self.total_returned / self.total_wagered if self.total_wagered else 0.0
+
+    @property
+    def bankruptcy_rate(self) -> float:
+        return self.bankruptcies / self.games if self.games else 0.0
+
+    def bankroll_percentiles(self, percentiles=(1, 5, 25, 50, 75, 95, 99)) -> dict:
+        values = np.percentile(self.final_money, percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    @classmethod
+    def merge(cls, results: List["SimulationResult"]) -> "SimulationResult":
+        return cls(
+            games=sum(result.games for result in results),
+            rounds_played=sum(result.rounds_played for result in results),
+            total_wagered=sum(result.total_wagered for result in results),
+            total_returned=sum(result.total_returned for result in results),
+            bankruptcies=sum(result.bankruptcies for result in results),
+            final_money=np.concatenate([result.final_money for result in results]),
+        )
+
+
+def resolve_rounds(
+    base_cards: np.ndarray,
+    next_cards: np.ndarray,
+    predictions: np.ndarray,
+    bets: np.ndarray,
+    money: np.ndarray,
+):
+    """Resolves one round for every game, following hilo.game.get_round_result
+
+    Card arrays hold card ids, which are ordered like Card values.
+
+    :param base_cards: Each game's base card id
+    :type base_cards: np.ndarray
+    :param next_cards: Each game's next card id
+    :type next_cards: np.ndarray
+    :param predictions: Each game's prediction, where True is Prediction.HIGHER
+    :type predictions: np.ndarray
+    :param bets: Each game's bet, which must not exceed its money
+    :type bets: np.ndarray
+    :param money: Each game's money before the round
+    :type money: np.ndarray
+    :returns: The win flags and each game's money after the round
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    :raises ValueError: If any bet is less than 1 or exceeds the game's money
+    """
+
+    if np.any(bets < 1) or np.any(bets > money):
+        raise ValueError("Bets must be between 1 and the player's money")
+
+    wins = np.where(predictions, next_cards > base_cards, next_cards < base_cards)
+    return wins, money + np.where(wins, bets, -bets)
+
+
+def _shuffled_decks(rng: np.random.Generator, games: int) -> np.ndarray:
+    decks = np.tile(np.arange(DECK_SIZE, dtype=np.uint8), (games, 1))
+    return rng.permuted(decks, axis=1)
+
+
+def simulate_games(
+    games: int,
+    rounds: int,
+    prediction_policy: PredictionPolicy = predict_by_base_card,
+    bet_policy: BetPolicy = FlatBet(),
+    money: int = STARTING_MONEY,
+    seed=None,
+) -> SimulationResult:
+    """Simulates a batch of independent games in a single process
+
+    Every game draws two cards per round from a shuffled deck, and gets a fresh
+    shuffled deck once fewer than two cards remain, like hilo.game.init_round.
+    Bets are clipped to the player's money, and bankrupt games stop playing.
+
+    :param games: The number of games to simulate
+    :type games: int
+    :param rounds: The maximum number of rounds per game
+    :type rounds: int
+    :param prediction_policy: Maps base card ids, money and the round number to predictions
+    :type prediction_policy: PredictionPolicy
+    :param bet_policy: Maps base card ids, money and the round number to bets
+    :type bet_policy: BetPolicy
+    :param money: Each game's starting money
+    :type money: int
+    :param seed: A seed or np.random.SeedSequence for the shuffles
+    :returns: The aggregated outcome of all games
+    :rtype: SimulationResult
+    """
+
+    rng = np.random.default_rng(seed)
+    balances = np.full(games, money, dtype=np.int64)
+    rounds_played = total_wagered = total_returned = 0
+
+    for round in range(rounds):
+        position = round % ROUNDS_PER_DECK
+        if position == 0:
+            decks = _shuffled_decks(rng, games)
+
+        active = balances > 0
+        if not active.any():
+            break
+
+        base_cards = decks[active, 2 * position]
+        next_cards = decks[active, 2 * position + 1]
+        active_balances = balances[active]
+
+        predictions = prediction_policy(base_cards, active_balances, round + 1)
+        bets = np.clip(bet_policy(base_cards, active_balances, round + 1), 1, None)
+        bets = np.minimum(bets, active_balances)
+
+        wins, balances[active] = resolve_rounds(
+            base_cards, next_cards, predictions, bets, active_balances
+        )
+
+        rounds_played += int(active.sum())
+        total_wagered += int(bets.sum())
+        total_returned += int(2 * bets[wins].sum())
+
+    return SimulationResult(
+        games=games,
+        rounds_played=rounds_played,
+        total_wagered=total_wagered,
+        total_returned=total_returned,
+        bankruptcies=int((balances == 0).sum()),
+        final_money=balances,
+    )
+
+
+def simulate(
+    games: int,
+    rounds: int,
+    prediction_policy: PredictionPolicy = predict_by_base_card,
+    bet_policy: BetPolicy = FlatBet(),
+    money: int = STARTING_MONEY,
+    seed=None,
+    workers: Optional[int] = None,
+    chunk_size: int = 100_000,
+) -> SimulationResult:
+    """Simulates games in chunks, fanned out across a process pool
+
+    Policies must be picklable, such as module level functions or FlatBet.
+
+    :param games: The number of games to simulate
+    :type games: int
+    :param rounds: The maximum number of rounds per game
+    :type rounds: int
+    :param workers: The number of worker processes, defaulting to the CPU count.
+    A value of 1 runs every chunk in the current process
+    :type workers: Optional[int]
+    :param chunk_size: The maximum number of games simulated by each task
+    :type chunk_size: int
+    :returns: The aggregated outcome of all games
+    :rtype: SimulationResult
+    :raises ValueError: If games is less than 1
+    """
+
+    if games < 1:
+        raise ValueError("At least one game must be simulated")
+
+    chunks = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    arguments = [
+        (chunk, rounds, prediction_policy, bet_policy, money, chunk_seed)
+        for chunk, chunk_seed in zip(chunks, seeds)
+    ]
+
+    if workers == 1 or len(chunks) <= 1:
+        return SimulationResult.merge(
+            [simulate_games(*argument) for argument in arguments]
+        )
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(simulate_games, *zip(*arguments)))
+    return SimulationResult.merge(results)
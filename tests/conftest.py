@@ -1,5 +1,6 @@
 pytest_plugins = [
     "tests.fixtures.authentication",
+    "tests.fixtures.clock",
     "tests.fixtures.config",
     "tests.fixtures.gamestate",
     "tests.fixtures.user",
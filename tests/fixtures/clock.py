@@ -0,0 +1,16 @@
+import pytest
+
+
+class FakeClock:
+    """A clock that stays at now until a test moves it"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -6,13 +6,29 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.idempotency import idempotency_cache
 from app.main import app
+from app.ratelimit import rate_limit_backend
 from hilo.models.card import RANKS, SUITS, Card
 from hilo.models.deck import Deck
 
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Starts every test with full rate limit buckets"""
+
+    rate_limit_backend.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_idempotency_cache():
+    """Starts every test without cached Idempotency-Key results"""
+
+    idempotency_cache.clear()
+
+
 @pytest.fixture
 def unshuffled_card_list():
     return [Card(rank, suit) for rank in RANKS for suit in SUITS]
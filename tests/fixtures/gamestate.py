@@ -9,7 +9,7 @@ from hilo.models.gamestate import Card, Deck, GameState
 def no_gamestate_repository(monkeypatch):
     """Mocks an empty database"""
 
-    def create_empty_gamestate_repository(*args, **kwargs):
+    async def create_empty_gamestate_repository(*args, **kwargs):
         return None
 
     monkeypatch.setattr(
@@ -22,20 +22,24 @@ def no_gamestate_repository(monkeypatch):
 def no_gamestate(monkeypatch):
     """Returns a mock start gamestate whenever the database is queried"""
 
-    def create_no_gamestate(*args, **kwargs):
+    async def create_no_gamestate(*args, **kwargs):
         raise GameStateStoreNotFoundError
 
     monkeypatch.setattr(
         "app.repository.gamestate.GameStateRepository.get",
         create_no_gamestate,
     )
+    monkeypatch.setattr(
+        "app.repository.gamestate.GameStateRepository.get_version",
+        create_no_gamestate,
+    )
 
 
 @pytest.fixture
 def save_new_gamestate(monkeypatch):
     """Returns a gamestate whenever a gamestate is saved to the database"""
 
-    def create_newly_saved_gamestate(*args, **kwargs):
+    async def create_newly_saved_gamestate(*args, **kwargs):
         gamestate = GameState(
             "alpha",
             shuffle_deck=False,
@@ -55,7 +59,7 @@ def save_new_gamestate(monkeypatch):
 def update_new_gamestate(monkeypatch):
     """Returns a gamestate whenever a gamestate is saved to the database"""
 
-    def create_newly_saved_gamestate(*args, **kwargs):
+    async def create_newly_saved_gamestate(*args, **kwargs):
         gamestate = GameState(
             "alpha",
             shuffle_deck=False,
@@ -75,7 +79,15 @@ def update_new_gamestate(monkeypatch):
 def start_gamestate_next_card_higher(monkeypatch):
     """Returns a mock start gamestate whenever the database is queried"""
 
-    def create_mock_gamestate(*args, **kargs):
+    async def get_mock_gamestate_version(*args, **kwargs):
+        return 3
+
+    monkeypatch.setattr(
+        "app.repository.gamestate.GameStateRepository.get_version",
+        get_mock_gamestate_version,
+    )
+
+    async def create_mock_gamestate(*args, **kargs):
         gamestate = GameState(
             "alpha",
             shuffle_deck=False,
@@ -91,7 +103,7 @@ def start_gamestate_next_card_higher(monkeypatch):
         create_mock_gamestate,
     )
 
-    def create_mock_updated_gamestate_store_repository(*args, **kwargs):
+    async def create_mock_updated_gamestate_store_repository(*args, **kwargs):
         pass
 
     monkeypatch.setattr(
@@ -104,7 +116,7 @@ def start_gamestate_next_card_higher(monkeypatch):
 def start_gamestate_next_card_lower(monkeypatch):
     """Returns a mock start gamestate whenever the database is queried"""
 
-    def create_mock_gamestate(*args, **kwargs):
+    async def create_mock_gamestate(*args, **kwargs):
         gamestate = GameState(
             "alpha",
             shuffle_deck=False,
@@ -120,7 +132,7 @@ def start_gamestate_next_card_lower(monkeypatch):
         create_mock_gamestate,
     )
 
-    def create_mock_updated_gamestate_store_repository(*args, **kwargs):
+    async def create_mock_updated_gamestate_store_repository(*args, **kwargs):
         pass
 
     monkeypatch.setattr(
@@ -133,7 +145,7 @@ def start_gamestate_next_card_lower(monkeypatch):
 def end_gamestate(monkeypatch):
     """Returns a mock end gamestate whenever the database is queried"""
 
-    def create_mock_gamestate(*args, **kwargs):
+    async def create_mock_gamestate(*args, **kwargs):
         return GameStateStore(
             id=1,
             user_id=1,
@@ -150,12 +162,20 @@ def end_gamestate(monkeypatch):
         create_mock_gamestate,
     )
 
+    async def update_mock_gamestate(self, user_id, gamestate):
+        return gamestate
+
+    monkeypatch.setattr(
+        "app.repository.gamestate.GameStateStoreRepository.update_gamestate",
+        update_mock_gamestate,
+    )
+
 
 @pytest.fixture
 def bankrupt_gamestate(monkeypatch):
     """Returns a mock start gamestate whenever the database is queried"""
 
-    def create_bankrupt_gamestate(*args, **kwargs):
+    async def create_bankrupt_gamestate(*args, **kwargs):
         return GameState(
             "alpha",
             shuffle_deck=False,
@@ -181,3 +201,32 @@ def unshuffled_deck(monkeypatch):
         "hilo.models.gamestate.GameState.init_deck",
         create_mock_gamestate_unshuffled_deck,
     )
+
+
+@pytest.fixture
+def idempotency_keys(monkeypatch):
+    """Mocks the idempotency_key table with a dict, and the session's commit"""
+
+    keys = {}
+
+    async def get_mock_idempotency_key(self, user_id, key):
+        return keys.get((user_id, key))
+
+    async def add_mock_idempotency_key(self, user_id, key, fingerprint, gamestate):
+        keys[(user_id, key)] = (fingerprint, gamestate)
+
+    async def commit_mock_session(self):
+        pass
+
+    monkeypatch.setattr(
+        "app.repository.idempotency.IdempotencyKeyRepository.get",
+        get_mock_idempotency_key,
+    )
+    monkeypatch.setattr(
+        "app.repository.idempotency.IdempotencyKeyRepository.add",
+        add_mock_idempotency_key,
+    )
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.commit", commit_mock_session
+    )
+    return keys
@@ -8,7 +8,7 @@ from app.models import User
 def mock_user(monkeypatch):
     """Returns a mock user whenever the database is queried"""
 
-    def create_mock_user(*args, **kwargs):
+    async def create_mock_user(*args, **kwargs):
         return User(
             id=1,
             username="alpha",
@@ -26,7 +26,7 @@ def mock_user(monkeypatch):
 def mock_no_user(monkeypatch):
     """Returns no user whenever the database is queried"""
 
-    def create_mock_user(*args, **kwargs):
+    async def create_mock_user(*args, **kwargs):
         return None
 
     monkeypatch.setattr(
@@ -39,7 +39,7 @@ def mock_no_user(monkeypatch):
 def user_creation_success(monkeypatch):
     """Returns valid user when user is saved to database"""
 
-    def create_mock_user(*args, **kwargs):
+    async def create_mock_user(*args, **kwargs):
         return User(
             id=1,
             username="alpha",
@@ -57,7 +57,7 @@ def user_creation_success(monkeypatch):
 def user_creation_failure(monkeypatch):
     """Raises expected error when users fail to be saved to database"""
 
-    def create_mock_failed_user(*args, **kwargs):
+    async def create_mock_failed_user(*args, **kwargs):
         raise UsernameNotUniqueError
 
     monkeypatch.setattr(
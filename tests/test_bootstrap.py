@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app import models
+from app.bootstrap import upgrade_schema
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A database whose gamestate table was created by an earlier version"""
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE gamestate "
+                "(id INTEGER PRIMARY KEY, user_id INTEGER, gamestate BLOB)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO gamestate (id, user_id) VALUES (1, 1), (2, 2), (3, 1)")
+        )
+    models.Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_schema_adds_version(engine):
+    """Ensures that existing gamestates get a version of 0"""
+
+    upgrade_schema(engine)
+
+    with engine.connect() as connection:
+        versions = connection.execute(
+            text("SELECT version FROM gamestate ORDER BY id")
+        ).scalars()
+        assert list(versions) == [0, 0]
+
+
+def test_upgrade_schema_adds_unique_user_id_index(engine):
+    """Ensures that duplicate games are removed, keeping each user's newest one, so
+    that the unique index on user_id can be created"""
+
+    upgrade_schema(engine)
+
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT id, user_id FROM gamestate ORDER BY id"))
+        assert [tuple(row) for row in rows] == [(2, 2), (3, 1)]
+    [index] = inspect(engine).get_indexes("gamestate")
+    assert index["name"] == "ix_gamestate_user_id"
+    assert index["unique"]
+
+
+def test_upgrade_schema_is_idempotent(engine):
+    """Ensures that upgrading an up to date schema changes nothing"""
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    columns = [column["name"] for column in inspect(engine).get_columns("gamestate")]
+    assert columns == ["id", "user_id", "gamestate", "version"]
+    assert len(inspect(engine).get_indexes("gamestate")) == 1
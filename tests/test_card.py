@@ -1,8 +1,22 @@
+import pickle
+
 import pytest
 from frozendict import frozendict
 
 from hilo.errors import CardRankError, CardSuitError
-from hilo.models.card import RANKS, SUITS, Card, rank_index, suit_index
+from hilo.models.card import (
+    CARDS,
+    RANKS,
+    SHOW_CARDS,
+    SUITS,
+    Card,
+    ShowCard,
+    card_from_id,
+    get_card,
+    rank_index,
+    show_card,
+    suit_index,
+)
 
 
 def test_RANKS():
@@ -193,3 +207,43 @@ def test_card_static_method_compute_card_value():
     """Ensures compute_card_value static method returns exepcted value"""
 
     assert Card.compute_card_value("A", "D") == 49
+
+
+def test_CARDS():
+    """Ensures module contains the 52 canonical cards ordered by card_id"""
+
+    assert CARDS == tuple(Card(rank, suit) for rank in RANKS for suit in SUITS)
+    assert [card.card_id for card in CARDS] == list(range(52))
+
+
+def test_card_id():
+    """Ensures Card object contains expected card_id attribute"""
+
+    assert Card("2", "D").card_id == 0
+    assert Card("A", "S").card_id == 51
+
+
+def test_card_from_id():
+    """Ensures card_from_id returns the interned card"""
+
+    assert card_from_id(48) is CARDS[48]
+    assert card_from_id(48) == Card("A", "D")
+
+
+def test_get_card():
+    """Ensures get_card returns the interned card for a rank and suit"""
+
+    assert get_card("A", "D") is CARDS[48]
+
+
+def test_show_card():
+    """Ensures show_card returns the precomputed ShowCard of a card"""
+
+    assert show_card(Card("A", "D")) == ShowCard("A", "D", "Ace of Diamonds")
+    assert show_card(Card("A", "D")) is SHOW_CARDS[48]
+
+
+def test_pickled_card_is_interned():
+    """Ensures unpickled cards resolve to the canonical card"""
+
+    assert pickle.loads(pickle.dumps(Card("A", "D"))) is CARDS[48]
@@ -0,0 +1,119 @@
+import pickle
+
+import pytest
+
+from app.codec import (
+    CARD_COUNTS_SIZE,
+    GAMESTATE_CODEC_VERSION_WITHOUT_COUNTS,
+    HEADER,
+    decode_gamestate,
+    encode_gamestate,
+)
+from app.errors import UnsupportedGameStateVersionError
+from hilo.game import get_next_card_odds, get_round_result, init_gamestate, init_round
+from hilo.models.card import Card
+from hilo.models.deck import CardCounts, Deck
+from hilo.models.gamestate import GameState
+from hilo.models.prediction import Prediction
+
+
+def test_encode_decode_new_gamestate():
+    """Ensures a new gamestate survives an encode and decode round trip"""
+
+    gamestate = init_gamestate("alpha")
+
+    assert decode_gamestate(encode_gamestate(gamestate)) == gamestate
+
+
+def test_encode_decode_ended_round():
+    """Ensures an ended round survives an encode and decode round trip"""
+
+    gamestate = get_round_result(init_gamestate("alpha"), Prediction.HIGHER, 10)
+    decoded_gamestate = decode_gamestate(encode_gamestate(gamestate))
+
+    assert decoded_gamestate == gamestate
+    assert decoded_gamestate.deck.cursor == gamestate.deck.cursor
+    assert decoded_gamestate.win is gamestate.win
+
+
+def test_encode_decode_reshuffled_deck():
+    """Ensures a gamestate that reshuffled its deck survives an encode and decode round trip"""
+
+    gamestate = init_gamestate("alpha")
+    for _ in range(30):
+        gamestate = init_round(get_round_result(gamestate, Prediction.LOWER, 1))
+    decoded_gamestate = decode_gamestate(encode_gamestate(gamestate))
+
+    assert decoded_gamestate == gamestate
+    assert decoded_gamestate.reshuffle_count == 2
+
+
+def test_encode_decode_unseeded_deck():
+    """Ensures a gamestate with an explicit deck survives an encode and decode round trip"""
+
+    gamestate = GameState("βeta", shuffle_deck=False, money=0)
+    gamestate.deck = Deck([Card("A", "H"), Card("2", "D")])
+    gamestate.base_card = Card("7", "D")
+
+    assert decode_gamestate(encode_gamestate(gamestate)) == gamestate
+
+
+def test_encoded_gamestate_size():
+    """Ensures an encoded gamestate, with its deck's card counts, is much smaller than
+    a pickled gamestate"""
+
+    gamestate = init_gamestate("alpha")
+
+    assert len(encode_gamestate(gamestate)) < 128
+    assert len(encode_gamestate(gamestate)) < len(pickle.dumps(gamestate)) / 2
+
+
+@pytest.mark.parametrize("shuffle_deck", [True, False])
+def test_decode_restores_card_counts(monkeypatch, shuffle_deck):
+    """Ensures the odds of a decoded gamestate are computed from its stored card
+    counts, without recounting the deck or shuffling a seeded deck again"""
+
+    gamestate = init_round(GameState("alpha", shuffle_deck=shuffle_deck))
+    odds = get_next_card_odds(gamestate)
+    record = encode_gamestate(gamestate)
+
+    def fail(*args, **kwargs):
+        pytest.fail("The deck was rebuilt")
+
+    monkeypatch.setattr(CardCounts, "__init__", fail)
+    monkeypatch.setattr("hilo.models.deck.Pcg32", fail)
+
+    assert get_next_card_odds(decode_gamestate(record)) == odds
+
+
+def test_decode_record_without_card_counts():
+    """Ensures records encoded before card counts were stored can still be decoded"""
+
+    gamestate = get_round_result(init_gamestate("alpha"), Prediction.HIGHER, 10)
+    record = encode_gamestate(gamestate)
+    legacy_record = (
+        bytes([GAMESTATE_CODEC_VERSION_WITHOUT_COUNTS])
+        + record[1 : HEADER.size]
+        + record[HEADER.size + CARD_COUNTS_SIZE :]
+    )
+
+    decoded_gamestate = decode_gamestate(legacy_record)
+    assert decoded_gamestate == gamestate
+    assert get_next_card_odds(decoded_gamestate) == get_next_card_odds(gamestate)
+
+
+def test_decode_pickled_gamestate():
+    """Ensures gamestates stored with PickleType can still be decoded"""
+
+    gamestate = init_gamestate("alpha")
+
+    assert decode_gamestate(pickle.dumps(gamestate)) == gamestate
+
+
+def test_decode_unsupported_version():
+    """Ensures custom error is raised for records with an unknown codec version"""
+
+    record = bytes([99]) + encode_gamestate(init_gamestate("alpha"))[1:]
+
+    with pytest.raises(UnsupportedGameStateVersionError):
+        decode_gamestate(record)
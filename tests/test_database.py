@@ -0,0 +1,16 @@
+from app import database
+
+
+def test_get_engine_without_psycopg2(monkeypatch, tmp_path):
+    """Ensures engines of other drivers are not given psycopg2's executemany_mode"""
+
+    monkeypatch.setattr(
+        database, "SQLALCHEMY_DATABASE_URL", f"sqlite:///{tmp_path / 'engine.db'}"
+    )
+    monkeypatch.setattr(database, "_engine", None)
+
+    engine = database.get_engine()
+    try:
+        assert engine.dialect.driver == "pysqlite"
+    finally:
+        engine.dispose()
@@ -1,3 +1,4 @@
+import pickle
 import random
 
 import pytest
@@ -73,3 +74,123 @@ def test_eq_with_deck_less_cards():
     assert not Deck([Card("A", "D"), Card("A", "H")]) == Deck(
         [Card("A", "H"), Card("A", "D"), Card("A", "C")]
     )
+
+
+def test_method_draw():
+    """Ensures deck draw method returns the top card without shifting the remaining cards"""
+
+    test_deck = Deck([Card("A", "D"), Card("A", "H"), Card("A", "C")])
+
+    assert test_deck.draw() == Card("A", "D")
+    assert test_deck.cursor == 1
+    assert test_deck.cards == [Card("A", "H"), Card("A", "C")]
+
+
+def test_method_draw_index():
+    """Ensures deck draw method removes the card at the given index"""
+
+    test_deck = Deck([Card("A", "D"), Card("A", "H"), Card("A", "C")])
+
+    assert test_deck.draw(1) == Card("A", "H")
+    assert test_deck.cards == [Card("A", "D"), Card("A", "C")]
+
+
+def test_method_draw_empty_deck():
+    """Ensures deck draw method raises an error when no cards remain"""
+
+    test_deck = Deck([Card("A", "D")])
+    test_deck.draw()
+
+    with pytest.raises(IndexError):
+        test_deck.draw()
+
+
+def test_len_cards_after_draw():
+    """Ensures the number of remaining cards accounts for drawn cards"""
+
+    test_deck = Deck()
+    test_deck.draw()
+
+    assert len(test_deck.cards) == 51
+    assert len(test_deck) == 51
+
+
+def test_method_shuffle_after_draw():
+    """Ensures deck shuffle method only shuffles the remaining cards"""
+
+    test_deck = Deck()
+    drawn_card = test_deck.draw()
+    test_deck.shuffle()
+
+    assert test_deck.cursor == 0
+    assert len(test_deck.cards) == 51
+    assert drawn_card not in test_deck.cards
+
+
+def test_pickle_deck():
+    """Ensures a pickled deck only keeps its remaining cards and their counts"""
+
+    test_deck = Deck()
+    test_deck.draw()
+
+    assert pickle.loads(pickle.dumps(test_deck)) == test_deck
+    assert len(pickle.dumps(test_deck)) < 192
+
+
+def test_unpickle_legacy_deck():
+    """Ensures decks pickled as a list of cards can still be loaded"""
+
+    test_deck = Deck.__new__(Deck)
+    test_deck.__setstate__({"cards": [Card("A", "D"), Card("A", "H")]})
+
+    assert test_deck == Deck([Card("A", "D"), Card("A", "H")])
+
+
+def test_count_higher_and_lower():
+    """Ensures remaining cards higher and lower than a card are counted"""
+
+    test_deck = Deck([Card("2", "D"), Card("7", "H"), Card("A", "C")])
+
+    assert test_deck.count_higher(Card("7", "D")) == 2
+    assert test_deck.count_lower(Card("7", "D")) == 1
+
+
+def test_count_higher_and_lower_after_draw():
+    """Ensures drawn cards are no longer counted"""
+
+    test_deck = Deck([Card("A", "C"), Card("7", "H"), Card("2", "D")])
+    test_deck.draw()
+
+    assert test_deck.count_higher(Card("7", "D")) == 1
+    assert test_deck.count_lower(Card("7", "D")) == 1
+
+
+def test_from_seed():
+    """Ensures seeded decks are reproducible from their seed and reshuffle count"""
+
+    assert Deck.from_seed(1337) == Deck.from_seed(1337)
+    assert not Deck.from_seed(1337) == Deck.from_seed(1337, reshuffle_count=1)
+    assert sorted(Deck.from_seed(1337).cards) == Deck().cards
+
+
+def test_from_seed_cursor():
+    """Ensures a seeded deck with a cursor resumes after the drawn cards"""
+
+    test_deck = Deck.from_seed(1337)
+    test_deck.draw()
+    test_deck.draw()
+
+    assert Deck.from_seed(1337, cursor=2) == test_deck
+    assert len(Deck.from_seed(1337, cursor=2).cards) == 50
+
+
+def test_pickle_seeded_deck():
+    """Ensures a pickled seeded deck only keeps its seed, reshuffle count and cursor"""
+
+    test_deck = Deck.from_seed(1337, reshuffle_count=3)
+    test_deck.draw()
+    unpickled_deck = pickle.loads(pickle.dumps(test_deck))
+
+    assert unpickled_deck == test_deck
+    assert unpickled_deck.cursor == 1
+    assert len(pickle.dumps(test_deck)) < 64
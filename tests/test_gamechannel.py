@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.errors import GameStateVersionConflictError
+from app.services.gamechannel import GameChannel
+from app.token import Principal
+from hilo.errors import InvalidBetError
+from hilo.game import init_gamestate
+from hilo.models.prediction import Prediction
+
+
+class FakeSession:
+    """Stands in for an AsyncSession, which the mocked repository never uses"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+@pytest.fixture
+def stored_version():
+    """The version of the mocked stored gamestate"""
+
+    return [0]
+
+
+@pytest.fixture
+def saves(monkeypatch, stored_version):
+    """Records saves that are made with the stored gamestate's version"""
+
+    saves = []
+
+    async def save_mock_gamestate(self, gamestate, user_id, version):
+        if version != stored_version[0]:
+            raise GameStateVersionConflictError
+        saves.append((user_id, gamestate.money))
+        stored_version[0] += 1
+        return stored_version[0]
+
+    monkeypatch.setattr(
+        "app.services.gamechannel.GameStateRepository.update_if_version",
+        save_mock_gamestate,
+    )
+    return saves
+
+
+@pytest.fixture
+def channel():
+    """A channel that loaded a new game at version 0"""
+
+    channel = GameChannel(Principal(1, "alpha"), init_gamestate("alpha"), FakeSession)
+    channel.version = 0
+    return channel
+
+
+def test_play_saves_the_round_before_returning_it(channel, saves):
+    """Ensures that each round is saved with the version the channel last saved"""
+
+    gamestate = asyncio.run(channel.play(Prediction.HIGHER, 10))
+    assert saves == [(1, gamestate.money)]
+    assert channel.version == 1
+
+    gamestate = asyncio.run(channel.start_round())
+    assert saves[-1] == (1, gamestate.money)
+    assert channel.version == 2
+
+
+def test_play_is_not_returned_when_game_changed_elsewhere(
+    channel, saves, stored_version
+):
+    """Ensures that a round is neither saved nor returned when another request saved
+    the gamestate after the channel did"""
+
+    stored_version[0] = 1
+    with pytest.raises(GameStateVersionConflictError):
+        asyncio.run(channel.play(Prediction.HIGHER, 10))
+    assert saves == []
+    assert channel.version == 0
+
+
+def test_rejected_bet_leaves_gamestate_unchanged(channel, saves):
+    """Ensures that a bet larger than the user's money draws no card and saves nothing"""
+
+    cards_remaining = len(channel.gamestate.deck)
+
+    with pytest.raises(InvalidBetError):
+        asyncio.run(channel.play(Prediction.HIGHER, 5000))
+
+    assert len(channel.gamestate.deck) == cards_remaining
+    assert channel.gamestate.is_round_started
+    assert saves == []
@@ -1,18 +1,13 @@
-import random
-
 import pytest
 
-from hilo.models.card import RANKS, SUITS, Card
+from hilo.models.card import Card
 from hilo.models.deck import Deck
 from hilo.models.gamestate import GameState
 
 
 @pytest.fixture
 def shuffled_deck():
-    card_list = [Card(rank, suit) for rank in RANKS for suit in SUITS]
-    random.seed(1337)
-    random.shuffle(card_list)
-    return Deck(card_list)
+    return Deck.from_seed(1337)
 
 
 def test_not_shuffle_deck():
@@ -22,8 +17,22 @@ def test_not_shuffle_deck():
 
 
 def test_shuffle_deck(shuffled_deck):
-    random.seed(1337)
-    assert GameState("foo", shuffle_deck=True).deck == shuffled_deck
+    """Ensures that deck is shuffled with the gamestate's seed if shuffle deck is True"""
+
+    gamestate = GameState("foo", shuffle_deck=True, seed=1337)
+
+    assert gamestate.deck == shuffled_deck
+    assert not gamestate.deck == Deck()
+    assert sorted(gamestate.deck.cards) == Deck().cards
+
+
+def test_shuffle_deck_without_seed():
+    """Ensures that a seed is generated if a shuffled gamestate has no seed"""
+
+    gamestate = GameState("foo", shuffle_deck=True)
+
+    assert gamestate.seed is not None
+    assert gamestate.deck == Deck.from_seed(gamestate.seed)
 
 
 def test_method_init_deck_false():
@@ -36,12 +45,22 @@ def test_method_init_deck_false():
 
 def test_method_init_deck_true(shuffled_deck):
     """Ensures that deck is shuffled if shuffle in init_deck is True"""
-    random.seed(1337)
-    gamestate = GameState("foo", shuffle_deck=False)
+    gamestate = GameState("foo", shuffle_deck=False, seed=1337)
     gamestate.init_deck(shuffle=True)
     assert gamestate.deck == shuffled_deck
 
 
+def test_method_init_deck_reshuffle():
+    """Ensures that every reshuffle derives a new deck from the same seed"""
+
+    gamestate = GameState("foo", shuffle_deck=True, seed=1337)
+    gamestate.init_deck(shuffle=True)
+
+    assert gamestate.reshuffle_count == 2
+    assert gamestate.deck == Deck.from_seed(1337, reshuffle_count=1)
+    assert not gamestate.deck == Deck.from_seed(1337)
+
+
 def test_method_is_bankrupt_not_bankrupt():
     """Ensures that is_bankupt method works for non-bankrupt players"""
 
@@ -85,3 +104,21 @@ def test_method_increment_round():
     assert gamestate.round == 1
     gamestate.increment_round()
     assert gamestate.round == 2
+
+
+def test_construct():
+    """Ensures that construct builds the same gamestate as the validating constructor"""
+
+    gamestate = GameState.construct("foo", shuffle_deck=True, money=10, seed=1337)
+
+    assert gamestate == GameState("foo", shuffle_deck=True, money=10, seed=1337)
+    assert gamestate.deck == Deck.from_seed(1337)
+    assert gamestate.reshuffle_count == 1
+
+
+def test_construct_skips_validation():
+    """Ensures that construct trusts its arguments instead of validating them"""
+
+    gamestate = GameState.construct("foo", shuffle_deck=False, money=-1)
+
+    assert gamestate.money == -1
@@ -0,0 +1,178 @@
+import asyncio
+
+import pytest
+
+from app.codec import decode_gamestate
+from app.errors import GameStateVersionConflictError
+from app.gamestatecache import GameStateCache
+from app.repository.gamestate import GameStateRepository
+from hilo.errors import InvalidBetError
+from hilo.game import get_round_result, init_gamestate, init_round
+from hilo.models.prediction import Prediction
+
+
+@pytest.fixture
+def writes():
+    return []
+
+
+@pytest.fixture
+def cache(clock, writes):
+    return GameStateCache(2, 10, 1, lambda records: writes.append(dict(records)), clock)
+
+
+def test_disabled_cache(writes):
+    cache = GameStateCache(0, 10, 1, writes.append)
+    cache.put(1, init_gamestate("alpha"), 1, dirty=True)
+    assert not cache.enabled
+    assert cache.get(1) is None
+    assert cache.flush() == 0
+    assert writes == []
+
+
+def test_get_returns_copy_of_cached_gamestate(cache):
+    gamestate = init_gamestate("alpha")
+    cache.put(1, gamestate, 0)
+    cached = cache.get(1)
+    assert cached == gamestate
+    assert cached is not gamestate
+    assert cache.get(1) is not cached
+    assert cache.get(2) is None
+
+
+def test_rejected_bet_leaves_cached_gamestate_unchanged(cache):
+    gamestate = init_gamestate("alpha")
+    cache.put(1, gamestate, 0)
+
+    cached = cache.get(1)
+    with pytest.raises(InvalidBetError):
+        get_round_result(cached, Prediction.HIGHER, cached.money + 1)
+
+    assert cached.deck.cursor == gamestate.deck.cursor
+    assert cached.next_card is None
+    assert cache.get(1) == gamestate
+
+
+def test_flush_writes_dirty_gamestates_once(cache, writes):
+    gamestate = init_round(init_gamestate("alpha"))
+    cache.put(1, init_gamestate("beta"), 0)
+    cache.put(2, gamestate, 1, dirty=True)
+    assert cache.flush() == 1
+    assert cache.flush() == 0
+    assert list(writes[0]) == [2]
+    record, version = writes[0][2]
+    assert decode_gamestate(record) == gamestate
+    assert version == 1
+
+
+def test_clean_put_keeps_pending_write(cache, writes):
+    gamestate = init_gamestate("alpha")
+    cache.put(1, gamestate, 1, dirty=True)
+    cache.put(1, gamestate, 1)
+    assert cache.flush() == 1
+
+
+def test_ttl_eviction(cache, clock, writes):
+    cache.put(1, init_gamestate("alpha"), 1, dirty=True)
+    clock.now = 10
+    assert cache.get(1) is not None
+    clock.now = 25
+    cache.flush()
+    assert cache.get(1) is None
+    assert list(writes[0]) == [1]
+
+
+def test_lru_eviction_writes_dirty_gamestate(cache, writes):
+    cache.put(1, init_gamestate("alpha"), 1, dirty=True)
+    cache.put(2, init_gamestate("beta"), 0)
+    cache.get(1)
+    cache.put(3, init_gamestate("gamma"), 1, dirty=True)
+    assert cache.get(2) is None
+    assert writes == []
+
+    cache.put(4, init_gamestate("delta"), 0)
+    assert len(cache) == 2
+    assert list(writes[0]) == [1, 3]
+
+
+def test_failed_write_is_retried(clock):
+    attempts = []
+
+    def writer(records):
+        attempts.append(dict(records))
+        if len(attempts) == 1:
+            raise ConnectionError
+
+    cache = GameStateCache(2, 10, 1, writer, clock)
+    gamestate = init_gamestate("alpha")
+    cache.put(1, gamestate, 1, dirty=True)
+    assert cache.flush() == 0
+    assert cache.flush() == 1
+    assert attempts[0] == attempts[1]
+
+
+def test_stop_flushes_dirty_gamestates(cache, writes):
+    cache.start()
+    cache.put(1, init_gamestate("alpha"), 1, dirty=True)
+    cache.stop()
+    assert [list(records) for records in writes] == [[1]]
+
+
+def test_get_version_of_cached_and_evicted_gamestates(cache, clock, writes):
+    cache.put(1, init_gamestate("alpha"), 4, dirty=True)
+    cache.put(2, init_gamestate("beta"), 7)
+    assert cache.get_version(1) == 4
+    assert cache.get_version(2) == 7
+    assert cache.get_version(3) is None
+
+    # Evicting gamestate 1 writes it, after which its version is read from the database
+    cache.put(3, init_gamestate("gamma"), 0)
+    assert cache.get_version(1) is None
+    assert writes[0][1][1] == 4
+
+    clock.now = 25
+    assert cache.get_version(2) is None
+
+
+def test_update_if_version_checks_cached_version(cache, monkeypatch):
+    monkeypatch.setattr("app.repository.gamestate.gamestate_cache", cache)
+    repository = GameStateRepository(None)
+    cache.put(1, init_gamestate("alpha"), 3)
+    updated = init_round(init_gamestate("alpha"))
+
+    with pytest.raises(GameStateVersionConflictError):
+        asyncio.run(repository.update_if_version(updated, 1, 2))
+    assert cache.get_version(1) == 3
+
+    assert asyncio.run(repository.update_if_version(updated, 1, 3)) == 4
+    assert cache.get_with_version(1) == (updated, 4)
+
+
+def test_locked_serialises_requests_of_a_user(cache):
+    events = []
+
+    async def request(user_id, name):
+        async with cache.locked(user_id):
+            events.append(f"{name} start")
+            await asyncio.sleep(0)
+            events.append(f"{name} end")
+
+    async def run_concurrently():
+        await asyncio.gather(request(1, "a"), request(1, "b"), request(2, "c"))
+
+    asyncio.run(run_concurrently())
+    assert events.index("a end") < events.index("b start")
+    assert events.index("c start") < events.index("a end")
+    assert cache._user_locks == {}
+
+
+def test_get_for_update_does_not_lock_row_when_cache_enabled(cache, monkeypatch):
+    """Ensures a cached gamestate is read without a query, since locked serialises
+    the requests of its user"""
+
+    monkeypatch.setattr("app.repository.gamestate.gamestate_cache", cache)
+    gamestate = init_gamestate("alpha")
+    cache.put(1, gamestate, 3)
+    repository = GameStateRepository(None)
+
+    assert asyncio.run(repository.get(1, for_update=True)) == gamestate
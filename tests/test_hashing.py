@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from passlib.context import CryptContext
+
+from app.errors import PasswordHasherBusyError
+from app.hashing import (
+    PasswordHasher,
+    get_password_context,
+    verify_and_update_password,
+)
+
+
+def test_hasher_rejects_operations_when_full():
+    hasher = PasswordHasher(1, 0)
+
+    with pytest.raises(PasswordHasherBusyError):
+        asyncio.run(hasher.hash("bravo"))
+    assert hasher.pending == 0
+
+
+def test_hasher_hashes_in_worker_process():
+    hasher = PasswordHasher(1, 1)
+    try:
+        hashed_password = asyncio.run(hasher.hash("bravo"))
+        assert get_password_context().verify("bravo", hashed_password)
+        assert asyncio.run(hasher.verify_and_update("bravo", hashed_password)) == (
+            True,
+            None,
+        )
+    finally:
+        hasher.shutdown()
+    assert hasher.pending == 0
+
+
+def test_verify_and_update_rehashes_password_with_changed_cost():
+    hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("bravo")
+
+    verified, new_hashed_password = verify_and_update_password("bravo", hashed_password)
+
+    assert verified
+    assert new_hashed_password is not None
+    assert not get_password_context().needs_update(new_hashed_password)
+    assert verify_and_update_password("charlie", hashed_password) == (False, None)
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from app.errors import IdempotencyKeyReusedError
+from app.idempotency import IdempotencyCache, fingerprint_request
+from hilo.models.prediction import Prediction
+
+BODY = b'{"money":1001}'
+FINGERPRINT = fingerprint_request(Prediction.HIGHER, 1)
+
+
+@pytest.fixture
+def cache(clock):
+    return IdempotencyCache(2, 10, clock)
+
+
+def test_fingerprint_request_depends_on_prediction_and_bet():
+    assert fingerprint_request(Prediction.HIGHER, 1) == FINGERPRINT
+    assert fingerprint_request(Prediction.HIGHER, 5) != FINGERPRINT
+    assert fingerprint_request(Prediction.LOWER, 1) != FINGERPRINT
+
+
+def test_run_caches_the_produced_body(cache):
+    calls = []
+
+    async def produce():
+        calls.append(None)
+        return BODY, False
+
+    async def run_twice():
+        return [await cache.run((1, "key"), FINGERPRINT, produce) for _ in range(2)]
+
+    assert asyncio.run(run_twice()) == [(BODY, False), (BODY, True)]
+    assert len(calls) == 1
+
+
+def test_run_rejects_a_key_reused_with_another_fingerprint(cache):
+    async def produce():
+        return BODY, False
+
+    async def run_with_another_bet():
+        await cache.run((1, "key"), FINGERPRINT, produce)
+        await cache.run((1, "key"), fingerprint_request(Prediction.HIGHER, 5), produce)
+
+    with pytest.raises(IdempotencyKeyReusedError):
+        asyncio.run(run_with_another_bet())
+
+
+def test_concurrent_requests_wait_for_the_first(cache):
+    calls = []
+
+    async def produce():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return BODY, False
+
+    async def run_concurrently():
+        return await asyncio.gather(
+            *(cache.run((1, "key"), FINGERPRINT, produce) for _ in range(3))
+        )
+
+    assert asyncio.run(run_concurrently()) == [
+        (BODY, False),
+        (BODY, True),
+        (BODY, True),
+    ]
+    assert len(calls) == 1
+
+
+def test_concurrent_request_with_another_fingerprint_is_rejected(cache):
+    calls = []
+
+    async def produce():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return BODY, False
+
+    async def run_concurrently():
+        return await asyncio.gather(
+            cache.run((1, "key"), FINGERPRINT, produce),
+            cache.run((1, "key"), fingerprint_request(Prediction.LOWER, 1), produce),
+            return_exceptions=True,
+        )
+
+    produced, rejected = asyncio.run(run_concurrently())
+    assert produced == (BODY, False)
+    assert isinstance(rejected, IdempotencyKeyReusedError)
+    assert len(calls) == 1
+
+
+def test_waiter_produces_after_a_failed_request(cache):
+    calls = []
+
+    async def produce():
+        calls.append(None)
+        await asyncio.sleep(0)
+        if len(calls) == 1:
+            raise RuntimeError
+        return BODY, False
+
+    async def run_concurrently():
+        return await asyncio.gather(
+            cache.run((1, "key"), FINGERPRINT, produce),
+            cache.run((1, "key"), FINGERPRINT, produce),
+            return_exceptions=True,
+        )
+
+    failed, produced = asyncio.run(run_concurrently())
+    assert isinstance(failed, RuntimeError)
+    assert produced == (BODY, False)
+    assert len(calls) == 2
+
+
+def test_keys_are_per_user_and_expire(cache, clock):
+    cache.put((1, "key"), FINGERPRINT, b"alpha")
+    cache.put((2, "key"), FINGERPRINT, b"beta")
+    assert cache.get((1, "key")).body == b"alpha"
+    assert cache.get((2, "key")).body == b"beta"
+
+    clock.now = 10
+    assert cache.get((1, "key")) is None
+    assert len(cache) == 1
+
+
+def test_put_evicts_least_recently_cached(cache):
+    for user_id in range(3):
+        cache.put((user_id, "key"), FINGERPRINT, BODY)
+    assert len(cache) == 2
+    assert cache.get((0, "key")) is None
+
+
+def test_disabled_cache_still_waits_for_in_flight_requests(clock):
+    cache = IdempotencyCache(0, 10, clock)
+    calls = []
+
+    async def produce():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return BODY, False
+
+    async def run_concurrently():
+        return await asyncio.gather(
+            cache.run((1, "key"), FINGERPRINT, produce),
+            cache.run((1, "key"), FINGERPRINT, produce),
+        )
+
+    assert asyncio.run(run_concurrently()) == [(BODY, False), (BODY, True)]
+    assert len(cache) == 0
+    assert len(calls) == 1
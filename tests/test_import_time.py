@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+# Modules that are imported on first use rather than when a worker starts
+DEFERRED_MODULES = ("asyncpg", "psycopg2", "jose.jwt", "passlib.context")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "modules": [module for module in %r if module in sys.modules],
+}))
+"""
+
+
+def test_app_import_time_budget():
+    """Ensures importing the application neither needs a database nor imports heavy
+    modules, and stays within its import time budget"""
+
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT % (DEFERRED_MODULES,)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    measurement = json.loads(result.stdout.splitlines()[-1])
+
+    assert measurement["modules"] == []
+    assert measurement["seconds"] < IMPORT_TIME_BUDGET_SECONDS
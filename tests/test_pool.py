@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+from app.metrics import registry
+from app.pool import PoolStats, instrument_engine, instrumented_pool_class
+
+
+@pytest.fixture
+def stats():
+    return PoolStats("test")
+
+
+@pytest.fixture
+def engine(stats, tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(QueuePool, stats),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.01,
+    )
+    instrument_engine(engine, stats)
+    yield engine
+    engine.dispose()
+
+
+def test_pool_stats_before_use(stats):
+    assert stats.snapshot()["checkouts"] == 0
+    assert stats.snapshot()["mean_wait_seconds"] == 0.0
+
+
+def test_pool_stats_record_checkouts_and_overflow(engine, stats):
+    first_connection = engine.connect()
+    second_connection = engine.connect()
+
+    snapshot = stats.snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["connects"] == 2
+    assert snapshot["checked_out"] == 2
+    assert snapshot["overflow"] == 1
+    assert snapshot["max_overflow"] == 1
+
+    first_connection.close()
+    second_connection.close()
+    snapshot = stats.snapshot()
+    assert snapshot["checked_out"] == 0
+    assert snapshot["max_checked_out"] == 2
+
+
+def test_pool_stats_record_timeouts(engine, stats):
+    connections = [engine.connect(), engine.connect()]
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    snapshot = stats.snapshot()
+    assert snapshot["timeouts"] == 1
+    assert snapshot["max_wait_seconds"] >= 0.01
+
+    for connection in connections:
+        connection.close()
+
+
+def test_pool_stats_follow_recreated_pool(engine, stats):
+    engine.connect().close()
+    engine.dispose()
+    engine.connect().close()
+    assert stats.pool is engine.pool
+    assert stats.snapshot()["checkouts"] == 2
+
+
+def test_pool_stats_are_exported(engine, stats):
+    connection = engine.connect()
+    assert registry.get_sample_value("hilo_db_pool_checked_out", {"pool": "test"}) == 1
+    connection.close()
+    assert registry.get_sample_value("hilo_db_pool_checked_out", {"pool": "test"}) == 0
+    assert (
+        registry.get_sample_value("hilo_db_pool_checkouts_total", {"pool": "test"}) >= 1
+    )
@@ -0,0 +1,42 @@
+from hilo.prng import Pcg32
+
+
+def test_next_u32():
+    """Ensures Pcg32 matches the reference pcg32 output for seed 42 and stream 54"""
+
+    generator = Pcg32(42, 54)
+
+    assert [generator.next_u32() for _ in range(6)] == [
+        0xA15C02B7,
+        0x7B47F409,
+        0xBA1D3330,
+        0x83D2F293,
+        0xBFA4784B,
+        0xCBED606E,
+    ]
+
+
+def test_method_advance():
+    """Ensures advance skips ahead by the given number of outputs"""
+
+    stepped_generator = Pcg32(1337)
+    for _ in range(1000):
+        stepped_generator.next_u32()
+
+    advanced_generator = Pcg32(1337)
+    advanced_generator.advance(1000)
+
+    assert advanced_generator.state == stepped_generator.state
+
+
+def test_method_shuffle():
+    """Ensures shuffle permutes items and is reproducible"""
+
+    first_items = bytearray(range(52))
+    second_items = bytearray(range(52))
+    Pcg32(1337).shuffle(first_items)
+    Pcg32(1337).shuffle(second_items)
+
+    assert first_items == second_items
+    assert sorted(first_items) == list(range(52))
+    assert first_items != bytearray(range(52))
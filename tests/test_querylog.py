@@ -0,0 +1,82 @@
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+
+from app.querylog import QueryLogMiddleware, fingerprint, instrument_queries
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}")
+    instrument_queries(engine)
+    yield engine
+    engine.dispose()
+
+
+def create_client(engine, **thresholds) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(QueryLogMiddleware, routes=app.routes, **thresholds)
+
+    @app.get("/users/{user_id}")
+    async def read_user(user_id: int):
+        with engine.connect() as connection:
+            for value in range(3):
+                connection.execute(text("SELECT :value"), {"value": value})
+            connection.execute(text("SELECT 1 WHERE 'a' IN ('a', 'b')"))
+        return {}
+
+    return TestClient(app)
+
+
+def test_fingerprint_normalizes_literals_and_parameters():
+    assert fingerprint("SELECT *\n  FROM users WHERE id = 42 AND name = 'it''s'") == (
+        "SELECT * FROM users WHERE id = ? AND name = ?"
+    )
+    assert fingerprint("SELECT * FROM users WHERE id IN (%(a)s, %(b)s, $3)") == (
+        "SELECT * FROM users WHERE id IN (...)"
+    )
+    assert fingerprint("SELECT x::text FROM table1 WHERE y = :y") == (
+        "SELECT x::text FROM table1 WHERE y = ?"
+    )
+
+
+def test_slow_request_is_logged_with_its_queries(engine, caplog):
+    client = create_client(engine, max_queries=3, max_seconds=0)
+
+    with caplog.at_level(logging.WARNING, logger="app.querylog"):
+        response = client.get("/users/1")
+
+    assert response.status_code == 200
+    [record] = caplog.records
+    line = json.loads(record.getMessage())
+    assert line["event"] == "slow_request"
+    assert line["method"] == "GET"
+    assert line["route"] == "/users/{user_id}"
+    assert line["status"] == 200
+    assert line["query_count"] == 4
+    assert line["db_seconds"] <= line["duration_seconds"]
+    assert {
+        statement["fingerprint"]: statement["count"] for statement in line["statements"]
+    } == {"SELECT ?": 3, "SELECT ? WHERE ? IN (...)": 1}
+
+
+def test_request_within_thresholds_is_not_logged(engine, caplog):
+    client = create_client(engine, max_queries=4, max_seconds=60)
+
+    with caplog.at_level(logging.WARNING, logger="app.querylog"):
+        client.get("/users/1")
+
+    assert caplog.records == []
+
+
+def test_failed_query_does_not_leave_its_start_time(engine):
+    with engine.connect() as connection:
+        with pytest.raises(exc.OperationalError):
+            connection.execute(text("SELECT * FROM missing"))
+        connection.execute(text("SELECT 1"))
+
+        assert connection.info["query_started"] == []
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.errors import RateLimitExceededError
+from app.ratelimit import InMemoryRateLimitBackend, RateLimitBackend, RateLimiter
+
+
+@pytest.fixture
+def backend(clock):
+    return InMemoryRateLimitBackend(2, clock)
+
+
+def test_limiter_allows_burst_then_rejects(backend):
+    limiter = RateLimiter(3, 1, backend)
+    for _ in range(3):
+        limiter.check("alpha")
+
+    with pytest.raises(RateLimitExceededError) as error:
+        limiter.check("alpha")
+    assert error.value.retry_after == pytest.approx(1)
+
+
+def test_limiter_refills_over_time(backend, clock):
+    limiter = RateLimiter(2, 0.5, backend)
+    limiter.check("alpha")
+    limiter.check("alpha")
+
+    clock.now = 1
+    with pytest.raises(RateLimitExceededError) as error:
+        limiter.check("alpha")
+    assert error.value.retry_after == pytest.approx(1)
+
+    clock.now = 2
+    limiter.check("alpha")
+
+    clock.now = 100
+    limiter.check("alpha")
+    limiter.check("alpha")
+    with pytest.raises(RateLimitExceededError):
+        limiter.check("alpha")
+
+
+def test_limiter_keys_are_independent(backend):
+    limiter = RateLimiter(1, 1, backend)
+    limiter.check("alpha")
+    limiter.check("bravo")
+
+    with pytest.raises(RateLimitExceededError):
+        limiter.check("alpha")
+
+
+def test_backend_evicts_least_recently_used_bucket(backend):
+    limiter = RateLimiter(1, 1, backend)
+    limiter.check("alpha")
+    limiter.check("bravo")
+    limiter.check("charlie")
+
+    assert len(backend) == 2
+    # alpha was evicted, so its bucket starts full again
+    limiter.check("alpha")
+    with pytest.raises(RateLimitExceededError):
+        limiter.check("charlie")
+
+
+def test_disabled_limiter(backend):
+    limiter = RateLimiter(0, 1, backend)
+    for _ in range(10):
+        limiter.check("alpha")
+    assert len(backend) == 0
+
+
+def test_backend_must_implement_consume_and_clear():
+    class IncompleteBackend(RateLimitBackend):
+        def clear(self):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()
+
+
+@pytest.mark.parametrize(
+    "name", ["RATE_LIMIT_IP_REFILL_PER_SECOND", "RATE_LIMIT_USERNAME_REFILL_PER_SECOND"]
+)
+def test_config_rejects_refill_rates_that_are_not_positive(name):
+    """Ensures a rate of 0 fails at startup instead of dividing by it per request"""
+
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.config"],
+        env={**os.environ, name: "0"},
+        capture_output=True,
+    )
+    assert result.returncode != 0
+    assert f"{name} must be positive" in result.stderr.decode()
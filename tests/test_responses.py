@@ -0,0 +1,65 @@
+import dataclasses
+
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app.responses import (
+    CARD_JSON,
+    JSONBytesResponse,
+    gamestate_batch_json,
+    gamestate_end_json,
+    gamestate_start_json,
+)
+from app.schemas import CardOut, GameStateBatchOut, GameStateEndOut, GameStateStartOut
+from hilo.game import init_gamestate, init_round, play_rounds
+from hilo.models.card import CARDS
+from hilo.models.prediction import Prediction
+
+
+@pytest.fixture
+def gamestates():
+    new_gamestate = init_gamestate('"alpha" \\ ☃')
+    started_gamestate = init_round(init_gamestate("bravo"))
+    _, ended_gamestate = play_rounds(
+        init_round(init_gamestate("charlie")), [(Prediction.HIGHER, 10)]
+    )
+    return [new_gamestate, started_gamestate, ended_gamestate]
+
+
+def test_card_json_matches_card_out():
+    for card in CARDS:
+        assert orjson.loads(CARD_JSON[card.card_id]) == CardOut(
+            rank=card.rank, suit=card.suit, name=card.name
+        )
+
+
+def test_gamestate_json_matches_response_models(gamestates):
+    for gamestate in gamestates:
+        fields = dataclasses.asdict(gamestate)
+        assert orjson.loads(gamestate_start_json(gamestate)) == jsonable_encoder(
+            GameStateStartOut(**fields)
+        )
+        assert orjson.loads(gamestate_end_json(gamestate)) == jsonable_encoder(
+            GameStateEndOut(**fields)
+        )
+
+
+def test_gamestate_batch_json_matches_response_model():
+    choices = [(Prediction.HIGHER, 10), (Prediction.LOWER, 20), (Prediction.HIGHER, 5)]
+    round_results, gamestate = play_rounds(init_round(init_gamestate("alpha")), choices)
+
+    for error in (None, "INVALID_BET"):
+        expected = GameStateBatchOut(
+            **dataclasses.asdict(gamestate),
+            rounds=[dataclasses.asdict(round_result) for round_result in round_results],
+            error=error,
+        )
+        assert orjson.loads(
+            gamestate_batch_json(gamestate, round_results, error)
+        ) == jsonable_encoder(expected)
+
+
+def test_json_bytes_response_renders_bytes_as_they_are():
+    assert JSONBytesResponse(b'{"a":1}').body == b'{"a":1}'
+    assert JSONBytesResponse({"a": 1}).body == b'{"a":1}'
@@ -140,3 +140,31 @@ def test_login_malformed_request():
             ],
         },
     }
+
+
+def test_login_rate_limited_by_username(mock_no_user, monkeypatch):
+    """Ensures repeated logins to one username are rejected before authentication"""
+
+    monkeypatch.setattr("app.ratelimit.username_rate_limiter.capacity", 2)
+
+    for _ in range(2):
+        response = client.post(
+            "/login",
+            json={
+                "username": "alpha",
+                "password": "bravo",
+            },
+        )
+        assert response.status_code == 404
+
+    response = client.post(
+        "/login",
+        json={
+            "username": "alpha",
+            "password": "bravo",
+        },
+    )
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "10"
+    assert response.json() == {"detail": {"error": "RATE_LIMIT_EXCEEDED"}}
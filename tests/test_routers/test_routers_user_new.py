@@ -164,3 +164,47 @@ def test_create_users_malformed_request():
             ],
         }
     }
+
+
+def test_create_user_password_hasher_busy(user_creation_success, monkeypatch):
+    """Ensures that users are turned away while too many passwords are being hashed"""
+
+    monkeypatch.setattr("app.hashing.password_hasher.max_pending", 0)
+
+    response = client.post(
+        "/user/new",
+        json={
+            "username": "alpha",
+            "password": "bravo",
+        },
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json() == {"detail": {"error": "SERVICE_BUSY"}}
+
+
+def test_create_user_rate_limited_by_client_ip(user_creation_success, monkeypatch):
+    """Ensures that clients creating many users are rejected"""
+
+    monkeypatch.setattr("app.ratelimit.ip_rate_limiter.capacity", 1)
+
+    response = client.post(
+        "/user/new",
+        json={
+            "username": "alpha",
+            "password": "bravo",
+        },
+    )
+    assert response.status_code == 201
+
+    response = client.post(
+        "/user/new",
+        json={
+            "username": "bravo",
+            "password": "bravo",
+        },
+    )
+
+    assert response.status_code == 429
+    assert response.json() == {"detail": {"error": "RATE_LIMIT_EXCEEDED"}}
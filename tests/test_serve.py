@@ -0,0 +1,193 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+pytest.importorskip("gunicorn")
+pytest.importorskip("uvicorn")
+
+from app import serve
+from app.config import METRICS_MULTIPROCESS_DIR_VARIABLE
+
+STARTUP_TIMEOUT_SECONDS = 30
+
+
+def test_gamestate_cache_requires_one_worker(monkeypatch):
+    """Ensures workers would not each write back their own copies of gamestates"""
+
+    monkeypatch.setattr(serve, "SERVER_WORKERS", 2)
+    monkeypatch.setattr(serve, "GAMESTATE_CACHE_MAX_SIZE", 100)
+    monkeypatch.setattr(
+        serve.Server, "run", lambda self: pytest.fail("Workers were started")
+    )
+
+    assert serve.main() == 1
+
+
+def test_main_serves_with_configured_settings(monkeypatch, tmp_path):
+    """Ensures the SERVER_* settings are given to gunicorn and its uvicorn workers"""
+
+    monkeypatch.setenv(METRICS_MULTIPROCESS_DIR_VARIABLE, str(tmp_path))
+    monkeypatch.setattr(serve, "SERVER_WORKERS", 3)
+    monkeypatch.setattr(serve, "SERVER_LIMIT_MAX_REQUESTS", 1000)
+    monkeypatch.setattr(serve, "SERVER_GRACEFUL_TIMEOUT_SECONDS", 7)
+    servers = []
+    monkeypatch.setattr(serve.Server, "run", lambda self: servers.append(self))
+
+    assert serve.main() == 0
+    [server] = servers
+    assert server.cfg.workers == 3
+    assert server.cfg.max_requests == 1000
+    assert server.cfg.graceful_timeout == 7
+    assert server.cfg.worker_class is serve.Worker
+
+
+def test_main_discards_metrics_of_earlier_runs(monkeypatch, tmp_path):
+    """Ensures the counters of a previous server are not added to the new one's"""
+
+    monkeypatch.setenv(METRICS_MULTIPROCESS_DIR_VARIABLE, str(tmp_path))
+    (tmp_path / "counter_1.db").write_bytes(b"")
+    monkeypatch.setattr(serve.Server, "run", lambda self: None)
+
+    assert serve.main() == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _child_pids(pid: int):
+    children = set()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The parent pid follows the process name, which is in parentheses
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.add(int(entry))
+    return children
+
+
+def _workers(pid: int, count: int = 2):
+    """Returns the server's workers once there are count of them, or an empty set"""
+
+    children = _child_pids(pid)
+    return children if len(children) == count else set()
+
+
+def _wait_for(condition, timeout=STARTUP_TIMEOUT_SECONDS):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if result := condition():
+            return result
+        time.sleep(0.1)
+    pytest.fail("Timed out")
+
+
+def _get(url: str) -> str:
+    with urllib.request.urlopen(url, timeout=1) as response:
+        return response.read().decode()
+
+
+def _unmatched_requests(url: str) -> float:
+    for line in _get(url).splitlines():
+        if line.startswith('hilo_http_requests_total{method="GET",route="unmatched"'):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def _status(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except OSError:
+        return None
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="reads workers from /proc")
+def test_server_replaces_workers_and_stops_gracefully():
+    """Ensures the server forks its workers, replaces a worker that dies, and exits
+    cleanly when it is stopped"""
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.serve"],
+        env={
+            **os.environ,
+            "SERVER_HOST": "127.0.0.1",
+            "SERVER_PORT": str(port),
+            "SERVER_WORKERS": "2",
+            "GAMESTATE_CACHE_MAX_SIZE": "0",
+        },
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/game/unknown"
+        assert _wait_for(lambda: _status(url)) == 404
+        workers = _wait_for(lambda: _workers(process.pid))
+
+        killed = min(workers)
+        os.kill(killed, signal.SIGKILL)
+        replaced = _wait_for(
+            lambda: killed not in (children := _workers(process.pid)) and children
+        )
+        assert len(replaced - workers) == 1
+        assert _wait_for(lambda: _status(url)) == 404
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=STARTUP_TIMEOUT_SECONDS) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="reads workers from /proc")
+def test_metrics_are_summed_over_workers():
+    """Ensures every scrape reports the requests served by all of the workers"""
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.serve"],
+        env={
+            **os.environ,
+            "SERVER_HOST": "127.0.0.1",
+            "SERVER_PORT": str(port),
+            "SERVER_WORKERS": "2",
+            "GAMESTATE_CACHE_MAX_SIZE": "0",
+            "METRICS_ENDPOINTS_ENABLED": "true",
+        },
+    )
+    try:
+        url = f"http://127.0.0.1:{port}"
+        assert _wait_for(lambda: _status(f"{url}/metrics")) == 200
+        _wait_for(lambda: _workers(process.pid))
+
+        count = _unmatched_requests(f"{url}/metrics")
+        for _ in range(10):
+            assert _status(f"{url}/game/unknown") == 404
+        # A request is counted just after its response is sent
+        _wait_for(lambda: _unmatched_requests(f"{url}/metrics") == count + 10)
+        for _ in range(10):
+            assert _unmatched_requests(f"{url}/metrics") == count + 10
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=STARTUP_TIMEOUT_SECONDS) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from hilo.game import get_round_result
+from hilo.models.card import CARDS
+from hilo.models.gamestate import GameState
+from hilo.models.prediction import Prediction
+from hilo.simulate import (
+    FlatBet,
+    FractionBet,
+    predict_higher,
+    resolve_rounds,
+    simulate,
+    simulate_games,
+)
+
+
+def test_resolve_rounds_matches_get_round_result():
+    """Ensures vectorized rounds are resolved like hilo.game.get_round_result"""
+
+    rng = np.random.default_rng(1337)
+    base_cards = rng.integers(0, 52, 200)
+    next_cards = (base_cards + rng.integers(1, 52, 200)) % 52
+    predictions = rng.integers(0, 2, 200).astype(bool)
+    bets = rng.integers(1, 11, 200)
+    money = np.full(200, 10)
+
+    wins, updated_money = resolve_rounds(
+        base_cards, next_cards, predictions, bets, money
+    )
+
+    for index in range(200):
+        gamestate = GameState("foo", shuffle_deck=False, money=10)
+        gamestate.base_card = CARDS[base_cards[index]]
+        gamestate.deck.card_ids[0] = next_cards[index]
+        prediction = Prediction.HIGHER if predictions[index] else Prediction.LOWER
+        gamestate = get_round_result(gamestate, prediction, int(bets[index]))
+
+        assert gamestate.win == wins[index]
+        assert gamestate.money == updated_money[index]
+
+
+def test_resolve_rounds_invalid_bet():
+    """Ensures an error is raised if a bet exceeds the player's money"""
+
+    with pytest.raises(ValueError):
+        resolve_rounds(
+            np.array([0]), np.array([1]), np.array([True]), np.array([2]), np.array([1])
+        )
+
+
+def test_simulate_games_is_reproducible():
+    """Ensures simulations with the same seed have the same outcome"""
+
+    first = simulate_games(100, 60, bet_policy=FractionBet(0.5), seed=1337)
+    second = simulate_games(100, 60, bet_policy=FractionBet(0.5), seed=1337)
+
+    assert first.total_returned == second.total_returned
+    assert np.array_equal(first.final_money, second.final_money)
+
+
+def test_simulate_games_conserves_money():
+    """Ensures money only changes by the difference between payouts and bets"""
+
+    result = simulate_games(100, 60, predict_higher, FlatBet(5), money=50, seed=1)
+
+    assert result.final_money.sum() - 100 * 50 == (
+        result.total_returned - result.total_wagered
+    )
+
+
+def test_simulate_games_bankruptcy():
+    """Ensures bankrupt games stop playing and are counted"""
+
+    result = simulate_games(1000, 30, predict_higher, FlatBet(1000), seed=1)
+
+    assert result.bankruptcies == (result.final_money == 0).sum()
+    assert 0 < result.bankruptcy_rate < 1
+    assert result.rounds_played < 1000 * 30
+
+
+def test_simulate_merges_chunks():
+    """Ensures chunked simulations report every game"""
+
+    result = simulate(250, 30, seed=1337, workers=1, chunk_size=100)
+
+    assert result.games == 250
+    assert len(result.final_money) == 250
+    assert result.rounds_played == 250 * 30
+    assert 1 < result.rtp < 2
+
+
+@pytest.mark.parametrize("games", [0, -1])
+def test_simulate_without_games(games):
+    with pytest.raises(ValueError):
+        simulate(games, 30, workers=1)
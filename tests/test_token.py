@@ -0,0 +1,66 @@
+import pytest
+from freezegun import freeze_time
+from jose import JWTError, jwt
+
+from app.token import TokenClaimsCache
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr("jose.jwt.decode", counting_decode)
+    return calls
+
+
+def create_token(secret_key="secret", **claims):
+    return jwt.encode({"user_id": 1, "username": "alpha", **claims}, secret_key)
+
+
+def test_token_claims_cache_hit(decode_calls):
+    cache = TokenClaimsCache(2)
+    token = create_token()
+    assert cache.decode(token, "secret", "HS256")["user_id"] == 1
+    assert cache.decode(token, "secret", "HS256")["username"] == "alpha"
+    assert decode_calls == [token]
+
+
+def test_token_claims_cache_is_bounded(decode_calls):
+    cache = TokenClaimsCache(2)
+    tokens = [create_token(user_id=user_id) for user_id in range(3)]
+    for token in tokens:
+        cache.decode(token, "secret", "HS256")
+    cache.decode(tokens[0], "secret", "HS256")
+    assert len(cache) == 2
+    assert decode_calls == tokens + tokens[:1]
+
+
+def test_token_claims_cache_expires_at_exp(decode_calls):
+    cache = TokenClaimsCache(2)
+    token = create_token(exp=1619049600)
+
+    with freeze_time("2021-04-20"):
+        cache.decode(token, "secret", "HS256")
+        cache.decode(token, "secret", "HS256")
+    assert len(decode_calls) == 1
+
+    with freeze_time("2021-04-23"):
+        with pytest.raises(JWTError):
+            cache.decode(token, "secret", "HS256")
+    assert len(cache) == 0
+
+
+def test_token_claims_cache_invalidated_on_key_change(decode_calls):
+    cache = TokenClaimsCache(2)
+    token = create_token()
+    rotated_token = create_token("rotated")
+    cache.decode(token, "secret", "HS256")
+    cache.decode(rotated_token, "rotated", "HS256")
+    cache.decode(rotated_token, "rotated", "HS256")
+    assert decode_calls == [token, rotated_token]
+    assert len(cache) == 1